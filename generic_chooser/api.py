@@ -0,0 +1,457 @@
+import codecs
+import json
+import time
+
+import requests
+from django.contrib.admin.utils import quote
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+
+from generic_chooser.cache import LocalCache, SingleFlight, make_cache_key
+from generic_chooser.metrics import record_cache_lookup, record_upstream_request
+from generic_chooser.pagination import LimitOffsetPagination
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class APIError(Exception):
+    """
+    An upstream API returned an error response (other than a 404 for an item that does not exist)
+    or an unexpected response
+    """
+    pass
+
+
+def iter_text(byte_chunks, encoding='utf-8'):
+    """
+    Decode an iterable of byte strings into text, handling multi-byte characters that are split
+    across chunks
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+class JSONStreamReader:
+    """
+    Reads JSON tokens and values from an iterable of text chunks, buffering only as much of the
+    input as is needed to decode the current value
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def read_more(self):
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            return False
+
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character without consuming it, or None at the end
+        of the input
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return None
+
+    def expect(self, chars):
+        """
+        Consume the next non-whitespace character, which must be one of `chars`, and return it
+        """
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError(
+                "Expected one of %r in JSON stream, got %r" % (chars, char)
+            )
+        self.pos += 1
+        return char
+
+    def read_value(self):
+        """
+        Consume and return the next complete JSON value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.read_more():
+                    continue
+                raise
+
+            if end == len(self.buffer) and not self.exhausted and self.read_more():
+                # a number at the very end of the buffer may continue in the next chunk
+                continue
+
+            self.pos = end
+            return value
+
+
+def iter_json_list(chunks, key):
+    """
+    Given an iterable of text chunks making up a JSON object, yield the items of the list found
+    under the top-level key `key` (or the first of the keys found, if `key` is a tuple), without
+    holding the full document in memory. Top-level values appearing before the list are decoded
+    and discarded; reading stops at the end of the list.
+    """
+    keys = key if isinstance(key, tuple) else (key,)
+    reader = JSONStreamReader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        raise KeyError(key)
+
+    while True:
+        name = reader.read_value()
+        reader.expect(':')
+        if name in keys:
+            reader.expect('[')
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.read_value()
+                if reader.expect(',]') == ']':
+                    return
+        else:
+            reader.read_value()
+
+        if reader.expect(',}') == '}':
+            raise KeyError(key)
+
+
+def api_request(method, url, **kwargs):
+    """
+    Make an HTTP request to an upstream API through the `requests` library, recording it in the
+    chooser metrics
+    """
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        response = getattr(requests, method)(url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        record_upstream_request(method.upper(), status, time.perf_counter() - start)
+
+
+def api_get(url, **kwargs):
+    return api_request('get', url, **kwargs)
+
+
+def api_post(url, **kwargs):
+    return api_request('post', url, **kwargs)
+
+
+# shared between all upstream GET requests in the process, for coalescing identical requests
+upstream_single_flight = SingleFlight()
+
+
+def get_json(url, params=None, revalidate_timeout=None, timeout=None):
+    """
+    Make a GET request to an upstream API and return a (status_code, data) tuple of the decoded
+    JSON response. timeout is passed on to `requests` as the connect / read timeout in seconds.
+    If revalidate_timeout is given, successful responses carrying an ETag or
+    Last-Modified header are stored in the cache for that many seconds along with those
+    validators, and subsequent requests for the same URL send If-None-Match / If-Modified-Since
+    headers so that the stored response can be reused if the upstream replies 304 Not Modified.
+
+    Concurrent calls with the same arguments within a process share a single upstream request,
+    and receive the same data object, which should therefore not be modified.
+    """
+    key = (url, json.dumps(params, sort_keys=True, default=str), revalidate_timeout)
+    result, shared = upstream_single_flight.do_with_status(
+        key, lambda: _get_json(url, params, revalidate_timeout, timeout)
+    )
+    record_cache_lookup('upstream_single_flight', shared)
+    return result
+
+
+def _get_json(url, params, revalidate_timeout, timeout):
+    if revalidate_timeout is None:
+        response = api_get(url, params=params, timeout=timeout)
+        return response.status_code, response.json()
+
+    cache_key = make_cache_key('api-response', url, sorted((params or {}).items()))
+    stored = cache.get(cache_key)
+
+    headers = {}
+    if stored is not None:
+        if stored['etag']:
+            headers['If-None-Match'] = stored['etag']
+        if stored['last_modified']:
+            headers['If-Modified-Since'] = stored['last_modified']
+
+    response = api_get(url, params=params, headers=headers, timeout=timeout)
+
+    if stored is not None:
+        record_cache_lookup('revalidation', response.status_code == 304)
+        if response.status_code == 304:
+            cache.touch(cache_key, revalidate_timeout)
+            return 200, stored['data']
+
+    data = response.json()
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if response.status_code == 200 and (etag or last_modified):
+        cache.set(cache_key, {
+            'etag': etag,
+            'last_modified': last_modified,
+            'data': data,
+        }, revalidate_timeout)
+
+    return response.status_code, data
+
+
+# marker stored in the item cache for IDs that the API reported as not found
+NOT_FOUND = 'generic_chooser:not-found'
+
+
+class APIItemCache:
+    """
+    Cache of item details returned by API endpoints, keyed by endpoint URL, item ID and the list
+    of fields requested (if any). Items are stored in Django's cache backend so that they are
+    shared between processes, with a short-lived in-process cache in front of it to avoid a cache
+    round trip for repeated lookups.
+    """
+    def __init__(self, local_max_entries=1000, local_timeout=10):
+        self.local_cache = LocalCache(max_entries=local_max_entries)
+        self.local_timeout = local_timeout
+
+    def make_key(self, api_base_url, id, fields=None):
+        if fields:
+            return make_cache_key('api-item', api_base_url, str(id), list(fields))
+        return make_cache_key('api-item', api_base_url, str(id))
+
+    def get(self, api_base_url, id, fields=None):
+        """
+        Return the cached item, NOT_FOUND if the item is cached as not found, or None if there is
+        no cache entry
+        """
+        key = self.make_key(api_base_url, id, fields)
+        item = self.local_cache.get(key)
+        if item is None:
+            item = cache.get(key)
+            if item is not None:
+                self.local_cache.set(key, item, self.local_timeout)
+        return item
+
+    def set(self, api_base_url, id, item, timeout, fields=None):
+        key = self.make_key(api_base_url, id, fields)
+        cache.set(key, item, timeout)
+        self.local_cache.set(key, item, min(timeout, self.local_timeout))
+
+    def set_many(self, api_base_url, items, timeout, fields=None):
+        """
+        Store a list of item dicts, as found in an API listing response
+        """
+        entries = {
+            self.make_key(api_base_url, item['id'], fields): item for item in items if 'id' in item
+        }
+        cache.set_many(entries, timeout)
+        for key, item in entries.items():
+            self.local_cache.set(key, item, min(timeout, self.local_timeout))
+
+    def clear_local(self):
+        self.local_cache.clear()
+
+
+item_cache = APIItemCache()
+
+
+def get_fields_parameter(fields):
+    """
+    Return the query parameters for requesting the given list of fields, in the style of Wagtail's
+    API (where '_' excludes the default fields). The id field is always requested, as choosers
+    depend on it.
+    """
+    if not fields:
+        return {}
+
+    fields = list(fields)
+    if 'id' not in fields:
+        fields.append('id')
+    return {'fields': ','.join(fields)}
+
+
+def fetch_api_item(
+    api_base_url, id, cache_timeout=None, not_found_cache_timeout=None, revalidate_timeout=None,
+    fields=None,
+):
+    """
+    Retrieve the item with the given ID from the detail endpoint under api_base_url, raising
+    ObjectDoesNotExist if it does not exist. If cache_timeout is given, the item is looked up in
+    and stored to item_cache; if not_found_cache_timeout is also given, 'not found' responses are
+    cached for that many seconds. revalidate_timeout is passed on to get_json. If fields is given,
+    only those fields are requested from the API.
+    """
+    if cache_timeout is not None:
+        item = item_cache.get(api_base_url, id, fields)
+        record_cache_lookup('api_item', item is not None)
+        if item == NOT_FOUND:
+            raise ObjectDoesNotExist("Item %s not found (cached)" % id)
+        elif item is not None:
+            return item
+
+    url = '%s%s/' % (api_base_url, quote(id))
+    params = {'format': 'json', **get_fields_parameter(fields)}
+    status_code, result = get_json(url, params=params, revalidate_timeout=revalidate_timeout)
+
+    if status_code == 404:
+        if cache_timeout is not None and not_found_cache_timeout:
+            item_cache.set(api_base_url, id, NOT_FOUND, not_found_cache_timeout, fields)
+        raise ObjectDoesNotExist("No item found at %s" % url)
+    elif status_code >= 400 or 'id' not in result:
+        # other errors say nothing about whether the item exists, so must not be reported as
+        # ObjectDoesNotExist
+        raise APIError("%s returned an unexpected response (HTTP %d)" % (url, status_code))
+
+    if cache_timeout is not None:
+        item_cache.set(api_base_url, id, result, cache_timeout, fields)
+
+    return result
+
+
+def fetch_api_items(
+    api_base_url, ids, bulk_lookup_parameter=None, cache_timeout=None, not_found_cache_timeout=None,
+    revalidate_timeout=None, fields=None, pagination=None,
+):
+    """
+    Retrieve the items with the given IDs from the API at api_base_url, returning a dict mapping
+    IDs (as strings) to items, and omitting IDs that do not exist. If bulk_lookup_parameter is
+    given, items that are not already cached are fetched in a single request to the listing
+    endpoint, passing a comma-separated list of IDs as that parameter; otherwise they are fetched
+    from their individual detail endpoints. `pagination` is the strategy (from
+    generic_chooser.pagination) for requesting the listing and reading its items, by default
+    LimitOffsetPagination.
+    """
+    ids = list(dict.fromkeys(str(id) for id in ids))
+    items = {}
+
+    if not bulk_lookup_parameter:
+        for id in ids:
+            try:
+                items[id] = fetch_api_item(
+                    api_base_url, id,
+                    cache_timeout=cache_timeout, not_found_cache_timeout=not_found_cache_timeout,
+                    revalidate_timeout=revalidate_timeout, fields=fields,
+                )
+            except ObjectDoesNotExist:
+                pass
+        return items
+
+    uncached_ids = []
+    for id in ids:
+        if cache_timeout is not None:
+            item = item_cache.get(api_base_url, id, fields)
+            record_cache_lookup('api_item', item is not None)
+            if item == NOT_FOUND:
+                continue
+            elif item is not None:
+                items[id] = item
+                continue
+        uncached_ids.append(id)
+
+    if uncached_ids:
+        if pagination is None:
+            pagination = LimitOffsetPagination(None)
+        params = {
+            'format': 'json',
+            bulk_lookup_parameter: ','.join(uncached_ids),
+            **pagination.get_range_parameters(0, len(uncached_ids)),
+            **get_fields_parameter(fields),
+        }
+        status_code, result = get_json(
+            api_base_url, params=params, revalidate_timeout=revalidate_timeout
+        )
+        result_items = None
+        if status_code < 400:
+            try:
+                result_items = pagination.get_items(result)
+            except (KeyError, TypeError):
+                pass
+        if result_items is None:
+            raise APIError(
+                "%s returned an unexpected response (HTTP %d)" % (api_base_url, status_code)
+            )
+        for item in result_items:
+            items[str(item['id'])] = item
+
+        if cache_timeout is not None:
+            item_cache.set_many(api_base_url, result_items, cache_timeout, fields)
+
+    return items
+
+
+# Choosers federating several APIs identify items by IDs of the form 'endpoint_name:id', where
+# endpoint_name is a key of their api_endpoints dict
+
+
+def make_federated_id(endpoint_name, id):
+    return '%s:%s' % (endpoint_name, id)
+
+
+def parse_federated_id(api_endpoints, federated_id):
+    """
+    Return an (endpoint_name, id) tuple for the given federated ID, raising ObjectDoesNotExist if
+    it does not refer to one of the given endpoints
+    """
+    endpoint_name, sep, id = str(federated_id).partition(':')
+    if not sep or endpoint_name not in api_endpoints:
+        raise ObjectDoesNotExist("%r is not a valid item ID" % federated_id)
+    return (endpoint_name, id)
+
+
+def federate_item(endpoint_name, item):
+    """
+    Return a copy of the given API item with its ID replaced by the federated ID
+    """
+    return dict(item, id=make_federated_id(endpoint_name, item['id']))
+
+
+def fetch_federated_item(api_endpoints, federated_id, **kwargs):
+    """
+    Retrieve the item with the given federated ID from its endpoint, as for fetch_api_item
+    """
+    endpoint_name, id = parse_federated_id(api_endpoints, federated_id)
+    item = fetch_api_item(api_endpoints[endpoint_name], id, **kwargs)
+    return federate_item(endpoint_name, item)
+
+
+def fetch_federated_items(api_endpoints, federated_ids, **kwargs):
+    """
+    Retrieve the items with the given federated IDs, as for fetch_api_items, with one lookup per
+    endpoint
+    """
+    ids_by_endpoint = {}
+    for federated_id in federated_ids:
+        try:
+            endpoint_name, id = parse_federated_id(api_endpoints, federated_id)
+        except ObjectDoesNotExist:
+            continue
+        ids_by_endpoint.setdefault(endpoint_name, []).append(id)
+
+    items = {}
+    for endpoint_name, ids in ids_by_endpoint.items():
+        for item in fetch_api_items(api_endpoints[endpoint_name], ids, **kwargs).values():
+            item = federate_item(endpoint_name, item)
+            items[item['id']] = item
+    return items
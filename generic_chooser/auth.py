@@ -0,0 +1,41 @@
+import functools
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.cache import add_never_cache_headers
+from django.utils.timezone import override as override_tz
+from django.utils.translation import override
+from wagtail.admin.auth import reject_request
+from wagtail.users.models import UserProfile
+
+
+def require_admin_access_async(view_func):
+    """
+    Counterpart of Wagtail's require_admin_access decorator for async views, which cannot be
+    registered under the Wagtail admin's URLs as its decorators only support sync views. Checks
+    that the user has admin access, activates their preferred language and time zone, and marks
+    the response as uncacheable.
+    """
+    if not iscoroutinefunction(view_func):
+        view_func = sync_to_async(view_func)
+
+    @functools.wraps(view_func)
+    async def decorated_view(request, *args, **kwargs):
+        user = await request.auser()
+        # replace the lazy request.user, which would query the database synchronously when first
+        # accessed, so that views can read it (for example, for rate limits and recent choices)
+        request.user = user
+        if user.is_anonymous or not await user.ahas_perms(["wagtailadmin.access_admin"]):
+            return reject_request(request)
+
+        profile = await UserProfile.objects.filter(user=user).afirst()
+        if profile is None:
+            profile = UserProfile(user=user)
+
+        with override_tz(profile.get_current_time_zone()):
+            with override(profile.get_preferred_language()):
+                response = await view_func(request, *args, **kwargs)
+
+        add_never_cache_headers(response)
+        return response
+
+    return decorated_view
@@ -0,0 +1,127 @@
+import copy
+
+from django import forms
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from wagtail import blocks
+
+# Widget instances shared between all ChooserBlocks using the same widget class, so that telepath
+# packs the widget once per page rather than once per block
+_shared_widgets = {}
+
+
+def get_shared_widget(widget_class, is_required):
+    key = (widget_class, is_required)
+    try:
+        return _shared_widgets[key]
+    except KeyError:
+        widget = widget_class()
+        widget.is_required = is_required
+        return _shared_widgets.setdefault(key, widget)
+
+
+class ChooserBlock(blocks.FieldBlock):
+    """
+    A StreamField block for choosing an item through an AdminChooser widget (including DRFChooser
+    and other non-model choosers). The value of the block is the instance returned by the widget's
+    get_instance method, and is stored as its ID. When a stream is loaded, all occurrences of the
+    block are resolved together through the widget's get_instances method.
+
+    `chooser` is the widget class or its dotted path; a widget instance may also be passed, but
+    will not be preserved in migrations.
+    """
+    def __init__(self, chooser=None, required=True, help_text=None, validators=(), **kwargs):
+        self._chooser = chooser
+        self._required = required
+        self._help_text = help_text
+        self._validators = validators
+        super().__init__(**kwargs)
+
+    @cached_property
+    def widget(self):
+        chooser = self._chooser
+        if isinstance(chooser, str):
+            chooser = import_string(chooser)
+
+        if isinstance(chooser, type):
+            return get_shared_widget(chooser, self._required)
+        else:
+            return chooser
+
+    @cached_property
+    def field(self):
+        if self.widget.model is not None:
+            field = forms.ModelChoiceField(
+                queryset=self.widget.model.objects.all(),
+                required=self._required,
+                validators=self._validators,
+                help_text=self._help_text,
+            )
+        else:
+            field = forms.Field(
+                required=self._required,
+                validators=self._validators,
+                help_text=self._help_text,
+            )
+
+        # Form fields take a copy of the widget passed to them; assign it afterwards instead, to
+        # keep the widget shared between blocks
+        field.widget = self.widget
+        return field
+
+    def to_python(self, value):
+        # the incoming serialised value should be None or an ID
+        return self.bulk_to_python([value])[0]
+
+    def bulk_to_python(self, values):
+        """
+        Return the instances for the given list of IDs, in the same order and keeping None values
+        """
+        instances = self.widget.get_instances([value for value in values if value is not None])
+        seen_ids = set()
+        result = []
+
+        for value in values:
+            instance = None if value is None else instances.get(str(value))
+            if instance is not None and str(value) in seen_ids:
+                # this instance is already in the result list, so make a copy
+                instance = copy.copy(instance)
+
+            result.append(instance)
+            seen_ids.add(str(value))
+
+        return result
+
+    def normalize(self, value):
+        if value is None or self.widget.is_instance(value):
+            return value
+        else:
+            return self.to_python(value)
+
+    def get_prep_value(self, value):
+        # the native value (an instance or None) should serialise to an ID or None
+        if value is None or not self.widget.is_instance(value):
+            return value
+        else:
+            return self.widget.get_instance_value(value)
+
+    def value_from_form(self, value):
+        # ModelChoiceField returns an instance, while non-model choosers return the raw ID
+        if value in (None, '') or self.widget.is_instance(value):
+            return value or None
+        else:
+            return self.to_python(value)
+
+    def get_form_state(self, value):
+        return self.widget.get_value_data(value)
+
+    def clean(self, value):
+        # the form field expects an ID rather than an instance
+        return super().clean(self.get_prep_value(value))
+
+    def extract_references(self, value):
+        if value is not None and self.widget.model is not None:
+            yield self.widget.model, str(value.pk), "", ""
+
+    class Meta:
+        icon = "placeholder"
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+KEY_PREFIX = 'generic_chooser'
+
+
+def make_cache_key(*parts):
+    """
+    Build a cache key from the given parts. Parts may be any JSON-serialisable value; anything
+    other than a short string or number is hashed to keep the key within memcached's limits.
+    """
+    key_parts = [KEY_PREFIX]
+    for part in parts:
+        if isinstance(part, (int, float)) or (isinstance(part, str) and len(part) <= 64):
+            key_parts.append(str(part))
+        else:
+            serialised = json.dumps(part, sort_keys=True, default=str)
+            key_parts.append(hashlib.md5(serialised.encode('utf-8')).hexdigest())
+
+    return ':'.join(key_parts)
+
+
+def get_generation(name):
+    """
+    Return the current data generation for the given name - a value that changes whenever
+    bump_generation is called, so that it can be used as part of a cache key to invalidate
+    everything cached against the previous generation.
+    """
+    key = make_cache_key('generation', name)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from a time-based value rather than zero, so that if the counter is evicted from
+        # the cache we do not go back to a generation that may still have entries cached against it
+        generation = int(time.time() * 1000)
+        cache.add(key, generation, None)
+        generation = cache.get(key, generation)
+
+    return generation
+
+
+def bump_generation(name):
+    key = make_cache_key('generation', name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # key is missing from the cache
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def get_model_generation_name(model):
+    return 'model:%s' % model._meta.label_lower
+
+
+_tracked_models = set()
+
+
+def _bump_tracked_model_generations(sender, instance, **kwargs):
+    # Check against the instance rather than the sender, so that saving an instance of a
+    # subclass (such as a specific page type) invalidates data cached for the parent model
+    for model in _tracked_models:
+        if isinstance(instance, model):
+            bump_generation(get_model_generation_name(model))
+
+
+def track_model_changes(model):
+    """
+    Bump the data generation of the given model whenever an instance of it is saved or deleted.
+    Changes that bypass model signals, such as QuerySet.update, are not detected, so data cached
+    against the generation should also be given a timeout.
+    """
+    _tracked_models.add(model)
+    post_save.connect(_bump_tracked_model_generations, dispatch_uid='generic_chooser_post_save')
+    post_delete.connect(_bump_tracked_model_generations, dispatch_uid='generic_chooser_post_delete')
+
+
+class LocalCache:
+    """
+    A thread-safe in-process cache holding up to max_entries items, evicting the least recently
+    used item when full
+    """
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                return default
+
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def parse_rate(rate):
+    """
+    Parse a rate string such as '60/m' into a (number of requests, period in seconds) tuple. The
+    period may be given as 's', 'm', 'h' or 'd', or any word starting with one of those letters.
+    """
+    num, period = rate.split('/')
+    return int(num), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period.strip()[0]]
+
+
+class TokenBucket:
+    """
+    A rate limiter allowing an average of `rate` (as accepted by parse_rate) requests per key, with
+    bursts of up to `burst` requests (defaulting to the number of requests in the rate). State is
+    held in Django's cache backend, so that limits apply across processes; concurrent requests for
+    the same key may occasionally both be allowed, which is acceptable for throttling purposes.
+    """
+    def __init__(self, rate, burst=None):
+        num_requests, period = parse_rate(rate)
+        self.refill_rate = num_requests / period
+        self.capacity = burst or num_requests
+
+    def consume(self, key):
+        """
+        Take a token from the bucket for the given key. Return 0 if successful, or the number of
+        seconds until a token will be available otherwise.
+        """
+        cache_key = make_cache_key('token-bucket', key)
+        now = time.time()
+        tokens, last_time = cache.get(cache_key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last_time) * self.refill_rate)
+
+        if tokens >= 1:
+            wait = 0
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.refill_rate
+
+        # the bucket is full again (equivalent to having no entry) after this time
+        timeout = int((self.capacity - tokens) / self.refill_rate) + 1
+        cache.set(cache_key, (tokens, now), timeout)
+        return wait
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls within a process: while a call for a given key is in progress, other
+    callers with the same key wait for it to finish and receive its result (or exception) rather
+    than repeating the work.
+    """
+    class Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        return self.do_with_status(key, func)[0]
+
+    def do_with_status(self, key, func):
+        """
+        As do(), but returns a (result, shared) tuple where shared is True if the result came from
+        another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = self.Call()
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result, False
+
+
+class AsyncSingleFlight:
+    """
+    Counterpart of SingleFlight for coroutines: while a call for a given key is in progress in an
+    event loop, other callers in the same loop with the same key await its result rather than
+    repeating the work.
+    """
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, func):
+        """
+        Return the result of awaiting func(), or of the call already in progress for this key
+        """
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = self._tasks[task_key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda task: self._tasks.pop(task_key, None))
+
+        # a caller being cancelled must not cancel the call for the others
+        return await asyncio.shield(task)
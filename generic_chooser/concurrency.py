@@ -0,0 +1,79 @@
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.db import close_old_connections, connections
+
+# Maximum number of threads shared between all concurrent chooser lookups in the process
+MAX_WORKERS = 16
+
+# Maximum number of threads for background create jobs. These are kept in a pool of their own, so
+# that slow jobs cannot hold up lookups, or the other way round.
+MAX_JOB_WORKERS = 4
+
+_executor = None
+_job_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix='generic_chooser'
+            )
+        return _executor
+
+
+def get_job_executor():
+    global _job_executor
+    with _executor_lock:
+        if _job_executor is None:
+            _job_executor = ThreadPoolExecutor(
+                max_workers=MAX_JOB_WORKERS, thread_name_prefix='generic_chooser_jobs'
+            )
+        return _job_executor
+
+
+def in_transaction():
+    """
+    Return True if a database transaction is open in the current thread. Other threads use their
+    own connections, so would not see changes made within it.
+    """
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def _call_with_connections(func):
+    # As for a request, close the thread's database connections before and after the call if they
+    # are unusable or older than CONN_MAX_AGE, so that persistent connections are reused by later
+    # calls in the same thread
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def call_in_background(func, executor=None):
+    """
+    Call the given function in a thread from the shared pool (or the given executor), in a copy of
+    the caller's context variables, returning a future without waiting for it to finish
+    """
+    return (executor or get_executor()).submit(
+        contextvars.copy_context().run, functools.partial(_call_with_connections, func)
+    )
+
+
+def call_concurrently(funcs, timeout=None):
+    """
+    Call each of the given functions in a thread from a shared pool, and wait for them to finish,
+    or for `timeout` seconds to pass. Returns a list of futures in the same order as `funcs`;
+    calls still running at the timeout are left to finish in the background, and their futures
+    are not done. Each call runs in a copy of the caller's context variables, so that (for
+    example) metrics are labelled with the current viewset.
+    """
+    futures = [call_in_background(func) for func in funcs]
+    wait(futures, timeout=timeout)
+    return futures
@@ -0,0 +1,42 @@
+import uuid
+
+from django.core.cache import cache
+
+from generic_chooser.cache import make_cache_key
+
+
+class CreateJob:
+    """
+    The state of a create form submission being processed in the background. The state is held in
+    Django's cache, so that the chooser modal's polling requests can be answered by any process,
+    and is only visible to the user who submitted the form.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    def __init__(self, job_id, user_id, timeout=None):
+        self.id = job_id
+        self.key = make_cache_key('create-job', job_id, str(user_id))
+        self.timeout = timeout
+
+    @classmethod
+    def start(cls, user_id, timeout=None):
+        """
+        Create a new job in the pending state
+        """
+        job = cls(uuid.uuid4().hex, user_id, timeout=timeout)
+        job.save(cls.PENDING)
+        return job
+
+    def save(self, status, result=None):
+        """
+        Record the job's status, along with the chosen response data once it is done
+        """
+        cache.set(self.key, {'status': status, 'result': result}, self.timeout)
+
+    def load(self):
+        """
+        Return a dict of the job's status and result, or None if the job is unknown or has expired
+        """
+        return cache.get(self.key)
@@ -0,0 +1,277 @@
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import include, path, set_urlconf
+from django.utils.module_loading import import_string
+
+from generic_chooser.views import DRFChooserViewSet
+from generic_chooser.widgets import DRFChooser
+
+OPERATIONS = ['choose', 'search', 'page', 'chosen', 'widget']
+
+
+class StubAPIRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves a listing endpoint at / and detail endpoints at /<id>/, in the response format of
+    Wagtail's API (as expected by DRFChooserMixin)
+    """
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < server.error_rate:
+            return self.send_json(500, {'message': "Stub API error"})
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        path_parts = [part for part in url.path.split('/') if part]
+
+        if not path_parts:
+            items = server.items
+            search = params.get('search', [None])[0]
+            if search:
+                items = [item for item in items if search.lower() in item['title'].lower()]
+
+            offset = int(params.get('offset', [0])[0])
+            limit = int(params.get('limit', [len(items)])[0])
+            return self.send_json(200, {
+                'meta': {'total_count': len(items)},
+                'items': items[offset:offset + limit],
+            })
+
+        try:
+            item = server.items_by_id[int(path_parts[0])]
+        except (ValueError, KeyError):
+            return self.send_json(404, {'message': "Not found."})
+
+        return self.send_json(200, item)
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    """
+    A local stand-in for a Wagtail / Django REST Framework API endpoint, with configurable
+    response latency and error rate
+    """
+    daemon_threads = True
+
+    def __init__(self, item_count=1000, latency=0, jitter=0, error_rate=0):
+        super().__init__(('127.0.0.1', 0), StubAPIRequestHandler)
+        self.items = [
+            {
+                'id': i,
+                'meta': {'type': 'stub.Item'},
+                'title': "Item %d" % i,
+            }
+            for i in range(1, item_count + 1)
+        ]
+        self.items_by_id = {item['id']: item for item in self.items}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    @property
+    def base_url(self):
+        return 'http://%s:%d/' % self.server_address
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def percentile(sorted_values, pct):
+    # nearest-rank percentile
+    if not sorted_values:
+        return 0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the throughput of a Django REST Framework-based chooser by rendering its views "
+        "and widget concurrently against a local stub API"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--viewset', default=None,
+            help=(
+                "Dotted path to a DRFChooserViewSet subclass to test; its api_base_url is "
+                "replaced with the stub API. Defaults to a plain DRFChooserViewSet."
+            )
+        )
+        parser.add_argument('--concurrency', type=int, default=10, help="Number of concurrent workers")
+        parser.add_argument('--requests', type=int, default=500, help="Total number of operations to run")
+        parser.add_argument('--items', type=int, default=1000, help="Number of items served by the stub API")
+        parser.add_argument('--per-page', type=int, default=20, help="Chooser listing page size")
+        parser.add_argument('--latency', type=float, default=50, help="Stub API response latency, in milliseconds")
+        parser.add_argument('--jitter', type=float, default=0, help="Random extra stub API latency, in milliseconds")
+        parser.add_argument('--error-rate', type=float, default=0, help="Fraction of stub API requests that fail")
+        parser.add_argument(
+            '--operations', default=','.join(OPERATIONS),
+            help="Comma-separated list of operations to run, from: %s" % ', '.join(OPERATIONS)
+        )
+
+    def handle(self, **options):
+        operations = [op.strip() for op in options['operations'].split(',') if op.strip()]
+        for op in operations:
+            if op not in OPERATIONS:
+                raise CommandError("Unknown operation %r" % op)
+        if not operations:
+            raise CommandError("No operations specified")
+
+        server = StubAPIServer(
+            item_count=options['items'],
+            latency=options['latency'] / 1000,
+            jitter=options['jitter'] / 1000,
+            error_rate=options['error_rate'],
+        )
+        server.start()
+        try:
+            self.set_up(server, options)
+            results, elapsed = self.run(operations, options)
+        finally:
+            server.stop()
+
+        self.report(results, elapsed, server.request_count)
+
+    def set_up(self, server, options):
+        viewset_class = import_string(options['viewset']) if options['viewset'] else DRFChooserViewSet
+        self.item_count = options['items']
+        self.per_page = options['per_page']
+        self.viewset = type('LoadTestChooserViewSet', (viewset_class,), {
+            'api_base_url': server.base_url,
+            'title_field_name': getattr(viewset_class, 'title_field_name', None) or 'title',
+            'per_page': self.per_page,
+            'is_searchable': True,
+            # edit views for the viewset's real data are not part of the load test URLconf
+            'edit_item_url_name': None,
+        })('chooser_loadtest', url_prefix='chooser-loadtest')
+
+        # The views reverse their own URLs, so they need to be reachable from a URLconf
+        self.urlconf = ModuleType('chooser_loadtest_urls')
+        self.urlconf.urlpatterns = [
+            path('chooser-loadtest/', include(
+                (self.viewset.get_urlpatterns(), self.viewset.url_namespace),
+                namespace=self.viewset.url_namespace,
+            )),
+        ]
+
+        self.choose_view = self.viewset.choose_view
+        self.chosen_view = self.viewset.chosen_view
+        self.widget = type('LoadTestChooser', (DRFChooser,), {
+            'api_base_url': server.base_url,
+            'choose_modal_url_name': self.viewset.get_url_name('choose'),
+            'get_title': lambda self, instance: instance['title'],
+        })()
+        self.request_factory = RequestFactory()
+
+    def make_request(self, path, params=None):
+        request = self.request_factory.get(path, params or {})
+        request.user = AnonymousUser()
+        return request
+
+    def run_operation(self, op):
+        # URLconf overrides are thread-local, so this needs to be set in each worker thread
+        set_urlconf(self.urlconf)
+        item_id = random.randint(1, self.item_count)
+        num_pages = max(1, math.ceil(self.item_count / self.per_page))
+
+        start = time.perf_counter()
+        try:
+            if op == 'choose':
+                response = self.choose_view(self.make_request('/chooser-loadtest/'))
+            elif op == 'search':
+                response = self.choose_view(self.make_request(
+                    '/chooser-loadtest/', {'q': str(item_id), 'results': 'true'}
+                ))
+            elif op == 'page':
+                response = self.choose_view(self.make_request(
+                    '/chooser-loadtest/', {'p': random.randint(1, num_pages), 'results': 'true'}
+                ))
+            elif op == 'chosen':
+                response = self.chosen_view(
+                    self.make_request('/chooser-loadtest/%d/' % item_id), str(item_id)
+                )
+            else:
+                value_data = self.widget.get_value_data(item_id)
+                if value_data.get('lookup_failed'):
+                    # rendered with the raw ID, as the item's details could not be retrieved
+                    raise Exception("Lookup failed")
+                self.widget.render_html('item', value_data, {'id': 'id_item'})
+                response = None
+
+            if response is not None and response.status_code >= 400:
+                raise Exception("HTTP %d" % response.status_code)
+        except Exception:
+            return (op, time.perf_counter() - start, False)
+        else:
+            return (op, time.perf_counter() - start, True)
+
+    def run(self, operations, options):
+        ops = [operations[i % len(operations)] for i in range(options['requests'])]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(self.run_operation, ops))
+        return results, time.perf_counter() - start
+
+    def report(self, results, elapsed, upstream_request_count):
+        by_op = defaultdict(list)
+        for op, duration, ok in results:
+            by_op[op].append((duration, ok))
+            by_op['all'].append((duration, ok))
+
+        self.stdout.write(
+            "%-8s %8s %8s %10s %9s %9s %9s %9s" % (
+                "op", "count", "errors", "req/s", "p50 ms", "p90 ms", "p99 ms", "max ms"
+            )
+        )
+        for op in [op for op in OPERATIONS if op in by_op] + ['all']:
+            durations = sorted(duration * 1000 for duration, ok in by_op[op])
+            errors = len([ok for duration, ok in by_op[op] if not ok])
+            self.stdout.write(
+                "%-8s %8d %8d %10.1f %9.1f %9.1f %9.1f %9.1f" % (
+                    op, len(durations), errors, len(durations) / elapsed,
+                    percentile(durations, 50), percentile(durations, 90),
+                    percentile(durations, 99), durations[-1] if durations else 0,
+                )
+            )
+
+        self.stdout.write(
+            "Completed %d operations in %.2fs; %d upstream API requests (%.1f/s)" % (
+                len(results), elapsed, upstream_request_count, upstream_request_count / elapsed
+            )
+        )
@@ -0,0 +1,222 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+# Name of the chooser viewset handling the current request, when metrics are enabled for it.
+# Used to label metrics recorded outside of the views, such as upstream API calls.
+current_viewset = contextvars.ContextVar('generic_chooser_metrics_viewset', default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, escape_label_value(value)) for name, value in labels
+    )
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get_label_values(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def samples(self, label_filter=None):
+        """
+        Yield (name, labels, value) tuples, where labels is a list of (name, value) pairs. If
+        label_filter is given, only series whose labels include all of its items are included.
+        """
+        with self._lock:
+            values = list(self._values.items())
+
+        for label_values, value in sorted(values):
+            labels = list(zip(self.label_names, label_values))
+            if label_filter and not all(item in labels for item in label_filter.items()):
+                continue
+            yield from self.get_samples(labels, value)
+
+    def get_samples(self, labels, value):
+        yield (self.name, labels, value)
+
+    def render(self, label_filter=None):
+        lines = [
+            '# HELP %s %s' % (self.name, self.documentation),
+            '# TYPE %s %s' % (self.name, self.type_name),
+        ]
+        for name, labels, value in self.samples(label_filter):
+            lines.append('%s%s %s' % (name, format_labels(labels), format_value(value)))
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.get_label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self.get_label_values(labels), 0)
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, label_names, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.get_label_values(labels)
+        with self._lock:
+            try:
+                counts, total = self._values[key]
+            except KeyError:
+                counts, total = [0] * (len(self.buckets) + 1), 0
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def get_samples(self, labels, value):
+        counts, total = value
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield (self.name + '_bucket', labels + [('le', format_value(float(bound)))], cumulative)
+        yield (self.name + '_sum', labels, total)
+        yield (self.name + '_count', labels, cumulative)
+
+
+class MetricsRegistry:
+    """
+    A collection of metrics held in process memory, rendered in the Prometheus text exposition
+    format. Each process keeps its own values, so in a multi-process deployment each process must
+    be scraped separately (or the values aggregated by the monitoring system).
+    """
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, label_names, buckets=buckets))
+
+    def render(self, **label_filter):
+        return '\n'.join(metric.render(label_filter) for metric in self.metrics) + '\n'
+
+
+registry = MetricsRegistry()
+
+requests_total = registry.counter(
+    'generic_chooser_requests_total', "Chooser requests handled",
+    ('viewset', 'view_type', 'status'),
+)
+request_duration_seconds = registry.histogram(
+    'generic_chooser_request_duration_seconds', "Time taken to handle chooser requests",
+    ('viewset', 'view_type'),
+)
+errors_total = registry.counter(
+    'generic_chooser_errors_total', "Unhandled exceptions raised by chooser requests",
+    ('viewset', 'view_type', 'error'),
+)
+cache_lookups_total = registry.counter(
+    'generic_chooser_cache_lookups_total', "Lookups in chooser caches, by result (hit or miss)",
+    ('viewset', 'cache', 'result'),
+)
+upstream_requests_total = registry.counter(
+    'generic_chooser_upstream_requests_total', "HTTP requests made to upstream APIs",
+    ('viewset', 'method', 'status'),
+)
+upstream_request_duration_seconds = registry.histogram(
+    'generic_chooser_upstream_request_duration_seconds', "Time taken by HTTP requests to upstream APIs",
+    ('viewset', 'method'),
+)
+
+
+def record_cache_lookup(cache_name, hit):
+    viewset = current_viewset.get()
+    if viewset is not None:
+        cache_lookups_total.inc(viewset=viewset, cache=cache_name, result='hit' if hit else 'miss')
+
+
+def record_upstream_request(method, status, duration):
+    viewset = current_viewset.get()
+    if viewset is not None:
+        upstream_requests_total.inc(viewset=viewset, method=method, status=status)
+        upstream_request_duration_seconds.observe(duration, viewset=viewset, method=method)
+
+
+class RequestMetrics:
+    """
+    Context manager that labels metrics recorded within it with the given viewset name, and
+    records the request count, duration and any unhandled exception on exit. The view sets
+    `status` to the response's status code.
+    """
+    def __init__(self, viewset, get_view_type):
+        self.viewset = viewset
+        self.get_view_type = get_view_type
+        self.status = None
+
+    def __enter__(self):
+        self.token = current_viewset.set(self.viewset)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        duration = time.perf_counter() - self.start_time
+        current_viewset.reset(self.token)
+
+        view_type = self.get_view_type()
+        status = self.status
+        if exc_type is not None:
+            # Http404 and PermissionDenied are turned into responses by Django, rather than being
+            # errors
+            if issubclass(exc_type, Http404):
+                status = 404
+            elif issubclass(exc_type, PermissionDenied):
+                status = 403
+            else:
+                status = 500
+                errors_total.inc(viewset=self.viewset, view_type=view_type, error=exc_type.__name__)
+
+        requests_total.inc(viewset=self.viewset, view_type=view_type, status=status)
+        request_duration_seconds.observe(duration, viewset=self.viewset, view_type=view_type)
+
+
+def metrics_view(request, viewset=None):
+    """
+    Serve the current metric values in the Prometheus text format, optionally restricted to a
+    single viewset
+    """
+    label_filter = {'viewset': viewset} if viewset is not None else {}
+    return HttpResponse(
+        registry.render(**label_filter), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
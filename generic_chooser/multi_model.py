@@ -0,0 +1,56 @@
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+
+# Helpers for choosers over several models, which identify objects by IDs of the form
+# 'app_label.model_name:pk'
+
+
+def get_source_name(model):
+    return model._meta.label_lower
+
+
+def make_object_id(instance):
+    return '%s:%s' % (get_source_name(type(instance)), instance.pk)
+
+
+def parse_object_id(models, object_id):
+    """
+    Return a (model, pk) tuple for the given object ID, raising ObjectDoesNotExist if it does not
+    refer to one of the given models
+    """
+    source_name, sep, pk = str(object_id).partition(':')
+    for model in models:
+        if sep and get_source_name(model) == source_name:
+            return (model, pk)
+
+    raise ObjectDoesNotExist("%r is not a valid object ID" % object_id)
+
+
+def get_object(models, object_id):
+    model, pk = parse_object_id(models, object_id)
+    try:
+        return model.objects.get(pk=pk)
+    except (ValueError, ValidationError):
+        raise model.DoesNotExist
+
+
+def get_objects(models, object_ids):
+    """
+    Return a dict mapping each of the given object IDs (as strings) to its instance, omitting any
+    that have no corresponding instance. Performs one query per model.
+    """
+    pks_by_model = {}
+    for object_id in object_ids:
+        try:
+            model, pk = parse_object_id(models, object_id)
+            # malformed IDs are treated as missing, rather than failing the model's whole query
+            pk = model._meta.pk.to_python(pk)
+        except (ObjectDoesNotExist, ValidationError):
+            continue
+        pks_by_model.setdefault(model, []).append(pk)
+
+    instances = {}
+    for model, pks in pks_by_model.items():
+        for instance in model.objects.in_bulk(pks).values():
+            instances[make_object_id(instance)] = instance
+
+    return instances
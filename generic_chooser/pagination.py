@@ -0,0 +1,203 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.core.paginator import Page, Paginator
+
+
+class APIPaginator(Paginator):
+    """
+    Customisation of Django's Paginator to give us access to the page_range / num_pages
+    functionality needed by pagination UI, without having to use Paginator's
+    list-slicing logic - which isn't a good fit for API use, as it relies on knowing
+    the total count of results before deciding which slice to request.
+
+    Rather than instantiating it with a list/queryset and page number, we pass it the
+    full item count, which is sufficient for page_range / num_pages to work.
+    """
+    def __init__(self, count, per_page, **kwargs):
+        self._count = int(count)
+        super().__init__([], per_page, **kwargs)
+
+    @property
+    def count(self):
+        return self._count
+
+
+class APILinkPage:
+    """
+    A page of API results for listings without a known total count, which can only be navigated
+    to the next and previous pages. Provides the parts of Django's Page interface used by the
+    pagination nav; `number` is None where the API does not number its pages (as with cursors).
+    """
+    paginator = None
+
+    def __init__(self, object_list, number, next_page_token=None, previous_page_token=None):
+        self.object_list = object_list
+        self.number = number
+        self.next_page_token = next_page_token
+        self.previous_page_token = previous_page_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_page_token is not None
+
+    def has_previous(self):
+        return self.previous_page_token is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.next_page_token
+
+    def previous_page_number(self):
+        return self.previous_page_token
+
+
+class LimitOffsetPagination:
+    """
+    Pagination through `limit` and `offset` parameters, with the total count taken from the
+    response - `meta.total_count` as returned by Wagtail's API, or `count` as returned by Django
+    REST Framework's LimitOffsetPagination and PageNumberPagination
+    """
+    # whether responses report a total count, allowing the pagination nav to show the page range
+    # and the count to be cached (see count_cache_timeout)
+    has_count = True
+
+    # keys under which responses may list their items, in order of preference
+    items_keys = ('items', 'results')
+
+    def __init__(self, per_page):
+        self.per_page = per_page
+
+    def get_page_token(self, value):
+        """
+        Convert the value of the 'p' URL parameter (or None, for the first page) into the token
+        that get_parameters and get_page are called with
+        """
+        try:
+            page_number = int(value or 1)
+        except ValueError:
+            page_number = 1
+
+        return max(page_number, 1)
+
+    def get_parameters(self, page_token):
+        """
+        Return the API query parameters for requesting the given page
+        """
+        return self.get_range_parameters((page_token - 1) * self.per_page, self.per_page)
+
+    def get_range_parameters(self, offset, limit):
+        """
+        Return the API query parameters for requesting `limit` items starting at `offset`, for
+        requests that are not for a page of the listing (such as typeahead and bulk lookups)
+        """
+        return {'limit': limit, 'offset': offset}
+
+    def get_items(self, result):
+        for key in self.items_keys:
+            if key in result:
+                return result[key]
+        raise KeyError(self.items_keys[0])
+
+    def get_total_count(self, result):
+        try:
+            return result['meta']['total_count']
+        except KeyError:
+            return result['count']
+
+    def get_page(self, result, page_token, total_count=None):
+        """
+        Return the page (a Django Page or APILinkPage) for the given API response
+        """
+        paginator = APIPaginator(total_count, self.per_page)
+        return Page(self.get_items(result), page_token, paginator)
+
+
+class CountlessLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Pagination through `limit` and `offset` parameters for APIs that do not count their results
+    (or where counting is too slow). One item beyond the page is requested to find out whether
+    there is a next page, so the API's maximum limit must be greater than `per_page`.
+    """
+    has_count = False
+
+    def get_parameters(self, page_token):
+        params = super().get_parameters(page_token)
+        params['limit'] += 1
+        return params
+
+    def get_page(self, result, page_token, total_count=None):
+        items = self.get_items(result)
+        return APILinkPage(
+            items[:self.per_page], page_token,
+            next_page_token=page_token + 1 if len(items) > self.per_page else None,
+            previous_page_token=page_token - 1 if page_token > 1 else None,
+        )
+
+
+class CursorPagination:
+    """
+    Pagination through the opaque cursors in the `next` and `previous` links returned by Django
+    REST Framework's CursorPagination, which avoids both counting the results and OFFSET scans
+    through them. The cursor is passed through the chooser's 'p' URL parameter.
+    """
+    has_count = False
+
+    # name of the query parameter carrying the cursor, as CursorPagination.cursor_query_param
+    cursor_query_param = 'cursor'
+
+    # name of the query parameter setting the page size, as CursorPagination.page_size_query_param;
+    # if None, per_page should match the page size of the API
+    page_size_query_param = None
+
+    items_keys = ('results',)
+
+    def __init__(self, per_page):
+        self.per_page = per_page
+
+    def get_page_token(self, value):
+        return value or None
+
+    def get_parameters(self, page_token):
+        params = {}
+        if page_token:
+            params[self.cursor_query_param] = page_token
+        if self.page_size_query_param:
+            params[self.page_size_query_param] = self.per_page
+        return params
+
+    def get_range_parameters(self, offset, limit):
+        # cursors can only start at the beginning of the listing; without page_size_query_param,
+        # the API's page size applies
+        if offset:
+            raise ValueError("CursorPagination cannot request items from an offset")
+        params = {}
+        if self.page_size_query_param:
+            params[self.page_size_query_param] = limit
+        return params
+
+    def get_items(self, result):
+        return result['results']
+
+    def get_cursor(self, url):
+        if not url:
+            return None
+        query = parse_qs(urlparse(url).query)
+        # a link without a cursor leads back to the first page
+        return query.get(self.cursor_query_param, [''])[0]
+
+    def get_page(self, result, page_token, total_count=None):
+        return APILinkPage(
+            self.get_items(result), None,
+            next_page_token=self.get_cursor(result.get('next')),
+            previous_page_token=self.get_cursor(result.get('previous')),
+        )
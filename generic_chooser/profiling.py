@@ -0,0 +1,132 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger('generic_chooser.slow_requests')
+
+
+class RequestProfile:
+    """
+    Records the time spent in named phases of a request, along with the SQL statements executed
+    while capture() is active, for reporting requests that exceed a time threshold
+    """
+    def __init__(self):
+        self.start_time = None
+        self.end_time = None
+        self.phases = {}
+        self.queries = []
+        self.current_phase = None
+
+    @property
+    def duration(self):
+        end_time = self.end_time if self.end_time is not None else time.perf_counter()
+        return end_time - self.start_time
+
+    @contextmanager
+    def phase(self, name):
+        previous_phase = self.current_phase
+        self.current_phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+            self.current_phase = previous_phase
+
+    def make_execute_wrapper(self, alias):
+        def execute_wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'params': params,
+                    'many': many,
+                    'duration': time.perf_counter() - start,
+                    'phase': self.current_phase,
+                })
+
+        return execute_wrapper
+
+    @contextmanager
+    def capture(self):
+        self.start_time = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.make_execute_wrapper(connection.alias))
+                    )
+                yield self
+        finally:
+            self.end_time = time.perf_counter()
+
+    def explain_queries(self, limit):
+        """
+        Return a list of (query, plan) tuples for up to `limit` distinct SELECT statements captured,
+        slowest first, on databases that support EXPLAIN
+        """
+        seen = set()
+        candidates = []
+        for query in sorted(self.queries, key=lambda query: query['duration'], reverse=True):
+            if query['many'] or not query['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            key = (query['alias'], query['sql'], repr(query['params']))
+            if key not in seen:
+                seen.add(key)
+                candidates.append(query)
+
+        explained = []
+        for query in candidates[:limit]:
+            connection = connections[query['alias']]
+            if not connection.features.supports_explaining_query_execution:
+                continue
+
+            sql = '%s %s' % (connection.ops.explain_query_prefix(), query['sql'])
+            try:
+                # use a savepoint, so that a failure does not break an enclosing transaction
+                with transaction.atomic(using=query['alias']), connection.cursor() as cursor:
+                    cursor.execute(sql, query['params'])
+                    plan = '\n'.join(
+                        ' '.join(str(col) for col in row) for row in cursor.fetchall()
+                    )
+            except DatabaseError as e:
+                plan = "EXPLAIN failed: %s" % e
+
+            explained.append((query, plan))
+
+        return explained
+
+    def log(self, view_type, description, params, explain_limit=5):
+        """
+        Write a report of this profile to the generic_chooser.slow_requests logger
+        """
+        lines = [
+            "Slow chooser %s: %s took %.1fms" % (view_type, description, self.duration * 1000),
+            "Parameters: %r" % (params,),
+        ]
+        for name, duration in self.phases.items():
+            lines.append("Phase %s: %.1fms" % (name, duration * 1000))
+
+        lines.append("%d SQL queries, %.1fms total" % (
+            len(self.queries), sum(query['duration'] for query in self.queries) * 1000
+        ))
+        for query in self.queries:
+            lines.append("  [%.1fms, %s] %s; params=%r" % (
+                query['duration'] * 1000, query['phase'] or '-', query['sql'], query['params']
+            ))
+
+        plans = self.explain_queries(explain_limit) if explain_limit else []
+        for query, plan in plans:
+            lines.append("EXPLAIN %s\n%s" % (query['sql'], plan))
+
+        logger.warning('\n'.join(lines), extra={
+            'chooser_view_type': view_type,
+            'chooser_duration': self.duration,
+            'chooser_phases': dict(self.phases),
+            'chooser_query_count': len(self.queries),
+        })
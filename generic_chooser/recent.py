@@ -0,0 +1,66 @@
+import time
+
+from django.core.cache import cache
+
+from generic_chooser.cache import make_cache_key
+
+
+class RecentChoicesStore:
+    """
+    Records the items a user has chosen from a chooser, with the number of times each was chosen
+    and when it was last chosen, so that they can be offered again without a listing query. The
+    record is held in Django's cache backend as a single compact entry per user and chooser,
+    keeping up to max_items entries and dropping the least recently chosen beyond that.
+    """
+    def __init__(self, chooser_name, user_id, max_items=50, timeout=None):
+        self.key = make_cache_key('recent-choices', chooser_name, str(user_id))
+        self.max_items = max_items
+        self.timeout = timeout
+
+    def load(self):
+        """
+        Return a dict mapping item IDs to [title, choice count, last chosen timestamp] lists,
+        ordered from least to most recently chosen
+        """
+        return cache.get(self.key) or {}
+
+    def record(self, choices):
+        """
+        Record the given list of (id, title) tuples as having been chosen
+        """
+        if not choices:
+            return
+
+        entries = self.load()
+        now = int(time.time())
+        for id, title in choices:
+            # re-insert the entry so that it moves to the end, and store the latest title in case
+            # the item has been renamed
+            previous = entries.pop(id, None)
+            count = previous[1] if previous else 0
+            entries[id] = [title, count + 1, now]
+
+        if len(entries) > self.max_items:
+            entries = dict(list(entries.items())[-self.max_items:])
+
+        cache.set(self.key, entries, self.timeout)
+
+    def get_recent(self, limit, entries=None):
+        """
+        Return a list of (id, title) tuples for the most recently chosen items
+        """
+        entries = self.load() if entries is None else entries
+        ordered = list(reversed(entries.items()))
+        return [(id, title) for id, (title, count, last_chosen) in ordered[:limit]]
+
+    def get_frequent(self, limit, entries=None):
+        """
+        Return a list of (id, title) tuples for the most frequently chosen items, with ties broken
+        by recency
+        """
+        entries = self.load() if entries is None else entries
+        # sorting is stable, so equally frequent items remain in order of recency
+        ordered = sorted(
+            reversed(entries.items()), key=lambda item: item[1][1], reverse=True
+        )
+        return [(id, title) for id, (title, count, last_chosen) in ordered[:limit]]
@@ -0,0 +1,37 @@
+from django.core import signing
+
+# Helpers for the signed chosen-item state, which lets a chooser widget redisplay the title and
+# edit link returned by the chooser modal without looking the item up again
+
+
+def get_salt(choose_url_name):
+    # tokens are only valid for the chooser they were issued by
+    return 'generic_chooser.chosen_state:%s' % choose_url_name
+
+
+def sign_chosen_state(choose_url_name, value, title, edit_item_url):
+    """
+    Return a signed token recording the given value, title and edit URL of a chosen item
+    """
+    return signing.dumps(
+        [str(value), str(title), edit_item_url], salt=get_salt(choose_url_name), compress=True
+    )
+
+
+def load_chosen_state(choose_url_name, token, max_age=None):
+    """
+    Return a widget value_data dict (with 'value', 'title' and 'edit_item_url' keys) from the given
+    signed token, or None if the token is invalid or older than max_age seconds
+    """
+    try:
+        value, title, edit_item_url = signing.loads(
+            token, salt=get_salt(choose_url_name), max_age=max_age
+        )
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+    return {
+        'value': value,
+        'title': title,
+        'edit_item_url': edit_item_url,
+    }
@@ -1,3 +1,6 @@
+// number of times a failed request for a background create job's status is retried
+var CREATE_JOB_MAX_RETRIES = 5;
+
 GENERIC_CHOOSER_MODAL_ONLOAD_HANDLERS = {
     'choose': function(modal, jsonData) {
         var paginationUrl = $('.pagination', modal.body).data('action-url');
@@ -13,6 +16,11 @@ GENERIC_CHOOSER_MODAL_ONLOAD_HANDLERS = {
                 setPage(page);
                 return false;
             });
+
+            $('a.browse-link', context).on('click', function() {
+                browseTo(this.getAttribute('data-parent'));
+                return false;
+            });
         }
         ajaxifyLinks(modal.body);
         if ($('[data-wgc-tabs]', modal.body).length) {
@@ -20,80 +28,421 @@ GENERIC_CHOOSER_MODAL_ONLOAD_HANDLERS = {
         }
 
         var searchUrl = $('form.chooser-search', modal.body).attr('action');
+        var searchMinLength = parseInt($('form.chooser-search', modal.body).data('search-min-length'), 10) || 0;
         var searchRequest;
+        var requestCounter = 0;
 
-        function search() {
+        // ID of the node whose children are listed, when browsing a tree
+        var browseParent = $('#search-results', modal.body).data('browse-parent') || '';
+
+        // bounded cache of results HTML, keyed by (q, p), most recently used last; p is a page
+        // number, or an opaque token such as an API cursor
+        var resultsCacheSize = parseInt($('#search-results', modal.body).data('results-cache-size'), 10);
+        if (isNaN(resultsCacheSize)) {
+            resultsCacheSize = 20;
+        }
+        var resultsCache = new Map();
+
+        // the debounce delay adapts to recent response times, so that slow servers are not sent a
+        // request for every keystroke
+        var MIN_SEARCH_DELAY = 50;
+        var MAX_SEARCH_DELAY = 500;
+        var searchDelay = MIN_SEARCH_DELAY;
+
+        // cache key of the results currently displayed
+        var displayedKey = null;
+
+        function cacheKey(q, p) {
+            return JSON.stringify([q || '', String(p || 1), String(browseParent)]);
+        }
+
+        function getCachedResults(key) {
+            if (!resultsCache.has(key)) {
+                return null;
+            }
+            var html = resultsCache.get(key);
+            resultsCache.delete(key);
+            resultsCache.set(key, html);
+            return html;
+        }
+
+        function setCachedResults(key, html) {
+            // results missing some of their sources are not kept, so that they are requested again
+            if (resultsCacheSize <= 0 || html.indexOf('data-partial-results') !== -1) {
+                return;
+            }
+            resultsCache.delete(key);
+            resultsCache.set(key, html);
+            while (resultsCache.size > resultsCacheSize) {
+                resultsCache.delete(resultsCache.keys().next().value);
+            }
+        }
+
+        function showResults(key, html) {
+            displayedKey = key;
+            $('#search-results').html(html);
+            ajaxifyLinks($('#search-results'));
+        }
+
+        function cancelPendingRequest() {
+            // invalidate responses to any request already sent, then abort it
+            requestCounter++;
+            if (searchRequest) {
+                searchRequest.abort();
+                searchRequest = null;
+            }
+        }
+
+        function loadResults(url, q, p) {
+            var key = cacheKey(q, p);
+            cancelPendingRequest();
+
+            var cachedHtml = getCachedResults(key);
+            if (cachedHtml !== null) {
+                showResults(key, cachedHtml);
+                return;
+            }
+
+            var data = {results: 'true'};
+            if (q) {
+                data.q = q;
+            }
+            if (p) {
+                data.p = p;
+            }
+            if (browseParent) {
+                data.parent = browseParent;
+            }
+
+            var requestId = requestCounter;
+            var startTime = Date.now();
             searchRequest = $.ajax({
-                url: searchUrl,
-                data: {q: $('#id_q').val(), results: 'true'},
-                success: function(data, status) {
+                url: url,
+                data: data,
+                success: function(html, status) {
+                    if (requestId !== requestCounter) {
+                        // a later search or page request has superseded this one
+                        return;
+                    }
                     searchRequest = null;
-                    $('#search-results').html(data);
-                    ajaxifyLinks($('#search-results'));
+                    searchDelay = Math.min(
+                        MAX_SEARCH_DELAY, Math.max(MIN_SEARCH_DELAY, (Date.now() - startTime) / 2)
+                    );
+                    setCachedResults(key, html);
+                    showResults(key, html);
                 },
-                error: function() {
+                error: function(xhr) {
+                    if (requestId !== requestCounter) {
+                        return;
+                    }
                     searchRequest = null;
+                    if (xhr.status === 429) {
+                        // rate limited by the server; retry unless superseded in the meantime
+                        var retryAfter = parseInt(xhr.getResponseHeader('Retry-After'), 10) || 1;
+                        setTimeout(function() {
+                            if (requestId === requestCounter) {
+                                loadResults(url, q, p);
+                            }
+                        }, retryAfter * 1000);
+                    }
+                }
+            });
+        }
+
+        function currentQuery() {
+            var q = $('#id_q').length ? $('#id_q').val() : '';
+            return q.length >= searchMinLength ? q : '';
+        }
+
+        // streamed listings are not included in the modal response, and are loaded separately
+        var resultsUrl = $('#search-results', modal.body).data('results-url');
+        if (resultsUrl) {
+            var initialRequestId = requestCounter;
+            searchRequest = $.ajax({
+                url: resultsUrl,
+                success: function(data, status) {
+                    if (initialRequestId === requestCounter) {
+                        searchRequest = null;
+                        showResults(cacheKey(currentQuery(), null), data);
+                    }
+                },
+                error: function() {
+                    if (initialRequestId === requestCounter) {
+                        searchRequest = null;
+                    }
                 }
             });
+        } else if (resultsCacheSize > 0 && $('#search-results', modal.body).length) {
+            // the initial listing is a cache entry for the current query
+            displayedKey = cacheKey(currentQuery(), null);
+            setCachedResults(displayedKey, $('#search-results', modal.body).html());
+        }
+
+        function search() {
+            clearTimeout($('#id_q').data('timer'));
+            loadResults(searchUrl, currentQuery(), null);
             return false;
         }
 
         $('form.chooser-search', modal.body).on('submit', search);
 
         $('#id_q').on('input', function() {
-            if(searchRequest) {
-                searchRequest.abort();
-            }
             clearTimeout($.data(this, 'timer'));
-            var wait = setTimeout(search, 50);
-            $(this).data('timer', wait);
+
+            // queries below the minimum length are treated as empty, so typing the first few
+            // characters does not change the results
+            var key = cacheKey(currentQuery(), null);
+            if (key === displayedKey) {
+                cancelPendingRequest();
+                return;
+            }
+
+            if (resultsCache.has(key)) {
+                search();
+            } else {
+                cancelPendingRequest();
+                var wait = setTimeout(search, searchDelay);
+                $(this).data('timer', wait);
+            }
         });
 
         function setPage(page) {
-            var dataObj = {p: page, results: 'true'};
+            clearTimeout($('#id_q').data('timer'));
+            // read the URL at click time, as the results (and their pagination) may have been
+            // replaced since the modal was opened
+            var url = $('#search-results .pagination').data('action-url') || paginationUrl || searchUrl;
+            loadResults(url, currentQuery(), page);
+            return false;
+        }
+
+        function browseTo(parent) {
+            clearTimeout($('#id_q').data('timer'));
+            // browsing into a node leaves any search, so that its children are listed
+            $('#id_q').val('');
+            browseParent = parent || '';
+            loadResults(searchUrl, '', null);
+        }
+
+        // number of times a chunk is retried (with increasing delays) before an upload is abandoned
+        var MAX_UPLOAD_RETRIES = 5;
+
+        function uploadUrl(url, params) {
+            return url + (url.indexOf('?') === -1 ? '?' : '&') + $.param(params);
+        }
 
-            if ($('#id_q').length && $('#id_q').val().length) {
-                dataObj.q = $('#id_q').val();
+        function chunkedUpload(url, file, chunkSize, csrfToken) {
+            /* Upload the file in chunks, resolving to the upload ID once it is complete. The ID is
+            remembered in sessionStorage, so that choosing the same file again after an interrupted
+            upload resumes from the last chunk received by the server. */
+            var storageKey = 'generic-chooser-upload:' + url + ':' + [file.name, file.size, file.lastModified].join(':');
+            var retries = 0;
+
+            function remember(uploadId) {
+                try {
+                    if (uploadId) {
+                        sessionStorage.setItem(storageKey, uploadId);
+                    } else {
+                        sessionStorage.removeItem(storageKey);
+                    }
+                } catch (e) {
+                    // storage unavailable; uploads can still be resumed within this submission
+                }
             }
 
-            $.ajax({
-                url: paginationUrl,
-                data: dataObj,
-                success: function(data, status) {
-                    $('#search-results').html(data);
-                    ajaxifyLinks($('#search-results'));
+            return new Promise(function(resolve, reject) {
+                function start() {
+                    $.ajax({
+                        url: uploadUrl(url, {upload: 'start'}),
+                        type: 'POST',
+                        data: {
+                            name: file.name, size: file.size, content_type: file.type,
+                            csrfmiddlewaretoken: csrfToken
+                        },
+                        dataType: 'json',
+                        success: function(data) {
+                            remember(data.upload_id);
+                            sendFrom(data.upload_id, 0);
+                        },
+                        error: reject
+                    });
+                }
+
+                function sendFrom(uploadId, offset) {
+                    if (offset >= file.size) {
+                        /* the server ends a completed upload once the form using it has been
+                        handled, even if the form is invalid */
+                        remember(null);
+                        resolve(uploadId);
+                        return;
+                    }
+                    $.ajax({
+                        url: uploadUrl(url, {upload: uploadId, offset: offset}),
+                        type: 'POST',
+                        data: file.slice(offset, offset + chunkSize),
+                        processData: false,
+                        contentType: 'application/octet-stream',
+                        headers: {'X-CSRFToken': csrfToken},
+                        dataType: 'json',
+                        success: function(data) {
+                            retries = 0;
+                            sendFrom(uploadId, data.offset);
+                        },
+                        error: function() {
+                            retry(uploadId);
+                        }
+                    });
+                }
+
+                function resume(uploadId) {
+                    // ask the server how much of the file it has received
+                    $.ajax({
+                        url: uploadUrl(url, {upload: uploadId}),
+                        dataType: 'json',
+                        success: function(data) {
+                            sendFrom(uploadId, data.offset);
+                        },
+                        error: function(xhr) {
+                            if (xhr.status === 404) {
+                                // the upload has expired; start again
+                                remember(null);
+                                start();
+                            } else {
+                                retry(uploadId);
+                            }
+                        }
+                    });
+                }
+
+                function retry(uploadId) {
+                    retries++;
+                    if (retries > MAX_UPLOAD_RETRIES) {
+                        reject();
+                        return;
+                    }
+                    setTimeout(function() {
+                        resume(uploadId);
+                    }, Math.pow(2, retries) * 1000);
+                }
+
+                var savedUploadId = null;
+                try {
+                    savedUploadId = sessionStorage.getItem(storageKey);
+                } catch (e) {
+                    // storage unavailable
+                }
+                if (savedUploadId) {
+                    resume(savedUploadId);
+                } else {
+                    start();
                 }
             });
-            return false;
         }
 
-        $('form.create-form', modal.body).on('submit', function() {
+        function uploadFiles(form, formdata) {
+            /* Upload the form's files in chunks, one after another, replacing each file in formdata
+            with a '<field name>:upload' field giving its upload ID */
+            var chunkSize = parseInt($(form).data('upload-chunk-size'), 10);
+            var csrfToken = $('input[name="csrfmiddlewaretoken"]', form).val();
+            var uploads = [];
+            $('input[type="file"]', form).each(function() {
+                var input = this;
+                if (input.files.length) {
+                    formdata.delete(input.name);
+                    $.each(input.files, function(i, file) {
+                        uploads.push({name: input.name, file: file});
+                    });
+                }
+            });
+
+            return uploads.reduce(function(previous, upload) {
+                return previous.then(function() {
+                    return chunkedUpload(form.action, upload.file, chunkSize, csrfToken).then(function(uploadId) {
+                        formdata.append(upload.name + ':upload', uploadId);
+                    });
+                });
+            }, Promise.resolve());
+        }
+
+        // bind to modal.body rather than the form itself, so that create forms loaded into a lazy
+        // tab after the modal has opened are also handled. modal.body is reused when the modal is
+        // re-rendered (for example, after a validation error), so replace any earlier handler
+        // rather than adding another.
+        $(modal.body).off('submit.wgc').on('submit.wgc', 'form.create-form', function() {
+            var form = this;
             const button = $(this).find('[type="submit"]');
             button.prop("disabled", true);
 
             var formdata = new FormData(this);
 
-            $.ajax({
-                url: this.action,
-                data: formdata,
-                processData: false,
-                contentType: false,
-                type: 'POST',
-                dataType: 'text',
-                success: modal.loadResponseText,
-                error: function(response, textStatus, errorThrown) {
-                    message = jsonData['error_message'] + '<br />' + errorThrown + ' - ' + response.status;
+            function submitForm() {
+                $.ajax({
+                    url: form.action,
+                    data: formdata,
+                    processData: false,
+                    contentType: false,
+                    type: 'POST',
+                    dataType: 'text',
+                    success: modal.loadResponseText,
+                    error: function(response, textStatus, errorThrown) {
+                        button.prop("disabled", false);
+                        var message = jsonData['error_message'] + '<br />' + errorThrown + ' - ' + response.status;
+                        $('.create-section', modal.body).append(
+                            '<div class="help-block help-critical">' +
+                            '<strong>' + jsonData['error_label'] + ': </strong>' + message + '</div>');
+                    }
+                });
+            }
+
+            if ($(form).is('[data-chunked-uploads]')) {
+                uploadFiles(form, formdata).then(submitForm, function() {
+                    button.prop("disabled", false);
                     $('.create-section', modal.body).append(
-                        '<div class="help-block help-critical">' +
-                        '<strong>' + jsonData['error_label'] + ': </strong>' + message + '</div>');
-                }
-            });
+                        $('<div class="help-block help-critical"></div>').text($(form).data('upload-error-message'))
+                    );
+                });
+            } else {
+                submitForm();
+            }
 
             return false;
         });
 
         modal.ajaxifyForm('form[data-multiple-choice-form]');
     },
+    'create_job': function(modal, jsonData) {
+        // the create form is being processed in the background
+        if (jsonData['status'] === 'pending') {
+            var retries = jsonData['retries'] || 0;
+            setTimeout(function() {
+                if (!$(modal.body).closest('body').length) {
+                    // the modal has been closed; stop polling
+                    return;
+                }
+                $.ajax({
+                    url: jsonData['job_url'],
+                    dataType: 'text',
+                    success: modal.loadResponseText,
+                    error: function(response, textStatus, errorThrown) {
+                        // retry failed requests a limited number of times, but give up straight
+                        // away if the job's status cannot be retrieved (e.g. permission denied)
+                        var gaveUp = (
+                            (response.status >= 400 && response.status < 500)
+                            || retries >= CREATE_JOB_MAX_RETRIES
+                        );
+                        GENERIC_CHOOSER_MODAL_ONLOAD_HANDLERS['create_job'](modal, $.extend({}, jsonData, {
+                            'status': gaveUp ? 'failed' : 'pending',
+                            'retries': retries + 1
+                        }));
+                    }
+                });
+            }, jsonData['poll_interval'] * 1000);
+        } else {
+            $('form.create-form [type="submit"]', modal.body).prop('disabled', false);
+            $('.create-section', modal.body).append(
+                '<div class="help-block help-critical">' +
+                '<strong>' + jsonData['error_label'] + ': </strong>' + jsonData['error_message'] + '</div>');
+        }
+    },
     'chosen': function(modal, jsonData) {
         modal.respond('chosen', jsonData['result']);
         modal.close();
@@ -13,6 +13,8 @@ function ChooserWidget(id, opts) {
     this.chooserElement = $('#' + id + '-chooser');
     this.titleElement = this.chooserElement.find('[data-chooser-title]');
     this.inputElement = $('#' + id);
+    /* hidden input for the signed state token, present if the widget has trust_signed_state set */
+    this.stateInputElement = $('#' + id + '-state');
     this.editLinkElement = this.chooserElement.find('.edit-link');
     this.editLinkWrapper = this.chooserElement.find('.edit-link-wrapper');
     if (!this.editLinkElement.attr('href')) {
@@ -35,10 +37,104 @@ function ChooserWidget(id, opts) {
         self.setState(null);
     });
 
+    this.typeaheadElement = this.chooserElement.find('.chooser__typeahead');
+    if (this.typeaheadElement.length) {
+        this.initTypeahead(opts.typeaheadURL || this.typeaheadElement.data('typeahead-url'));
+    }
+
     // attach a reference to this widget object onto the root element of the chooser
     this.chooserElement.get(0).widget = this;
 }
 
+ChooserWidget.prototype.initTypeahead = function(url) {
+    /* search the typeahead endpoint at url as the user types, offering the results to choose from */
+    var self = this;
+    var input = this.typeaheadElement.find('.chooser__typeahead-input');
+    var resultsList = this.typeaheadElement.find('.chooser__typeahead-results');
+    var request = null;
+    var timer = null;
+    var results = [];
+    var resultsCache = {};
+
+    function showResults(newResults) {
+        results = newResults;
+        resultsList.empty();
+        $.each(results, function(i, result) {
+            $('<li role="option" class="chooser__typeahead-result"></li>')
+                .text(result.string).attr('data-index', i).appendTo(resultsList);
+        });
+        resultsList.prop('hidden', results.length === 0);
+    }
+
+    function choose(index) {
+        if (results[index]) {
+            self.setStateFromModalData(results[index]);
+            input.val('');
+            showResults([]);
+        }
+    }
+
+    function search() {
+        var q = input.val().trim();
+        if (request) {
+            request.abort();
+            request = null;
+        }
+        if (!q) {
+            showResults([]);
+        } else if (resultsCache.hasOwnProperty(q)) {
+            showResults(resultsCache[q]);
+        } else {
+            request = $.ajax({
+                url: url,
+                data: {q: q},
+                dataType: 'json',
+                success: function(data) {
+                    request = null;
+                    resultsCache[q] = data.results;
+                    if (input.val().trim() === q) {
+                        showResults(data.results);
+                    }
+                }
+            });
+        }
+    }
+
+    input.on('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(search, 150);
+    });
+
+    input.on('keydown', function(e) {
+        var index = parseInt(resultsList.children('.is-active').attr('data-index'), 10);
+        if (isNaN(index)) {
+            index = -1;
+        }
+
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            index = (e.key === 'ArrowDown') ? Math.min(index + 1, results.length - 1) : Math.max(index - 1, 0);
+            resultsList.children().removeClass('is-active').eq(index).addClass('is-active');
+            return false;
+        } else if (e.key === 'Enter') {
+            // choose the highlighted result, rather than submitting the form
+            choose(index);
+            return false;
+        } else if (e.key === 'Escape') {
+            showResults([]);
+        }
+    });
+
+    // mousedown rather than click, so that the choice is made before the input loses focus
+    resultsList.on('mousedown', 'li', function() {
+        choose(parseInt(this.getAttribute('data-index'), 10));
+        return false;
+    });
+
+    input.on('blur', function() {
+        showResults([]);
+    });
+};
+
 ChooserWidget.prototype.getModalURL = function() {
     return this.baseModalURL;
 };
@@ -60,7 +156,8 @@ ChooserWidget.prototype.setStateFromModalData = function(data) {
     this.setState({
         'value': data.id,
         'title': data.string,
-        'edit_item_url': data.edit_link
+        'edit_item_url': data.edit_link,
+        'signed_state': data.state
     });
 }
 
@@ -79,6 +176,8 @@ ChooserWidget.prototype.setState = function(newState) {
         this.inputElement.val('');
         this.chooserElement.addClass('blank');
     }
+    /* a state set without a token (e.g. from StreamField data) cannot be trusted on re-render */
+    this.stateInputElement.val((newState && newState.signed_state) || '');
     this.inputElement.trigger('change');
 };
 
@@ -155,6 +155,8 @@ class WagtailGenericChooserTabs {
       tabContent.hidden = false;
     }
 
+    this.loadLazyTabContent(tabContent);
+
     if (this.state.initialPageLoad) {
       // On first load set the scroll to top to avoid scrolling to active section and header covering up tabs
       setTimeout(() => {
@@ -178,6 +180,42 @@ class WagtailGenericChooserTabs {
     }
   }
 
+  /**
+   * Fetch the content of a tab panel marked with data-wgc-lazy-url, the first time it is selected
+   * @param tabContent{HTMLElement}
+   */
+  loadLazyTabContent(tabContent) {
+    const url = tabContent.getAttribute('data-wgc-lazy-url');
+    if (!url || tabContent.hasAttribute('data-wgc-lazy-loaded')) {
+      return;
+    }
+    tabContent.setAttribute('data-wgc-lazy-loaded', '');
+
+    fetch(url, {
+      credentials: 'same-origin',
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.text();
+      })
+      .then((html) => {
+        // use a contextual fragment so that any inline scripts (e.g. widget initialisers) are run
+        tabContent.replaceChildren(
+          document.createRange().createContextualFragment(html),
+        );
+        tabContent.dispatchEvent(
+          new CustomEvent('wgc:tab-loaded', { bubbles: true }),
+        );
+      })
+      .catch(() => {
+        // allow the fetch to be retried the next time the tab is selected
+        tabContent.removeAttribute('data-wgc-lazy-loaded');
+      });
+  }
+
   /**
    * Fade Up and In animation
    * @param tabContent{HTMLElement}
@@ -0,0 +1,232 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.utils.datastructures import MultiValueDict
+
+from generic_chooser.cache import make_cache_key
+
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+# size of the blocks in which chunks are copied from the request to disk
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+def get_upload_dir():
+    """
+    Return the directory that chunked uploads are assembled in - a 'generic_chooser_uploads'
+    directory within FILE_UPLOAD_TEMP_DIR, or the system's temporary directory if that is not set
+    """
+    base_dir = getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir()
+    return os.path.join(base_dir, 'generic_chooser_uploads')
+
+
+class UploadError(Exception):
+    pass
+
+
+class ChunkedUploadedFile(UploadedFile):
+    """
+    The file assembled from a completed chunked upload. Closing it leaves the file in place; it is
+    deleted once the upload is finished, or expires.
+    """
+    def __init__(self, path, name, content_type, size):
+        super().__init__(open(path, 'rb'), name, content_type, size)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+class OwnedUploadedFile(UploadedFile):
+    """
+    A copy of an uploaded file made by copy_uploaded_files, which (like Django's
+    TemporaryUploadedFile) is deleted when closed
+    """
+    def __init__(self, path, name, content_type, size):
+        super().__init__(open(path, 'rb'), name, content_type, size)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            return self.file.close()
+        finally:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class ChunkedUpload:
+    """
+    A file being uploaded in chunks, assembled in a file on disk. The file's name, size and content
+    type are held in Django's cache; the upload is only visible to the user who started it, and
+    expires after `timeout` seconds. Where requests are served by several servers, the upload
+    directory must be shared between them.
+    """
+    def __init__(self, upload_id, user_id, upload_dir=None, timeout=None):
+        if not UPLOAD_ID_RE.match(upload_id):
+            raise UploadError("Invalid upload ID")
+
+        self.id = upload_id
+        self.key = make_cache_key('chunked-upload', upload_id, str(user_id))
+        self.upload_dir = upload_dir or get_upload_dir()
+        self.path = os.path.join(self.upload_dir, '%s.part' % upload_id)
+        self.timeout = timeout
+
+    @classmethod
+    def start(cls, user_id, name, size, content_type, upload_dir=None, timeout=None):
+        """
+        Start a new upload of a file with the given name, size (in bytes) and content type
+        """
+        upload = cls(uuid.uuid4().hex, user_id, upload_dir=upload_dir, timeout=timeout)
+        os.makedirs(upload.upload_dir, exist_ok=True)
+        if timeout is not None:
+            remove_stale_uploads(upload.upload_dir, timeout)
+
+        open(upload.path, 'wb').close()
+        cache.set(upload.key, {
+            'name': name, 'size': size, 'content_type': content_type,
+        }, timeout)
+        return upload
+
+    def load(self):
+        """
+        Return a dict of the file's name, size and content type, or None if the upload is unknown
+        or has expired
+        """
+        return cache.get(self.key)
+
+    def get_offset(self):
+        """
+        Return the number of bytes received so far
+        """
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def append(self, offset, stream, max_length):
+        """
+        Append up to max_length bytes read from the given stream to the file, which must currently
+        be `offset` bytes long, and return the new offset. Raises UploadError if the offset does
+        not match, or the data would exceed the file's declared size.
+        """
+        metadata = self.load()
+        if metadata is None or not os.path.exists(self.path):
+            raise UploadError("Unknown upload")
+
+        current_offset = self.get_offset()
+        if offset != current_offset:
+            raise UploadError("Expected offset %d" % current_offset)
+
+        remaining = min(max_length, metadata['size'] - offset)
+        start_offset = offset
+        with open(self.path, 'ab') as f:
+            while True:
+                block = stream.read(min(COPY_BLOCK_SIZE, remaining + 1))
+                if not block:
+                    break
+                if len(block) > remaining:
+                    f.truncate(start_offset)
+                    raise UploadError("Chunk too large")
+                f.write(block)
+                remaining -= len(block)
+                offset += len(block)
+
+        # keep the upload alive while chunks are arriving
+        cache.touch(self.key, self.timeout)
+        return offset
+
+    def get_uploaded_file(self):
+        """
+        Return the completed file as an UploadedFile, or None if the upload is unknown or
+        incomplete. The upload remains available until finish is called.
+        """
+        metadata = self.load()
+        if metadata is None or self.get_offset() != metadata['size']:
+            return None
+
+        return ChunkedUploadedFile(
+            self.path, metadata['name'], metadata['content_type'], metadata['size']
+        )
+
+    def finish(self):
+        """
+        End the upload, deleting the assembled file
+        """
+        cache.delete(self.key)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def copy_uploaded_files(files):
+    """
+    Return a copy of the given MultiValueDict of uploaded files that remains usable after the
+    request. Django closes a request's uploaded files (deleting any temporary files) when the
+    request finishes, so the files it owns are copied to new temporary files, which are owned by
+    the caller and deleted when closed. The files of chunked uploads are not copied, as they are
+    kept until the upload is finished; they are opened again, so that closing the request's handle
+    does not affect the caller's. Files that are already owned by the caller are passed through.
+    """
+    copies = MultiValueDict()
+    for name, uploaded_files in files.lists():
+        for uploaded_file in uploaded_files:
+            if isinstance(uploaded_file, OwnedUploadedFile):
+                copies.appendlist(name, uploaded_file)
+                continue
+            if isinstance(uploaded_file, ChunkedUploadedFile):
+                copies.appendlist(name, ChunkedUploadedFile(
+                    uploaded_file.path, uploaded_file.name, uploaded_file.content_type,
+                    uploaded_file.size
+                ))
+                continue
+
+            fd, path = tempfile.mkstemp(
+                suffix='.upload', dir=getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or None
+            )
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(uploaded_file, 'temporary_file_path'):
+                    with open(uploaded_file.temporary_file_path(), 'rb') as source:
+                        shutil.copyfileobj(source, f)
+                else:
+                    for chunk in uploaded_file.chunks():
+                        f.write(chunk)
+            copies.appendlist(name, OwnedUploadedFile(
+                path, uploaded_file.name, uploaded_file.content_type, uploaded_file.size
+            ))
+    return copies
+
+
+def close_uploaded_files(files):
+    """
+    Close all files in the given MultiValueDict of uploaded files
+    """
+    for name, uploaded_files in files.lists():
+        for uploaded_file in uploaded_files:
+            uploaded_file.close()
+
+
+def remove_stale_uploads(upload_dir, max_age):
+    """
+    Delete partial uploads in upload_dir that have not been written to for max_age seconds
+    """
+    cutoff = time.time() - max_age
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith('.part') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,22 @@
+from django.urls import include, path
+from wagtail.admin import urls as wagtailadmin_urls  # noqa: F401 - registers the admin viewsets
+from wagtail.admin.viewsets import viewsets
+
+from generic_chooser.views import ModelChooserViewSet
+
+# URLs for chooser viewsets with async_views enabled. Include these at the same path as the
+# Wagtail admin's URLs, and before them:
+#
+#     path('admin/', include('generic_chooser.urls')),
+#     path('admin/', include(wagtailadmin_urls)),
+urlpatterns = [
+    path(
+        '%s/' % viewset.url_prefix,
+        include(
+            (viewset.get_async_urlpatterns(), viewset.url_namespace),
+            namespace=viewset.url_namespace,
+        ),
+    )
+    for viewset in viewsets.viewsets
+    if isinstance(viewset, ModelChooserViewSet) and viewset.async_views
+]
@@ -1,14 +1,32 @@
+import functools
+import heapq
+import itertools
+import logging
+import operator
+import re
 import urllib
+from contextlib import nullcontext
 
-import requests
+from asgiref.sync import sync_to_async
 from django.contrib.admin.utils import quote, unquote
-from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.cache import cache
+from django.core.exceptions import (
+    ImproperlyConfigured, ObjectDoesNotExist, PermissionDenied, ValidationError
+)
 from django.core.paginator import Page, Paginator
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.functions import Length, Substr
 from django.forms import models as model_forms
-from django.http import Http404
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.urls import re_path, reverse
+from django.utils import timezone, translation
+from django.utils.functional import cached_property
+from django.utils.safestring import mark_safe
 from django.utils.text import camel_case_to_spaces, slugify
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic.base import ContextMixin
@@ -18,6 +36,35 @@ from wagtail.admin.viewsets.base import ViewSet
 from wagtail.permission_policies import ModelPermissionPolicy
 from wagtail.search.backends import get_search_backend
 from wagtail.search.index import class_is_indexed
+from wagtail.utils.urlpatterns import decorate_urlpatterns
+
+from generic_chooser import multi_model, signing
+from generic_chooser.api import (
+    api_get, api_post, federate_item, fetch_api_item, fetch_federated_item, fetch_federated_items,
+    get_fields_parameter, get_json, item_cache, iter_json_list, iter_text
+)
+from generic_chooser.auth import require_admin_access_async
+from generic_chooser.cache import (
+    AsyncSingleFlight, SingleFlight, TokenBucket, bump_generation, get_generation, get_model_generation_name,
+    make_cache_key, track_model_changes
+)
+from generic_chooser.concurrency import (
+    call_concurrently, call_in_background, get_job_executor, in_transaction
+)
+from generic_chooser.jobs import CreateJob
+from generic_chooser.metrics import RequestMetrics, metrics_view, record_cache_lookup
+from generic_chooser.pagination import APIPaginator, LimitOffsetPagination
+from generic_chooser.profiling import RequestProfile
+from generic_chooser.recent import RecentChoicesStore
+from generic_chooser.uploads import (
+    ChunkedUpload, UploadError, close_uploaded_files, copy_uploaded_files
+)
+
+logger = logging.getLogger('generic_chooser')
+
+# shared between all chooser views in the process, for coalescing identical results requests
+results_single_flight = SingleFlight()
+async_results_single_flight = AsyncSingleFlight()
 
 
 class ModalPageFurnitureMixin(ContextMixin):
@@ -44,6 +91,76 @@ class ChooserMixin:
     # URL parameters to be passed on from the initial URL in the result of get_choose_url
     preserve_url_parameters = []
 
+    # Requests taking longer than this number of seconds are logged to the
+    # 'generic_chooser.slow_requests' logger, along with their phase timings and SQL statements.
+    # EXPLAIN output is included for up to slow_request_explain_limit of the slowest SELECT
+    # statements, on databases that support it.
+    slow_request_threshold = None
+    slow_request_explain_limit = 5
+
+    # RequestProfile for the current request, when slow_request_threshold is set
+    profile = None
+
+    # If True, requests are recorded in generic_chooser.metrics, labelled with viewset_name
+    enable_metrics = False
+    viewset_name = None
+
+    # If set, the items chosen by each user are recorded (keeping up to this many per user) and
+    # offered in a 'Recent' tab of the chooser modal. Records expire after recent_choices_timeout
+    # seconds without a choice being made.
+    recent_choices_limit = None
+    recent_choices_timeout = 60 * 60 * 24 * 90
+
+    # If True, chosen responses include a signed token of each item's ID, title and edit link,
+    # which chooser widgets with trust_signed_state set submit alongside the value, so that
+    # re-rendering the form after a validation error does not look the item up again
+    sign_chosen_state = False
+
+    # Maximum number of results returned by the typeahead endpoint for chooser widgets, the
+    # minimum search term length it responds to, and the number of seconds to cache its results
+    # for (None to disable caching)
+    typeahead_limit = 10
+    typeahead_min_length = 2
+    typeahead_cache_timeout = 60
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.enable_metrics:
+            return self.profiled_dispatch(request, *args, **kwargs)
+
+        with RequestMetrics(self.viewset_name or '', self.get_view_type) as request_metrics:
+            response = self.profiled_dispatch(request, *args, **kwargs)
+            request_metrics.status = response.status_code
+            return response
+
+    def profiled_dispatch(self, request, *args, **kwargs):
+        if self.slow_request_threshold is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.profile = RequestProfile()
+        try:
+            with self.profile.capture():
+                return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self.profile.duration >= self.slow_request_threshold:
+                self.log_slow_request()
+
+    def profile_phase(self, name):
+        """
+        Return a context manager recording the time spent in the named phase of the request
+        """
+        if self.profile is None:
+            return nullcontext()
+        return self.profile.phase(name)
+
+    def log_slow_request(self):
+        params = dict(self.request.GET.lists())
+        if self.args:
+            params['args'] = list(self.args)
+        self.profile.log(
+            self.get_view_type(), '%s %s' % (self.request.method, self.request.path), params,
+            explain_limit=self.slow_request_explain_limit,
+        )
+
     def get_object(self, pk):
         """
         Return the object corresponding to the given ID. Both 'object' and 'ID' are loosely defined
@@ -54,6 +171,19 @@ class ChooserMixin:
         """
         raise NotImplementedError
 
+    def get_objects(self, pks):
+        """
+        Return a list of the objects corresponding to the given IDs, omitting any that do not
+        exist. Subclasses may override this to look up all of the objects at once.
+        """
+        items = []
+        for pk in pks:
+            try:
+                items.append(self.get_object(pk))
+            except ObjectDoesNotExist:
+                pass
+        return items
+
     def get_object_string(self, instance):
         """
         Return a string representation of the given object instance
@@ -109,7 +239,9 @@ class ChooserMixin:
         return params
 
     def get_chosen_url(self, instance):
-        object_id = self.get_object_id(instance)
+        return self.get_chosen_url_for_id(self.get_object_id(instance))
+
+    def get_chosen_url_for_id(self, object_id):
         url = reverse(self.chosen_url_name, args=(quote(object_id),))
         params = self.get_chosen_url_parameters()
 
@@ -174,12 +306,78 @@ class ChooserMixin:
     # Number of results per page, or None for an unpaginated listing
     per_page = None
 
+    # If True, unpaginated listings are sent as a streaming response, fetching and rendering
+    # stream_chunk_size items at a time rather than holding the whole listing in memory
+    stream_unpaginated_results = False
+    stream_chunk_size = 500
+
+    def get_object_iterator(self, **kwargs):
+        """
+        Return an iterator over the choosable object instances returned by get_object_list, for
+        use in streamed listings. Subclasses should override this to avoid loading all results
+        into memory at once.
+        """
+        return iter(self.get_object_list(**kwargs))
+
+    # Number of seconds to cache the total result count of a paginated listing for, so that
+    # moving between pages of the same listing does not recount it; None disables count caching
+    count_cache_timeout = None
+
+    def get_scope(self):
+        """
+        Return a JSON-serialisable value identifying the subset of objects that the current user
+        may choose - such as their user ID, or a sorted list of their group IDs - or None if all
+        users can choose the same objects. Cached and coalesced listing data is only shared
+        between requests with the same scope.
+        """
+        return None
+
+    @cached_property
+    def listing_scope(self):
+        # the scope of the current request, as returned by get_scope
+        return self.get_scope()
+
+    def get_data_generation_name(self):
+        """
+        Return the name of the data generation counter that is bumped when the objects being
+        chosen here change; see get_data_generation
+        """
+        return self.choose_url_name
+
+    def get_data_generation(self):
+        """
+        Return a value that changes whenever the objects being chosen here change, for use in
+        cache keys
+        """
+        return get_generation(self.get_data_generation_name())
+
+    def get_listing_cache_key(self, name, **kwargs):
+        """
+        Return a cache key for data belonging to the listing that is returned by get_object_list
+        for the given kwargs, taking into account any preserved URL parameters (which may be used
+        to filter the listing), the current scope and the current data generation
+        """
+        url_params = {
+            param: self.request.GET.get(param) for param in self.preserve_url_parameters
+        }
+        return make_cache_key(
+            name, self.choose_url_name, self.get_data_generation(), kwargs, url_params,
+            self.listing_scope
+        )
+
     def get_paginated_object_list(self, page_number, **kwargs):
         """
         Return a page of results according to the `page_number` attribute, as a tuple of
         an iterable sequence of instances and a Paginator object
         """
-        paginator = Paginator(self.get_object_list(**kwargs), per_page=self.per_page)
+        if self.count_cache_timeout is None:
+            paginator = Paginator(self.get_object_list(**kwargs), per_page=self.per_page)
+        else:
+            paginator = CachedCountPaginator(
+                self.get_object_list(**kwargs), per_page=self.per_page,
+                cache_key=self.get_listing_cache_key('count', **kwargs),
+                cache_timeout=self.count_cache_timeout,
+            )
         object_list = paginator.get_page(page_number)
         return (object_list, paginator)
 
@@ -213,23 +411,115 @@ class ChooserMixin:
             None, json_data={'step': 'chosen', 'result': response_data}
         )
 
+    def get_recent_choices_store(self):
+        """
+        Return the RecentChoicesStore for the current user, or None if recent choices are not
+        being recorded
+        """
+        if not self.recent_choices_limit or not self.request.user.is_authenticated:
+            return None
+
+        return RecentChoicesStore(
+            self.viewset_name or self.get_prefix(), self.request.user.pk,
+            max_items=self.recent_choices_limit, timeout=self.recent_choices_timeout,
+        )
+
+    def record_chosen_items(self, response_data):
+        """
+        Record the given list of chosen response data dicts in the user's recent choices
+        """
+        store = self.get_recent_choices_store()
+        if store is not None:
+            store.record([(data['id'], data['string']) for data in response_data])
+
+    def add_signed_state(self, response_data):
+        """
+        Add a signed 'state' token to each of the given list of chosen response data dicts, if
+        sign_chosen_state is set
+        """
+        if self.sign_chosen_state:
+            for data in response_data:
+                data['state'] = signing.sign_chosen_state(
+                    self.choose_url_name, data['id'], data['string'], data['edit_link']
+                )
+
     def get_multiple_chosen_response(self, items):
         response_data = [
             self.get_chosen_response_data(item) for item in items
         ]
+        self.record_chosen_items(response_data)
+        self.add_signed_state(response_data)
         return self._wrap_chosen_response_data(response_data)
 
-    def get_chosen_response(self, item):
+    def get_typeahead_object_list(self, search_term, limit):
         """
-        Return the HTTP response to indicate that an object has been chosen
+        Return a list of up to `limit` objects matching the given search term, for the typeahead
+        endpoint. Subclasses should override this to avoid fetching more objects than needed.
+        """
+        return list(self.get_object_list(search_term=search_term)[:limit])
+
+    def get_typeahead_items(self, search_term, limit):
+        """
+        Return a tuple of the list returned by get_typeahead_object_list and a flag that is True
+        if the list may be incomplete (for example, because a data source could not be reached),
+        in which case it is not cached
+        """
+        return (self.get_typeahead_object_list(search_term, limit), False)
+
+    def get_typeahead_results(self, search_term):
+        """
+        Return a list of chosen response data dicts for the objects matching the given search term,
+        caching them for typeahead_cache_timeout seconds
+        """
+        if not self.is_searchable or len(search_term) < max(self.typeahead_min_length, 1):
+            return []
+
+        if self.typeahead_cache_timeout is not None:
+            cache_key = self.get_listing_cache_key(
+                'typeahead', search_term=search_term, limit=self.typeahead_limit
+            )
+            results = cache.get(cache_key)
+            record_cache_lookup('typeahead', results is not None)
+            if results is not None:
+                return results
+
+        with self.profile_phase('listing'):
+            items, is_partial = self.get_typeahead_items(search_term, self.typeahead_limit)
+        results = [self.get_chosen_response_data(item) for item in items]
+
+        if self.typeahead_cache_timeout is not None and not is_partial:
+            cache.set(cache_key, results, self.typeahead_cache_timeout)
+        return results
+
+    def get_typeahead_response(self, search_term):
+        """
+        Return a JSON response listing the objects matching the given search term, in the same
+        form as the result of a chosen response
+        """
+        results = self.get_typeahead_results(search_term.strip())
+        self.add_signed_state(results)
+        return JsonResponse({'results': results})
+
+    def get_chosen_result(self, item):
+        """
+        Return the result to be returned in the chosen response for the given object, recording
+        it in the user's recent choices
         """
         response_data = self.get_chosen_response_data(item)
+        self.record_chosen_items([response_data])
+        self.add_signed_state([response_data])
         if self.request.GET.get('multiple'):
             # a multiple result was requested but we're only returning one,
             # so wrap as a list
             response_data = [response_data]
 
-        return self._wrap_chosen_response_data(response_data)
+        return response_data
+
+    def get_chosen_response(self, item):
+        """
+        Return the HTTP response to indicate that an object has been chosen
+        """
+        return self._wrap_chosen_response_data(self.get_chosen_result(item))
 
 
 class ModelChooserMixin(ChooserMixin):
@@ -238,6 +528,27 @@ class ModelChooserMixin(ChooserMixin):
     model = None
     order_by = None
 
+    # If True, the listing shows one level of a tree at a time, starting from the root nodes,
+    # with links to browse into the children of each node. The model must be a treebeard MP_Node
+    # (such as Page); each level is fetched using the materialised path index. Searches are
+    # performed across the whole tree.
+    browse_tree = False
+
+    # Fields to load for typeahead results, or None to load all fields. This must include any
+    # fields used by get_object_string and get_edit_item_url.
+    typeahead_fields = None
+
+    # Number of seconds to cache the IDs of the objects that may be chosen within each scope (see
+    # get_scope and scope_queryset) for, so that scoped queries filter on those IDs rather than
+    # repeating the joins of scope_queryset; None to apply scope_queryset to every query. The IDs
+    # are also cached against the model's data generation, so they are refreshed whenever an
+    # instance is saved or deleted.
+    scope_cache_timeout = None
+
+    # Scopes of more than this many objects are not cached as ID lists, which would make for large
+    # cache entries and `IN` clauses; scope_queryset is applied to each query instead.
+    scope_cache_max_ids = 1000
+
     def get_permission_policy(self):
         # if no permission policy is specified, use ModelPermissionPolicy
         # (which enforces standard Django model permissions)
@@ -250,30 +561,201 @@ class ModelChooserMixin(ChooserMixin):
     def is_searchable(self):
         return class_is_indexed(self.model)
 
+    def scope_queryset(self, queryset, scope):
+        """
+        Restrict the queryset to the objects that may be chosen within the given scope, as
+        returned by get_scope; called only when get_scope returns a value other than None
+        """
+        raise NotImplementedError
+
+    def get_allowed_ids(self, scope):
+        """
+        Return a list of the (string) IDs of the objects that may be chosen within the given scope,
+        caching it for scope_cache_timeout seconds, or None if the scope has more than
+        scope_cache_max_ids objects
+        """
+        cache_key = make_cache_key(
+            'scope', self.get_data_generation_name(), self.get_data_generation(), scope
+        )
+        allowed_ids = cache.get(cache_key)
+        record_cache_lookup('scope', allowed_ids is not None)
+        if allowed_ids is None:
+            queryset = self.scope_queryset(self.model.objects.all(), scope)
+            pks = queryset.values_list('pk', flat=True)[:self.scope_cache_max_ids + 1]
+            if len(pks) > self.scope_cache_max_ids:
+                # remember that the scope is too large, rather than fetching its IDs every time
+                allowed_ids = False
+            else:
+                allowed_ids = [str(pk) for pk in pks]
+            cache.set(cache_key, allowed_ids, self.scope_cache_timeout)
+        return allowed_ids if allowed_ids is not False else None
+
+    @cached_property
+    def scope_allowed_ids(self):
+        # the set of IDs that may be chosen in the current scope, or None if the listing is not
+        # scoped or the IDs are not cached
+        if self.listing_scope is None or self.scope_cache_timeout is None:
+            return None
+        allowed_ids = self.get_allowed_ids(self.listing_scope)
+        return None if allowed_ids is None else frozenset(allowed_ids)
+
+    def apply_scope(self, queryset):
+        """
+        Restrict the queryset to the objects that the current user may choose
+        """
+        if self.listing_scope is None:
+            return queryset
+        elif self.scope_allowed_ids is not None:
+            # also passed on to search backends as a filter on the primary key
+            return queryset.filter(pk__in=self.scope_allowed_ids)
+        else:
+            return self.scope_queryset(queryset, self.listing_scope)
+
     def get_unfiltered_object_list(self):
-        objects = self.model.objects.all()
+        objects = self.apply_scope(self.model.objects.all())
         if self.order_by:
             if isinstance(self.order_by, str):
                 objects = objects.order_by(self.order_by)
             else:
                 objects = objects.order_by(*self.order_by)
+        elif self.browse_tree:
+            # keep tree levels in a stable order for pagination
+            objects = objects.order_by('path')
         return objects
 
-    def get_object_list(self, search_term=None, **kwargs):
+    def get_object_list(self, search_term=None, parent_id=None, **kwargs):
         object_list = self.get_unfiltered_object_list()
 
         if search_term:
             search_backend = get_search_backend()
             object_list = search_backend.search(search_term, object_list)
+        elif self.browse_tree:
+            parent = self.get_tree_parent(parent_id)
+            if parent is not None:
+                object_list = object_list.filter(
+                    depth=parent.depth + 1, path__startswith=parent.path
+                )
+            elif self.listing_scope is None:
+                object_list = object_list.filter(depth=1)
+            else:
+                # the root level of a scoped tree lists the topmost nodes within the scope: those
+                # whose parent is outside it
+                scoped_paths = self.apply_scope(self.model.objects.all()).values('path')
+                object_list = object_list.annotate(
+                    parent_path=Substr('path', 1, Length('path') - self.model.steplen)
+                ).exclude(parent_path__in=scoped_paths)
 
         return object_list
 
+    def get_typeahead_object_list(self, search_term, limit):
+        object_list = self.get_unfiltered_object_list()
+        if self.typeahead_fields:
+            object_list = object_list.only(*self.typeahead_fields)
+
+        search_backend = get_search_backend()
+        return list(search_backend.search(search_term, object_list)[:limit])
+
+    def get_tree_parent(self, parent_id):
+        """
+        Return the node whose children are being browsed, or None for the root level
+        """
+        if not parent_id:
+            return None
+
+        if not hasattr(self, '_tree_parent'):
+            # nodes outside the current scope cannot be browsed
+            try:
+                self._tree_parent = self.get_object_queryset(parent_id).filter(pk=parent_id).first()
+            except (self.model.DoesNotExist, ValueError, ValidationError):
+                self._tree_parent = None
+
+        return self._tree_parent
+
+    def get_browse_url(self, parent_id):
+        """
+        Return the URL of the chooser listing the children of the node with the given ID (or the
+        root level, if parent_id is empty)
+        """
+        url = self.get_choose_url()
+        if not parent_id:
+            return url
+        params = urllib.parse.urlencode({'parent': parent_id})
+        return url + ('&' if '?' in url else '?') + params
+
+    def get_tree_breadcrumbs(self, parent):
+        """
+        Return a list of breadcrumb dicts for navigating from the root level to the given node
+        """
+        breadcrumbs = [{'title': _("Top"), 'parent_id': '', 'url': self.get_browse_url('')}]
+        if parent is not None:
+            # get_ancestors fetches all ancestors by path prefix in a single query; ancestors
+            # outside the current scope are left out, so the trail starts at the scope's root
+            for node in list(self.apply_scope(parent.get_ancestors())) + [parent]:
+                breadcrumbs.append({
+                    'title': self.get_object_string(node),
+                    'parent_id': node.pk,
+                    'url': self.get_browse_url(node.pk),
+                })
+        return breadcrumbs
+
+    def get_listing_filters(self):
+        filters = super().get_listing_filters()
+        if self.browse_tree and not filters.get('search_term'):
+            filters['parent_id'] = self.request.GET.get('parent') or None
+        return filters
+
+    def get_row_data(self, item):
+        row = super().get_row_data(item)
+        if self.browse_tree and item.numchild:
+            row['browse_parent_id'] = item.pk
+            row['browse_url'] = self.get_browse_url(item.pk)
+        return row
+
+    def get_listing_tab_context_data(self):
+        context = super().get_listing_tab_context_data()
+        if self.browse_tree:
+            parent_id = self.filters.get('parent_id')
+            parent = self.get_tree_parent(parent_id)
+            context.update({
+                'browse_parent_id': parent.pk if parent else '',
+                'breadcrumbs': (
+                    None if self.filters.get('search_term')
+                    else self.get_tree_breadcrumbs(parent)
+                ),
+            })
+        return context
+
+    def get_object_iterator(self, **kwargs):
+        object_list = self.get_object_list(**kwargs)
+        if isinstance(object_list, QuerySet):
+            return object_list.iterator(chunk_size=self.stream_chunk_size)
+        else:
+            # search results are not guaranteed to support chunked iteration
+            return iter(object_list)
+
+    def get_object_queryset(self, pk):
+        """
+        Return the queryset to look up the object with the given ID in, raising DoesNotExist if it
+        is outside the current scope
+        """
+        if self.scope_allowed_ids is None:
+            return self.apply_scope(self.model.objects.all())
+        # check against the cached IDs, rather than sending them all to the database
+        if str(pk) not in self.scope_allowed_ids:
+            raise self.model.DoesNotExist
+        return self.model.objects.all()
+
     def get_object(self, pk):
-        return self.model.objects.get(pk=pk)
+        return self.get_object_queryset(pk).get(pk=pk)
 
     def get_object_id(self, instance):
         return instance.pk
 
+    def get_data_generation_name(self):
+        # Share the generation between all choosers for this model; ModelChooserViewSet arranges
+        # for it to be bumped whenever an instance is saved or deleted
+        return get_model_generation_name(self.model)
+
     def get_prefix(self):
         # autogenerate a prefix from the model name if one is not supplied manually
         if not self.prefix:
@@ -282,34 +764,363 @@ class ModelChooserMixin(ChooserMixin):
         return self.prefix
 
 
+class AsyncModelChooserMixin(ModelChooserMixin):
+    """
+    Counterpart of ModelChooserMixin for async views, fetching listings, counts and chosen items
+    with Django's async queryset API. Search backends do not provide an async API, so searches
+    are run in a thread.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        # slow request profiling is not available, as async queries are run outside of the
+        # request's thread
+        if not self.enable_metrics:
+            return await View.dispatch(self, request, *args, **kwargs)
+
+        with RequestMetrics(self.viewset_name or '', self.get_view_type) as request_metrics:
+            response = await View.dispatch(self, request, *args, **kwargs)
+            request_metrics.status = response.status_code
+            return response
+
+    async def aresolve_scope(self):
+        # get_scope and get_allowed_ids may query the database synchronously, so resolve the
+        # current scope in a thread before building any scoped querysets
+        await sync_to_async(lambda: self.scope_allowed_ids)()
+
+    async def aget_object(self, pk):
+        await self.aresolve_scope()
+        return await self.get_object_queryset(pk).aget(pk=pk)
+
+    async def aget_objects(self, pks):
+        """
+        Return a list of the objects with the given IDs, in the same order, omitting any that do
+        not exist
+        """
+        await self.aresolve_scope()
+        try:
+            objects = {
+                str(obj.pk): obj async for obj in self.apply_scope(self.model.objects.filter(pk__in=pks))
+            }
+        except (ValueError, ValidationError):
+            return []
+        return [objects[str(pk)] for pk in pks if str(pk) in objects]
+
+    async def aget_object_list(self, **kwargs):
+        await self.aresolve_scope()
+        if kwargs.get('search_term'):
+            return await sync_to_async(lambda: list(self.get_object_list(**kwargs)))()
+        return [obj async for obj in self.get_object_list(**kwargs)]
+
+    async def aget_paginated_object_list(self, page_number, **kwargs):
+        await self.aresolve_scope()
+        if kwargs.get('search_term'):
+            return await sync_to_async(self.get_paginated_object_list)(page_number, **kwargs)
+
+        object_list = self.get_object_list(**kwargs)
+        if self.count_cache_timeout is None:
+            count = await object_list.acount()
+        else:
+            # the key includes the data generation, which is read from the cache synchronously
+            cache_key = await sync_to_async(self.get_listing_cache_key)('count', **kwargs)
+            count = await cache.aget(cache_key)
+            record_cache_lookup('count', count is not None)
+            if count is None:
+                count = await object_list.acount()
+                await cache.aset(cache_key, count, self.count_cache_timeout)
+
+        paginator = APIPaginator(count, self.per_page)
+        # get_page resolves out-of-range page numbers without fetching any items
+        page_number = paginator.get_page(page_number).number
+        offset = (page_number - 1) * self.per_page
+        items = [obj async for obj in object_list[offset:offset + self.per_page]]
+        return (Page(items, page_number, paginator), paginator)
+
+
+class MultiModelChooserMixin(ChooserMixin):
+    """
+    Mixin for chooser modals listing objects from several models, identified by IDs of the form
+    'app_label.model_name:pk'. The models' listings are queried concurrently and merged.
+    """
+
+    models = []
+
+    # A field present on all models (optionally prefixed with '-' for descending order) by which
+    # their listings are ordered and merged. If None, the listings are merged by rank, taking the
+    # first item of each model in turn, then the second, and so on; search results are always
+    # merged this way.
+    order_by = None
+
+    # URL route names for editing items, keyed by model label (such as 'shop.product')
+    edit_item_url_names = {}
+
+    prefix = 'multi-model-chooser'
+
+    @property
+    def is_searchable(self):
+        return any(class_is_indexed(model) for model in self.models)
+
+    def get_source_object_list(self, model, search_term=None):
+        """
+        Return the listing of objects of the given model, as a queryset or search results
+        """
+        objects = model.objects.all()
+        if self.order_by:
+            # nulls are placed last in either direction, matching merge_object_lists
+            field = F(self.order_by.lstrip('-'))
+            if self.order_by.startswith('-'):
+                objects = objects.order_by(field.desc(nulls_last=True))
+            else:
+                objects = objects.order_by(field.asc(nulls_last=True))
+        elif not objects.ordered:
+            # a stable order is needed for items to be ranked
+            objects = objects.order_by('pk')
+
+        if search_term:
+            if not class_is_indexed(model):
+                return model.objects.none()
+            search_backend = get_search_backend()
+            objects = search_backend.search(search_term, objects)
+
+        return objects
+
+    def map_sources(self, func, search_term=None):
+        """
+        Call func on each model's listing concurrently, returning a list of the results in the
+        order of self.models
+        """
+        calls = [
+            functools.partial(func, self.get_source_object_list(model, search_term=search_term))
+            for model in self.models
+        ]
+        if in_transaction():
+            # queries in other threads would not see changes made within the transaction
+            return [call() for call in calls]
+        return [future.result() for future in call_concurrently(calls)]
+
+    def merge_object_lists(self, object_lists, search_term=None):
+        """
+        Return an iterator over the objects in the given ordered listings (one per model), merged
+        into a single ordered listing
+        """
+        if self.order_by and not search_term:
+            field_name = self.order_by.lstrip('-')
+            descending = self.order_by.startswith('-')
+
+            def key(obj):
+                # nulls cannot be compared with other values, so are sorted last in either
+                # direction; in descending order, that makes them the smallest values
+                value = getattr(obj, field_name)
+                if descending:
+                    return (value is not None, value)
+                else:
+                    return (value is None, value)
+
+            return heapq.merge(*object_lists, key=key, reverse=descending)
+        else:
+            # ties between equally ranked items are broken by the order of self.models
+            ranked_lists = [enumerate(object_list) for object_list in object_lists]
+            return (
+                obj for rank, obj in heapq.merge(*ranked_lists, key=operator.itemgetter(0))
+            )
+
+    def get_object_list(self, search_term=None, **kwargs):
+        object_lists = self.map_sources(list, search_term=search_term)
+        return list(self.merge_object_lists(object_lists, search_term=search_term))
+
+    def get_object_iterator(self, search_term=None, **kwargs):
+        # stream each model's listing in chunks, merging them as they are consumed, rather than
+        # fetching every listing in full first
+        object_lists = []
+        for model in self.models:
+            object_list = self.get_source_object_list(model, search_term=search_term)
+            if isinstance(object_list, QuerySet):
+                object_lists.append(object_list.iterator(chunk_size=self.stream_chunk_size))
+            else:
+                object_lists.append(iter(object_list))
+        return self.merge_object_lists(object_lists, search_term=search_term)
+
+    def get_paginated_object_list(self, page_number, search_term=None, **kwargs):
+        try:
+            requested_page_number = max(int(page_number), 1)
+        except (TypeError, ValueError):
+            requested_page_number = 1
+
+        # No model can contribute more than `limit` items to the merged listing up to the end of
+        # the page, so fetch that many from each (along with its count, in the same call) and
+        # merge them
+        limit = requested_page_number * self.per_page
+        results = self.map_sources(
+            lambda object_list: (object_list.count(), list(object_list[:limit])),
+            search_term=search_term
+        )
+        counts = [count for count, object_list in results]
+        object_lists = [object_list for count, object_list in results]
+
+        paginator = APIPaginator(sum(counts), self.per_page)
+        # a page beyond the end is shown as the last page, whose items are among those fetched
+        page_number = paginator.get_page(page_number).number
+        limit = page_number * self.per_page
+
+        merged = self.merge_object_lists(object_lists, search_term=search_term)
+        items = list(itertools.islice(merged, limit - self.per_page, limit))
+        return (Page(items, page_number, paginator), paginator)
+
+    def get_typeahead_object_list(self, search_term, limit):
+        object_lists = self.map_sources(
+            lambda object_list: list(object_list[:limit]), search_term=search_term
+        )
+        merged = self.merge_object_lists(object_lists, search_term=search_term)
+        return list(itertools.islice(merged, limit))
+
+    def get_object(self, object_id):
+        return multi_model.get_object(self.models, object_id)
+
+    def get_objects(self, object_ids):
+        instances = multi_model.get_objects(self.models, object_ids)
+        return [
+            instances[str(object_id)] for object_id in object_ids if str(object_id) in instances
+        ]
+
+    def get_object_id(self, instance):
+        return multi_model.make_object_id(instance)
+
+    def get_edit_item_url(self, instance):
+        url_name = self.edit_item_url_names.get(multi_model.get_source_name(type(instance)))
+        if url_name is None:
+            return None
+        return reverse(url_name, args=(quote(instance.pk),))
+
+
 class DRFChooserMixin(ChooserMixin):
     """Mixin for chooser modals backed by a Django REST Framework API"""
     api_base_url = None
     title_field_name = None
 
+    # Number of seconds to cache item details for, or None to disable caching. The cache is
+    # shared with DRFChooser widgets using the same api_base_url. Items that the API reports as not
+    # found are cached for detail_not_found_cache_timeout seconds.
+    detail_cache_timeout = None
+    detail_not_found_cache_timeout = 30
+
+    # Whether to populate the item cache from listing responses; disable this if the listing
+    # endpoint returns fewer fields than the detail endpoint and those fields are needed here
+    populate_detail_cache_from_listing = True
+
+    # Number of seconds to keep listing and detail responses that carry an ETag or Last-Modified
+    # header, so that they can be revalidated with a conditional request rather than downloaded
+    # again; None to disable
+    revalidate_cache_timeout = None
+
+    # List of fields to request from the API for listings and item details, passed as the 'fields'
+    # query parameter along with 'id' (as supported by Wagtail's API, where ['_', 'title'] requests
+    # only the id and title fields). This must include any fields used by title_field_name,
+    # get_object_string or the templates. If None, the API's default fields are returned.
+    api_fields = None
+
+    # Strategy for paginating the API's listings: LimitOffsetPagination (the default, for Wagtail's
+    # API and Django REST Framework's LimitOffsetPagination), CountlessLimitOffsetPagination or
+    # CursorPagination, from generic_chooser.pagination
+    api_pagination_class = LimitOffsetPagination
+
+    def get_api_fields(self):
+        return self.api_fields
+
+    def get_api_pagination(self):
+        return self.api_pagination_class(self.per_page)
+
+    def get_page_number_from_url(self):
+        # the 'p' parameter holds whatever token the pagination strategy uses to identify pages,
+        # such as a cursor
+        return self.get_api_pagination().get_page_token(self.request.GET.get('p'))
+
+    def cache_listing_items(self, items, api_base_url=None):
+        if self.detail_cache_timeout is not None and self.populate_detail_cache_from_listing:
+            item_cache.set_many(
+                api_base_url or self.api_base_url, items, self.detail_cache_timeout,
+                self.get_api_fields()
+            )
+
     def get_api_parameters(self, search_term=None, **kwargs):
         params = {'format': 'json'}
 
         if search_term:
             params['search'] = search_term
 
+        params.update(get_fields_parameter(self.get_api_fields()))
         return params
 
     def get_object_list(self, **kwargs):
         params = self.get_api_parameters(**kwargs)
 
-        result = requests.get(self.api_base_url, params=params).json()
-        return result['items']
+        status_code, result = get_json(
+            self.api_base_url, params=params, revalidate_timeout=self.revalidate_cache_timeout
+        )
+        items = self.get_api_pagination().get_items(result)
+        self.cache_listing_items(items)
+        return items
+
+    def get_object_iterator(self, **kwargs):
+        params = self.get_api_parameters(**kwargs)
+        response = api_get(self.api_base_url, params=params, stream=True)
+        try:
+            # check the status before the streamed listing starts, so that an error response
+            # fails the request rather than being parsed as the listing
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return self.iter_streamed_items(response)
+
+    def iter_streamed_items(self, response):
+        # parse the items out of the response as it arrives, rather than loading the whole
+        # response body first
+        try:
+            yield from iter_json_list(
+                iter_text(response.iter_content(chunk_size=65536)),
+                self.get_api_pagination().items_keys
+            )
+        finally:
+            response.close()
 
     def get_paginated_object_list(self, page_number, **kwargs):
+        pagination = self.get_api_pagination()
         params = self.get_api_parameters(**kwargs)
-        params['limit'] = self.per_page
-        params['offset'] = (page_number - 1) * self.per_page
+        params.update(pagination.get_parameters(page_number))
 
-        result = requests.get(self.api_base_url, params=params).json()
-        paginator = APIPaginator(result['meta']['total_count'], self.per_page)
-        page = Page(result['items'], page_number, paginator)
-        return (page, paginator)
+        status_code, result = get_json(
+            self.api_base_url, params=params, revalidate_timeout=self.revalidate_cache_timeout
+        )
+
+        if not pagination.has_count:
+            total_count = None
+        elif self.count_cache_timeout is None:
+            total_count = pagination.get_total_count(result)
+        else:
+            # Keep the count from the first page of this listing, so that the page range stays
+            # stable while paging through it; this also allows upstreams to skip counting (and
+            # omit total_count) on subsequent pages
+            cache_key = self.get_listing_cache_key('count', **kwargs)
+            total_count = cache.get(cache_key)
+            record_cache_lookup('count', total_count is not None)
+            if total_count is None:
+                total_count = pagination.get_total_count(result)
+                cache.set(cache_key, total_count, self.count_cache_timeout)
+
+        page = pagination.get_page(result, page_number, total_count)
+        self.cache_listing_items(page.object_list)
+        return (page, page.paginator)
+
+    def get_typeahead_object_list(self, search_term, limit):
+        pagination = self.get_api_pagination()
+        params = self.get_api_parameters(search_term=search_term)
+        params.update(pagination.get_range_parameters(0, limit))
+
+        status_code, result = get_json(
+            self.api_base_url, params=params, revalidate_timeout=self.revalidate_cache_timeout
+        )
+        items = pagination.get_items(result)
+        self.cache_listing_items(items)
+        return items[:limit]
 
     def get_object_id(self, item):
         return item['id']
@@ -324,23 +1135,276 @@ class DRFChooserMixin(ChooserMixin):
             super().get_object_string(item)
 
     def get_object(self, id):
-        url = '%s%s/?format=json' % (self.api_base_url, quote(id))
-        result = requests.get(url).json()
+        return fetch_api_item(
+            self.api_base_url, id,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.get_api_fields(),
+        )
 
-        if 'id' not in result:
-            # assume this is a 'not found' report
-            raise ObjectDoesNotExist(result['message'])
 
+class FederatedDRFChooserMixin(DRFChooserMixin):
+    """
+    Mixin for chooser modals backed by several Django REST Framework API endpoints returning items
+    in the same format, which are queried in parallel. Items are identified by IDs of the form
+    'endpoint_name:id'.
+    """
+
+    # dict mapping endpoint names to API base URLs, such as
+    # {'eu': 'https://eu.example.com/api/products/', 'us': 'https://us.example.com/api/products/'}
+    api_endpoints = {}
+
+    # Number of seconds to wait for endpoints to respond to listing requests. Listings are shown
+    # without the results of endpoints that have not responded in time, or have failed.
+    endpoint_timeout = 5
+
+    # The largest `limit` the endpoints accept (WAGTAILAPI_LIMIT_MAX for Wagtail's API, 20 by
+    # default); longer ranges of items are fetched in several requests
+    endpoint_limit_max = 20
+
+    unavailable_endpoints = ()
+
+    def fetch_endpoint_json(self, api_base_url, params):
+        status_code, result = get_json(
+            api_base_url, params=params, revalidate_timeout=self.revalidate_cache_timeout,
+            timeout=self.endpoint_timeout,
+        )
+        if status_code != 200:
+            raise ValueError("%s returned status %d" % (api_base_url, status_code))
         return result
 
+    def fetch_endpoint_listing(self, endpoint_name, params, offset=None, limit=None):
+        """
+        Fetch the listing with the given parameters from the named endpoint. If offset and limit
+        are given, fetch that range of items, in requests of at most endpoint_limit_max items.
+        The result records the offset of its first item as 'offset', and the endpoint's total
+        count as 'total_count' (None if the response does not report one).
+        """
+        api_base_url = self.api_endpoints[endpoint_name]
+        pagination = self.get_api_pagination()
+        if limit is None:
+            result = self.fetch_endpoint_json(api_base_url, params)
+            items = pagination.get_items(result)
+            offset = 0
+        else:
+            items = []
+            while True:
+                chunk_limit = min(limit - len(items), self.endpoint_limit_max)
+                result = self.fetch_endpoint_json(
+                    api_base_url,
+                    dict(params, **pagination.get_range_parameters(offset + len(items), chunk_limit))
+                )
+                chunk = pagination.get_items(result)
+                items.extend(chunk)
+                if len(items) >= limit or len(chunk) < chunk_limit:
+                    break
+
+        try:
+            total_count = pagination.get_total_count(result)
+        except KeyError:
+            total_count = None
+
+        self.cache_listing_items(items, api_base_url)
+        return {'items': items, 'total_count': total_count, 'offset': offset}
+
+    def query_endpoints(self, params, ranges=None):
+        """
+        Fetch the listing with the given parameters from all endpoints in parallel - or, if ranges
+        is given, the range of items given as an (offset, limit) tuple for each endpoint named
+        in it - returning a dict of results from those that responded successfully within
+        endpoint_timeout. The names of the others are added to self.unavailable_endpoints.
+        """
+        if ranges is None:
+            ranges = {endpoint_name: (None, None) for endpoint_name in self.api_endpoints}
+        endpoint_names = list(ranges)
+        futures = call_concurrently([
+            functools.partial(
+                self.fetch_endpoint_listing, endpoint_name, params, *ranges[endpoint_name]
+            )
+            for endpoint_name in endpoint_names
+        ], timeout=self.endpoint_timeout)
+
+        results = {}
+        self.unavailable_endpoints = list(self.unavailable_endpoints)
+        for endpoint_name, future in zip(endpoint_names, futures):
+            if not future.done():
+                logger.warning("Chooser endpoint %s timed out", endpoint_name)
+                self.unavailable_endpoints.append(endpoint_name)
+            elif future.exception() is not None:
+                logger.warning(
+                    "Chooser endpoint %s failed: %s", endpoint_name, future.exception()
+                )
+                self.unavailable_endpoints.append(endpoint_name)
+            else:
+                results[endpoint_name] = future.result()
+
+        return results
+
+    def merge_endpoint_items(self, results):
+        """
+        Return an iterator over the items of the given endpoint results, merged by rank (taking
+        the first item from each endpoint in turn, then the second, and so on) and with their
+        IDs federated
+        """
+        ranked_lists = [
+            [(rank, endpoint_name, item) for rank, item in enumerate(result['items'])]
+            for endpoint_name, result in results.items()
+        ]
+        return (
+            federate_item(endpoint_name, item)
+            for rank, endpoint_name, item in heapq.merge(*ranked_lists, key=operator.itemgetter(0))
+        )
+
+    def get_object_list(self, **kwargs):
+        results = self.query_endpoints(self.get_api_parameters(**kwargs))
+        return list(self.merge_endpoint_items(results))
+
+    def get_object_iterator(self, **kwargs):
+        return iter(self.get_object_list(**kwargs))
+
+    def get_merged_positions(self, counts, offset, limit):
+        """
+        Return a list of (endpoint_name, rank) pairs for the items at positions offset to
+        offset + limit of the merged listing of endpoints with the given item counts
+        """
+        def items_before(rank):
+            return sum(min(count, rank) for count in counts.values())
+
+        max_rank = max(counts.values(), default=0)
+        if offset >= items_before(max_rank):
+            return []
+
+        # each rank holds at most one item from each endpoint, so the rank of the item at `offset`
+        # is at least offset // len(counts)
+        rank = offset // len(counts)
+        while items_before(rank + 1) <= offset:
+            rank += 1
+
+        position = items_before(rank)
+        positions = []
+        while rank < max_rank and len(positions) < limit:
+            for endpoint_name, count in counts.items():
+                if rank < count:
+                    if position >= offset and len(positions) < limit:
+                        positions.append((endpoint_name, rank))
+                    position += 1
+            rank += 1
+        return positions
+
+    def get_paginated_object_list(self, page_number, **kwargs):
+        params = self.get_api_parameters(**kwargs)
+        offset = (page_number - 1) * self.per_page
+
+        # The page cannot start before rank offset // len(api_endpoints) of any endpoint, so
+        # fetch a page of items from there - which also tells us each endpoint's total count
+        start_rank = offset // max(len(self.api_endpoints), 1)
+        results = self.query_endpoints(params, {
+            endpoint_name: (start_rank, self.per_page) for endpoint_name in self.api_endpoints
+        })
+
+        total_count = sum(result['total_count'] for result in results.values())
+        paginator = APIPaginator(total_count, self.per_page)
+        page_number = paginator.get_page(page_number).number
+        offset = (page_number - 1) * self.per_page
+
+        def get_positions():
+            counts = {
+                endpoint_name: results[endpoint_name]['total_count']
+                for endpoint_name in self.api_endpoints if endpoint_name in results
+            }
+            return self.get_merged_positions(counts, offset, self.per_page)
+
+        # fetch any ranges of items on this page that the first requests did not cover
+        ranks = {}
+        for endpoint_name, rank in get_positions():
+            ranks.setdefault(endpoint_name, []).append(rank)
+        missing_ranges = {}
+        for endpoint_name, endpoint_ranks in ranks.items():
+            result = results[endpoint_name]
+            first, last = min(endpoint_ranks), max(endpoint_ranks)
+            if first < result['offset'] or last >= result['offset'] + len(result['items']):
+                missing_ranges[endpoint_name] = (first, last - first + 1)
+        if missing_ranges:
+            for endpoint_name in missing_ranges:
+                del results[endpoint_name]
+            results.update(self.query_endpoints(params, missing_ranges))
+
+        items = []
+        for endpoint_name, rank in get_positions():
+            result = results[endpoint_name]
+            index = rank - result['offset']
+            if 0 <= index < len(result['items']):
+                items.append(federate_item(endpoint_name, result['items'][index]))
+        return (Page(items, page_number, paginator), paginator)
+
+    def get_typeahead_items(self, search_term, limit):
+        params = self.get_api_parameters(search_term=search_term)
+        results = self.query_endpoints(params, {
+            endpoint_name: (0, limit) for endpoint_name in self.api_endpoints
+        })
+        items = list(itertools.islice(self.merge_endpoint_items(results), limit))
+        # partial results are not cached
+        return (items, bool(self.unavailable_endpoints))
+
+    def get_typeahead_object_list(self, search_term, limit):
+        return self.get_typeahead_items(search_term, limit)[0]
+
+    def get_listing_results_context_data(self):
+        context = super().get_listing_results_context_data()
+        context['unavailable_sources'] = self.unavailable_endpoints
+        return context
+
+    def get_object(self, id):
+        return fetch_federated_item(
+            self.api_endpoints, id,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.get_api_fields(),
+        )
+
+    def get_objects(self, ids):
+        items = fetch_federated_items(
+            self.api_endpoints, ids,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.get_api_fields(),
+        )
+        return [items[str(id)] for id in ids if str(id) in items]
+
 
 class ChooserListingTabMixin:
     search_placeholder = _("Search")
     listing_tab_label = _("Search")
 
     listing_tab_template = 'generic_chooser/_listing_tab.html'
+    # the #search-results container, included by the listing tab template
+    search_results_template = 'generic_chooser/_search_results.html'
     results_template = 'generic_chooser/_results.html'
 
+    recent_tab_label = _("Recent")
+    recent_tab_template = 'generic_chooser/_recent_tab.html'
+    # number of items to show in each of the 'recently chosen' and 'frequently chosen' lists
+    recent_tab_items = 5
+
+    # Search terms shorter than this are ignored, and not sent to the server as the user types
+    search_min_length = None
+    # Number of search / pagination results that the chooser modal keeps in its client-side cache
+    results_cache_size = 20
+
+    # Per-user limit on search / pagination ('results=true') requests, as a rate such as '60/m';
+    # requests over the limit receive a 429 response. results_rate_burst is the number of requests
+    # that may be made in quick succession, defaulting to the number of requests in the rate.
+    results_rate_limit = None
+    results_rate_burst = None
+
+    # If True, concurrent identical search / pagination requests within a process share a single
+    # computation of the results. Only enable this if the results do not vary by user other than
+    # through get_scope, or if get_results_coalescing_key accounts for this.
+    coalesce_results = False
+
     def get_page_number_from_url(self):
         try:
             page_number = int(self.request.GET.get('p', 1))
@@ -369,50 +1433,239 @@ class ChooserListingTabMixin:
             'title': self.get_object_string(item),
         }
 
-    def get_results_template(self):
-        return self.results_template
+    def get_results_template(self):
+        return self.results_template
+
+    def get_listing_tab_template(self):
+        return self.listing_tab_template
+
+    def get_listing_filters(self):
+        """
+        Return the parameters to be passed to get_object_list / get_paginated_object_list to
+        modify results
+        """
+        filters = {}
+
+        if self.is_searchable:
+            self.search_form = self.get_search_form()
+            if self.search_form.is_valid():
+                search_term = self.search_form.cleaned_data['q']
+                if len(search_term) >= (self.search_min_length or 0):
+                    filters['search_term'] = search_term
+
+        return filters
+
+    def is_streaming_results(self):
+        return self.stream_unpaginated_results and self.per_page is None
+
+    def get_results_url(self):
+        """
+        Return the URL of the results partial for the current listing, from which a streamed
+        listing is loaded after the modal opens
+        """
+        params = {'results': 'true'}
+        if self.filters.get('search_term'):
+            params['q'] = self.filters['search_term']
+        if self.filters.get('parent_id'):
+            params['parent'] = self.filters['parent_id']
+
+        url = self.get_choose_url()
+        if '?' in url:
+            return url + '&' + urllib.parse.urlencode(params)
+        else:
+            return url + '?' + urllib.parse.urlencode(params)
+
+    def get_listing_tab_context_data(self):
+        self.filters = self.get_listing_filters()
+
+        self.is_paginated = self.per_page is not None
+        if self.is_paginated:
+            page_number = self.get_page_number_from_url()
+            self.object_list, self.paginator = self.get_paginated_object_list(page_number, **self.filters)
+        elif self.is_streaming_results():
+            # results are fetched separately, through get_streaming_results_response
+            self.object_list = []
+        else:
+            self.object_list = self.get_object_list(**self.filters)
+
+        return self.get_listing_results_context_data()
+
+    def get_listing_results_context_data(self):
+        """
+        Return the listing tab context for the results that have been fetched into
+        self.object_list (and self.paginator, for paginated listings)
+        """
+        context = {
+            'rows': self.get_rows(),
+            'results_template': self.get_results_template(),
+            'search_results_template': self.search_results_template,
+            'is_searchable': self.is_searchable,
+            'choose_url': self.get_choose_url(),
+            'chosen_multiple_url': self.get_chosen_multiple_url(),
+            'is_paginated': self.is_paginated,
+            'is_multiple_choice': bool(self.request.GET.get('multiple')),
+            'results_cache_size': self.results_cache_size,
+        }
+
+        if self.is_searchable:
+            context.update({
+                'search_form': self.search_form,
+                'search_min_length': self.search_min_length or 0,
+            })
+
+        if self.is_paginated:
+            context.update({
+                'page': self.object_list,
+                'paginator': self.paginator,
+            })
+        elif self.is_streaming_results():
+            context['results_url'] = self.get_results_url()
+
+        return context
+
+    def iter_streamed_results(self, context):
+        """
+        Render the results template in sections - the start of the listing, the rows in chunks of
+        stream_chunk_size, and the end of the listing - yielding each one as it is rendered
+        """
+        template = self.get_results_template()
+        yield render_to_string(template, dict(context, stream_section='start'), request=self.request)
+
+        rows = self.get_rows()
+        while True:
+            chunk = list(itertools.islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            yield render_to_string(
+                template, dict(context, rows=chunk, stream_section='rows'), request=self.request
+            )
+
+        yield render_to_string(template, dict(context, stream_section='end'), request=self.request)
+
+    def get_streaming_results_response(self, context):
+        self.object_list = self.get_object_iterator(**self.filters)
+
+        # The sections are rendered after the view has returned, outside of the admin's override
+        # of the user's preferred language and time zone, so re-apply them for each section
+        language = get_language()
+        current_timezone = timezone.get_current_timezone()
+
+        def stream(sections):
+            while True:
+                with translation.override(language), timezone.override(current_timezone):
+                    section = next(sections, None)
+                if section is None:
+                    return
+                yield section
+
+        return StreamingHttpResponse(
+            stream(self.iter_streamed_results(context)), content_type='text/html; charset=utf-8'
+        )
+
+    def get_recent_tab_context_data(self):
+        """
+        Return the context for the recent choices tab, or None if there are no recent choices to
+        show. This only reads the user's recent choices store, not the listing.
+        """
+        store = self.get_recent_choices_store()
+        if store is None:
+            return None
+
+        entries = store.load()
+        if not entries:
+            return None
+
+        def get_rows(choices):
+            return [
+                {
+                    'object_id': object_id,
+                    'choose_url': self.get_chosen_url_for_id(object_id),
+                    'title': title,
+                }
+                for object_id, title in choices
+            ]
+
+        return {
+            'recent_rows': get_rows(store.get_recent(self.recent_tab_items, entries)),
+            'frequent_rows': get_rows(store.get_frequent(self.recent_tab_items, entries)),
+            'results_template': self.get_results_template(),
+        }
+
+    def get_rate_limit_key(self):
+        """
+        Return the key identifying the client for results_rate_limit
+        """
+        user = self.request.user
+        if user.is_authenticated:
+            ident = 'user:%s' % user.pk
+        else:
+            ident = 'ip:%s' % self.request.META.get('REMOTE_ADDR')
+        return make_cache_key('results-rate', self.choose_url_name, ident)
+
+    def get_results_rate_limit_wait(self):
+        """
+        Record a results request against the rate limit, returning 0 if it is allowed or the number
+        of seconds the client should wait before retrying otherwise
+        """
+        if not self.results_rate_limit:
+            return 0
+
+        bucket = TokenBucket(self.results_rate_limit, self.results_rate_burst)
+        return bucket.consume(self.get_rate_limit_key())
+
+    def get_rate_limited_response(self, wait):
+        response = HttpResponse(_("Too many requests"), status=429, content_type='text/plain')
+        response['Retry-After'] = str(max(1, round(wait)))
+        return response
+
+    def get_results_coalescing_key(self):
+        """
+        Return a key identifying the results for this request; concurrent requests with the same
+        key share the same rendered results when coalesce_results is True
+        """
+        # the rendered results are translated into the active language
+        return make_cache_key(
+            'results', self.choose_url_name, get_language(), sorted(self.request.GET.lists()),
+            self.listing_scope,
+        )
+
+    def render_results(self):
+        with self.profile_phase('listing'):
+            context = self.get_context_data(results_only=True)
+        with self.profile_phase('render'):
+            return render_to_string(self.get_results_template(), context, request=self.request)
 
-    def get_listing_tab_template(self):
-        return self.listing_tab_template
 
-    def get_listing_tab_context_data(self):
-        # parameters passed to get_object_list / get_paginated_object_list to modify results
-        filters = {}
+class AsyncChooserListingTabMixin(ChooserListingTabMixin):
+    """
+    Counterpart of ChooserListingTabMixin for async views. The listing is fetched by
+    aget_listing_tab_context_data before the rest of the context is built.
+    """
+    listing_tab_context = None
 
-        if self.is_searchable:
-            self.search_form = self.get_search_form()
-            if self.search_form.is_valid():
-                filters['search_term'] = self.search_form.cleaned_data['q']
+    async def aget_listing_tab_context_data(self):
+        self.filters = self.get_listing_filters()
 
         self.is_paginated = self.per_page is not None
         if self.is_paginated:
             page_number = self.get_page_number_from_url()
-            self.object_list, self.paginator = self.get_paginated_object_list(page_number, **filters)
+            self.object_list, self.paginator = await self.aget_paginated_object_list(
+                page_number, **self.filters
+            )
         else:
-            self.object_list = self.get_object_list(**filters)
-
-        context = {
-            'rows': self.get_rows(),
-            'results_template': self.get_results_template(),
-            'is_searchable': self.is_searchable,
-            'choose_url': self.get_choose_url(),
-            'chosen_multiple_url': self.get_chosen_multiple_url(),
-            'is_paginated': self.is_paginated,
-            'is_multiple_choice': bool(self.request.GET.get('multiple')),
-        }
+            self.object_list = await self.aget_object_list(**self.filters)
 
-        if self.is_searchable:
-            context.update({
-                'search_form': self.search_form,
-            })
+        self.listing_tab_context = self.get_listing_results_context_data()
+        return self.listing_tab_context
 
-        if self.is_paginated:
-            context.update({
-                'page': self.object_list,
-                'paginator': self.paginator,
-            })
+    def get_listing_tab_context_data(self):
+        if self.listing_tab_context is None:
+            return super().get_listing_tab_context_data()
+        return self.listing_tab_context
 
-        return context
+    async def arender_results(self):
+        await self.aget_listing_tab_context_data()
+        return self.render_results()
 
 
 class ChooserCreateTabMixin:
@@ -422,9 +1675,36 @@ class ChooserCreateTabMixin:
     create_form_is_long_running = False
     create_form_submitted_label = _("Uploading…")
 
+    # If True, valid create form submissions are passed to form_valid in a background thread, and
+    # the chooser modal polls for the result every create_job_poll_interval seconds. The state of
+    # each job is kept in Django's cache for up to create_job_timeout seconds.
+    create_form_in_background = False
+    create_job_poll_interval = 1
+    create_job_timeout = 60 * 60
+    create_job_error_message = _("The item could not be created.")
+
+    # If True, files chosen in the create form are uploaded in chunks of upload_chunk_size bytes
+    # before the form is submitted, and assembled on disk (in upload_dir, or a directory within
+    # FILE_UPLOAD_TEMP_DIR by default). Interrupted uploads are resumed from the last chunk received;
+    # incomplete uploads expire after chunked_upload_timeout seconds.
+    chunked_uploads = False
+    upload_chunk_size = 1024 * 1024
+    upload_dir = None
+    chunked_upload_timeout = 60 * 60 * 24
+    # Largest file, in bytes, that may be uploaded in chunks; None for no limit
+    max_upload_size = 1024 * 1024 * 1024
+    chunked_upload_error_message = _("The file could not be uploaded.")
+
+    # If True, the create form is left out of the initial modal response and fetched from
+    # get_create_tab_url the first time the create tab is selected
+    lazy_create_tab = False
+
     initial = {}
     form_class = None
 
+    # the uploaded files that the create form is bound to, if not the request's own (see post)
+    form_files = None
+
     def get_initial(self):
         """Return the initial data to use for forms on this view."""
         return self.initial.copy()
@@ -448,7 +1728,7 @@ class ChooserCreateTabMixin:
         if self.request.method in ('POST', 'PUT'):
             kwargs.update({
                 'data': self.request.POST,
-                'files': self.request.FILES,
+                'files': self.request.FILES if self.form_files is None else self.form_files,
             })
         return kwargs
 
@@ -467,12 +1747,192 @@ class ChooserCreateTabMixin:
         """
         raise NotImplementedError
 
+    def get_create_tab_template(self):
+        return self.create_tab_template
+
+    def get_create_tab_url(self):
+        """
+        Return the URL that the lazily-loaded create tab is fetched from
+        """
+        url = self.get_choose_url()
+        if '?' in url:
+            return url + '&create_tab=true'
+        else:
+            return url + '?create_tab=true'
+
+    def get_chunked_upload(self, upload_id):
+        return ChunkedUpload(
+            upload_id, self.request.user.pk, upload_dir=self.upload_dir,
+            timeout=self.chunked_upload_timeout,
+        )
+
+    def get_upload_response(self):
+        """
+        Handle a request to the chunked upload endpoint, identified by the 'upload' URL parameter:
+        a POST with upload=start (and name, size and content_type fields) to start an upload, a
+        POST with the upload's ID and an offset parameter to append a chunk, or a GET with the
+        upload's ID to find the offset to resume from
+        """
+        if not (self.chunked_uploads and self.create_form_is_available()):
+            raise PermissionDenied
+
+        upload_id = self.request.GET['upload']
+        if self.request.method == 'POST' and upload_id == 'start':
+            try:
+                size = int(self.request.POST['size'])
+                name = self.request.POST['name']
+            except (KeyError, ValueError):
+                return JsonResponse({'error': "Invalid upload"}, status=400)
+            if size < 0 or not name:
+                return JsonResponse({'error': "Invalid upload"}, status=400)
+            if self.max_upload_size is not None and size > self.max_upload_size:
+                return JsonResponse({'error': "File too large"}, status=413)
+
+            upload = ChunkedUpload.start(
+                self.request.user.pk, name, size,
+                self.request.POST.get('content_type') or 'application/octet-stream',
+                upload_dir=self.upload_dir, timeout=self.chunked_upload_timeout,
+            )
+            return JsonResponse({
+                'upload_id': upload.id, 'offset': 0, 'chunk_size': self.upload_chunk_size,
+            })
+
+        try:
+            upload = self.get_chunked_upload(upload_id)
+        except UploadError:
+            return JsonResponse({'error': "Unknown upload"}, status=404)
+        if upload.load() is None:
+            return JsonResponse({'error': "Unknown upload"}, status=404)
+
+        if self.request.method == 'POST':
+            try:
+                offset = int(self.request.GET['offset'])
+            except (KeyError, ValueError):
+                return JsonResponse({'error': "Invalid offset"}, status=400)
+
+            try:
+                # read the chunk from the request stream rather than request.body, so that it is
+                # not held in memory or subject to DATA_UPLOAD_MAX_MEMORY_SIZE
+                offset = upload.append(offset, self.request, self.upload_chunk_size)
+            except UploadError as e:
+                return JsonResponse({'error': str(e), 'offset': upload.get_offset()}, status=409)
+        else:
+            offset = upload.get_offset()
+
+        return JsonResponse({'upload_id': upload.id, 'offset': offset})
+
+    def attach_chunked_uploads(self):
+        """
+        Add the files of completed chunked uploads to request.FILES, to be passed to the form, and
+        return the uploads. The IDs of the uploads for each file field are submitted as
+        '<field name>:upload' form fields.
+        """
+        uploads = []
+        for key, upload_ids in self.request.POST.lists():
+            if not key.endswith(':upload'):
+                continue
+
+            name = key[:-len(':upload')]
+            for upload_id in upload_ids:
+                try:
+                    upload = self.get_chunked_upload(upload_id)
+                except UploadError:
+                    continue
+                uploaded_file = upload.get_uploaded_file()
+                if uploaded_file is not None:
+                    # closed by Django along with the request's other files; the upload itself is
+                    # ended by finish once the form has been handled
+                    self.request.FILES.appendlist(name, uploaded_file)
+                    uploads.append(upload)
+        return uploads
+
+    def get_create_job_url(self, job):
+        """
+        Return the URL that the chooser modal polls for the status of the given create job
+        """
+        url = self.get_choose_url()
+        param_string = urllib.parse.urlencode({'create_job': job.id})
+        if '?' in url:
+            return url + '&' + param_string
+        else:
+            return url + '?' + param_string
+
+    def start_create_job(self, form, uploads=()):
+        """
+        Start processing the given valid form submission in the background, and return the
+        response for the chooser modal to poll the job's status
+        """
+        job = CreateJob.start(self.request.user.pk, timeout=self.create_job_timeout)
+
+        run_job = functools.partial(self.run_create_job, job, form, self.form_files, uploads)
+        # a job started within a transaction (such as under ATOMIC_REQUESTS) would not see its
+        # changes from another thread, so is only submitted once the transaction is committed; if
+        # it is rolled back, the job is never run and reports a failure once it expires
+        transaction.on_commit(functools.partial(self.submit_create_job, run_job))
+
+        return self.get_create_job_response(job)
+
+    def submit_create_job(self, func):
+        """
+        Call the given function in the background. Create jobs are run in a thread pool of their
+        own, separate from the one used for lookups; subclasses may override this to run them
+        elsewhere.
+        """
+        call_in_background(func, executor=get_job_executor())
+
+    def run_create_job(self, job, form, files, uploads=()):
+        try:
+            instance = self.form_valid(form)
+            # invalidate cached data (such as result counts) for this chooser
+            bump_generation(self.get_data_generation_name())
+            result = self.get_chosen_result(instance)
+        except Exception:
+            logger.exception("Background create job for %s failed", self.get_choose_url())
+            job.save(CreateJob.FAILED)
+        else:
+            job.save(CreateJob.DONE, result)
+        finally:
+            close_uploaded_files(files)
+            # the modal forgets the IDs of completed uploads, so they cannot be submitted again
+            for upload in uploads:
+                upload.finish()
+
+    def get_create_job_response(self, job):
+        """
+        Return the response for the current status of the given create job: the chosen response
+        once it is done, or otherwise a 'create_job' step for the chooser modal to poll again or
+        report an error
+        """
+        state = job.load()
+        if state is not None and state['status'] == CreateJob.DONE:
+            return self._wrap_chosen_response_data(state['result'])
+
+        json_data = {
+            'step': 'create_job',
+            'error_label': _("Error"),
+            'error_message': self.create_job_error_message,
+        }
+        if state is None or state['status'] == CreateJob.FAILED:
+            json_data['status'] = CreateJob.FAILED
+        else:
+            # the error is also reported if the modal gives up polling for the job's status
+            json_data.update({
+                'status': CreateJob.PENDING,
+                'job_url': self.get_create_job_url(job),
+                'poll_interval': self.create_job_poll_interval,
+            })
+        return render_modal_workflow(self.request, None, None, None, json_data=json_data)
+
     def get_create_tab_context_data(self):
         context = {
+            'choose_url': self.get_choose_url(),
             'create_form_submit_label': self.create_form_submit_label,
             'create_form_is_long_running': self.create_form_is_long_running,
             'create_form_submitted_label': self.create_form_submitted_label,
             'create_form': self.form,
+            'chunked_uploads': self.chunked_uploads,
+            'upload_chunk_size': self.upload_chunk_size,
+            'chunked_upload_error_message': self.chunked_upload_error_message,
         }
 
         return context
@@ -504,47 +1964,212 @@ class ModelChooserCreateTabMixin(ChooserCreateTabMixin):
 
 class DRFChooserCreateTabMixin(ChooserCreateTabMixin):
     def form_valid(self, form):
-        result = requests.post(self.api_base_url, json=form.cleaned_data)
+        result = api_post(self.api_base_url, json=form.cleaned_data)
         return result.json()
 
 
+class ModalSlot:
+    """
+    Stands in for a template included by the modal template, rendering a marker in its place. The
+    modal's 'shell' is rendered with slots in place of its per-request parts, cached, and the
+    markers then replaced by those parts on each request.
+    """
+    marker_re = re.compile(r'<!--generic_chooser:slot:([\w-]+)-->')
+
+    def __init__(self, name):
+        self.name = name
+        self.marker = '<!--generic_chooser:slot:%s-->' % name
+
+    def render(self, context=None, request=None):
+        return mark_safe(self.marker)
+
+
 class BaseChooseView(ModalPageFurnitureMixin, ContextMixin, View):
     icon = 'snippet'
     page_title = _("Choose")
 
     template = 'generic_chooser/tabbed_modal_v3.html'
 
+    # Number of seconds to cache the rendered modal 'shell' - the header, tab navigation and
+    # search form - for, or None to disable. The shell is cached per viewset, language, set of
+    # tabs and choose URL; the results and the content of the other tabs are rendered on each
+    # request. Modals opened with a search term are not cached.
+    modal_shell_cache_timeout = None
+
     def get_template(self):
         return self.template
 
+    def get_view_type(self):
+        """
+        Return a name identifying the kind of request being handled, for logging
+        """
+        if self.request.method == 'POST' and not self.request.GET.get('upload'):
+            return 'create'
+        elif self.request.GET.get('results') == 'true':
+            return 'results'
+        elif self.request.GET.get('create_tab') == 'true':
+            return 'create_tab'
+        elif self.request.GET.get('create_job'):
+            return 'create_job'
+        elif self.request.GET.get('upload'):
+            return 'upload'
+        else:
+            return 'choose'
+
     def get(self, request):
         # 'results=true' URL param indicates we should only render the results partial
         # rather than serving a full ModalWorkflow response
         if request.GET.get('results') == 'true':
-            return render(
-                request,
-                self.get_results_template(),
-                self.get_context_data(results_only=True)
-            )
+            wait = self.get_results_rate_limit_wait()
+            if wait:
+                return self.get_rate_limited_response(wait)
+
+            if self.is_streaming_results():
+                context = self.get_context_data(results_only=True)
+                return self.get_streaming_results_response(context)
+
+            if self.coalesce_results:
+                html = results_single_flight.do(self.get_results_coalescing_key(), self.render_results)
+            else:
+                html = self.render_results()
+
+            return HttpResponse(html)
+        elif request.GET.get('create_tab') == 'true':
+            # 'create_tab=true' URL param indicates we should only render the create tab partial,
+            # to be inserted into the modal when a lazily-loaded create tab is first selected
+            return self.get_create_tab_response()
+        elif request.GET.get('create_job'):
+            # 'create_job' URL param gives the ID of a background create job to report the status of
+            return self.get_create_job_status_response()
+        elif request.GET.get('upload'):
+            # 'upload' URL param gives the ID of a chunked upload to report the progress of
+            return self.get_upload_response()
         else:
-            if self.create_form_is_available():
-                self.form = self.get_form()
+            return self.get_modal_response()
+
+    def get_create_job_status_response(self):
+        if not self.create_form_is_available():
+            raise PermissionDenied
+
+        job = CreateJob(
+            self.request.GET['create_job'], self.request.user.pk, timeout=self.create_job_timeout
+        )
+        return self.get_create_job_response(job)
+
+    def get_create_tab_response(self):
+        if not self.create_form_is_available():
+            raise PermissionDenied
+
+        self.form = self.get_form()
+        return render(
+            self.request,
+            self.get_create_tab_template(),
+            self.get_create_tab_context_data()
+        )
+
+    def get_modal_response(self):
+        if self.create_form_is_available() and not self.lazy_create_tab:
+            self.form = self.get_form()
+
+        with self.profile_phase('listing'):
+            context = self.get_context_data()
+        with self.profile_phase('render'):
+            if self.modal_shell_cache_timeout is None or 'q' in self.request.GET:
+                return render_modal_workflow(
+                    self.request,
+                    self.get_template(), None,
+                    context, json_data={'step': 'choose'}
+                )
 
             return render_modal_workflow(
-                request,
-                self.get_template(), None,
-                self.get_context_data(), json_data={'step': 'choose'}
+                self.request, None, None, None,
+                json_data={'step': 'choose', 'html': self.render_modal_from_shell(context)}
             )
 
+    def get_modal_shell_cache_key(self, context):
+        tabs = [(tab['id'], str(tab['label']), tab.get('lazy_url')) for tab in context['tabs']]
+        return make_cache_key('modal-shell', self.choose_url_name, get_language(), [
+            self.get_template(), str(context['page_title']), self.get_choose_url(),
+            sorted(self.request.GET.lists()), tabs,
+        ])
+
+    def get_modal_slots(self, context):
+        """
+        Return a dict mapping the names of the modal's per-request parts to the templates that
+        render them, and the context for rendering the shell with slots in their place
+        """
+        slots = {'search-results': context['search_results_template']}
+        shell_tabs = []
+        for i, tab in enumerate(context['tabs']):
+            tab = dict(tab)
+            # the first tab is the listing tab, whose search form is part of the shell
+            if i > 0 and not tab.get('lazy_url'):
+                slots[tab['id']] = tab['template']
+                tab['template'] = ModalSlot(tab['id'])
+            shell_tabs.append(tab)
+
+        shell_context = dict(
+            context, tabs=shell_tabs, search_results_template=ModalSlot('search-results')
+        )
+        return slots, shell_context
+
+    def render_modal_from_shell(self, context):
+        """
+        Render the modal HTML, taking the shell from the cache (or rendering and caching it) and
+        filling in its per-request parts
+        """
+        slots, shell_context = self.get_modal_slots(context)
+
+        cache_key = self.get_modal_shell_cache_key(context)
+        shell = cache.get(cache_key)
+        record_cache_lookup('modal_shell', shell is not None)
+        if shell is None:
+            shell = render_to_string(self.get_template(), shell_context, request=self.request)
+            found_slots = ModalSlot.marker_re.findall(shell)
+            if sorted(found_slots) != sorted(slots):
+                # the templates do not include each part exactly once, so cannot be cached
+                return render_to_string(self.get_template(), context, request=self.request)
+            cache.set(cache_key, shell, self.modal_shell_cache_timeout)
+
+        # replace the markers in a single pass, so that the parts are not searched for markers
+        return ModalSlot.marker_re.sub(
+            lambda match: render_to_string(slots[match.group(1)], context, request=self.request),
+            shell
+        )
+
     def post(self, request):
+        if request.GET.get('upload'):
+            # a chunk of a file for the create form, uploaded ahead of the form itself
+            return self.get_upload_response()
+
         if not self.create_form_is_available():
             raise PermissionDenied
 
+        uploads = self.attach_chunked_uploads() if self.chunked_uploads else []
+
+        if self.create_form_in_background:
+            # the job may outlive the request, whose uploaded files are closed (and temporary files
+            # deleted) by Django when it finishes, so bind the form to files owned by the job
+            self.form_files = copy_uploaded_files(self.request.FILES)
+
         self.form = self.get_form()
         if self.form.is_valid():
+            if self.create_form_in_background:
+                return self.start_create_job(self.form, uploads)
+
             instance = self.form_valid(self.form)
+            # invalidate cached data (such as result counts) for this chooser
+            bump_generation(self.get_data_generation_name())
+            for upload in uploads:
+                upload.finish()
             return self.get_chosen_response(instance)
         else:
+            if self.form_files is not None:
+                close_uploaded_files(self.form_files)
+            # the re-rendered form does not carry the upload IDs, so the file is chosen and
+            # uploaded again
+            for upload in uploads:
+                upload.finish()
             return render_modal_workflow(
                 request,
                 self.get_template(), None,
@@ -575,18 +2200,33 @@ class BaseChooseView(ModalPageFurnitureMixin, ContextMixin, View):
 
             context.update(self.get_listing_tab_context_data())
 
+            recent_tab_context = self.get_recent_tab_context_data()
+            if recent_tab_context:
+                context['tabs'].append({
+                    'label': self.recent_tab_label,
+                    'id': '%s-recent' % prefix,
+                    'template': self.recent_tab_template,
+                })
+                context.update(recent_tab_context)
+
             if self.create_form_is_available():
                 create_tab_id = '%s-create' % prefix
-                context['tabs'].append({
+                create_tab = {
                     'label': self.create_tab_label,
                     'id': create_tab_id,
-                    'template': self.create_tab_template,
+                    'template': self.get_create_tab_template(),
                     'classname': 'create-section',
-                })
-                context.update(self.get_create_tab_context_data())
-                if self.request.method == 'POST' and not self.form.is_valid():
-                    # focus the create tab on validation errors
-                    context['active_tab'] = create_tab_id
+                }
+                context['tabs'].append(create_tab)
+
+                if self.lazy_create_tab and self.request.method == 'GET':
+                    # leave the tab empty; tabs.js will fetch the form when it is first selected
+                    create_tab['lazy_url'] = self.get_create_tab_url()
+                else:
+                    context.update(self.get_create_tab_context_data())
+                    if self.request.method == 'POST' and not self.form.is_valid():
+                        # focus the create tab on validation errors
+                        context['active_tab'] = create_tab_id
 
             return context
 
@@ -595,23 +2235,60 @@ class ModelChooseView(ChooserMixin, ChooserListingTabMixin, ModelChooserCreateTa
     pass
 
 
-class APIPaginator(Paginator):
+class AsyncBaseChooseView(BaseChooseView):
     """
-    Customisation of Django's Paginator to give us access to the page_range / num_pages
-    functionality needed by pagination UI, without having to use Paginator's
-    list-slicing logic - which isn't a good fit for API use, as it relies on knowing
-    the total count of results before deciding which slice to request.
+    Counterpart of BaseChooseView for async views. The listing is fetched asynchronously; the
+    create form, which may need database queries to render, is handled in a thread.
+    """
+    async def get(self, request):
+        if request.GET.get('results') == 'true':
+            # the rate limit is tracked in the cache, which is accessed synchronously
+            wait = await sync_to_async(self.get_results_rate_limit_wait)()
+            if wait:
+                return self.get_rate_limited_response(wait)
+
+            if self.coalesce_results:
+                # requests are coalesced within the event loop, as waiting on the threads of
+                # results_single_flight would block it. The key includes the scope, which may
+                # need database queries to resolve, so it is built in a thread
+                key = await sync_to_async(self.get_results_coalescing_key)()
+                html = await async_results_single_flight.do(key, self.arender_results)
+            else:
+                html = await self.arender_results()
+            return HttpResponse(html)
+        elif request.GET.get('create_tab') == 'true':
+            return await sync_to_async(self.get_create_tab_response)()
+        elif request.GET.get('create_job'):
+            return await sync_to_async(self.get_create_job_status_response)()
+        elif request.GET.get('upload'):
+            return await sync_to_async(self.get_upload_response)()
+        else:
+            await self.aget_listing_tab_context_data()
+            return await sync_to_async(self.get_modal_response)()
+
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
 
-    Rather than instantiating it with a list/queryset and page number, we pass it the
-    full item count, which is sufficient for page_range / num_pages to work.
+class CachedCountPaginator(Paginator):
     """
-    def __init__(self, count, per_page, **kwargs):
-        self._count = int(count)
-        super().__init__([], per_page, **kwargs)
+    Customisation of Django's Paginator that stores the total item count in the cache under
+    the given key, so that the count query only needs to run once for a given set of results
+    rather than once per page.
+    """
+    def __init__(self, object_list, per_page, cache_key=None, cache_timeout=None, **kwargs):
+        self.cache_key = cache_key
+        self.cache_timeout = cache_timeout
+        super().__init__(object_list, per_page, **kwargs)
 
-    @property
+    @cached_property
     def count(self):
-        return self._count
+        count = cache.get(self.cache_key)
+        record_cache_lookup('count', count is not None)
+        if count is None:
+            count = super().count
+            cache.set(self.cache_key, count, self.cache_timeout)
+        return count
 
 
 class DRFChooseView(DRFChooserMixin, ChooserListingTabMixin, DRFChooserCreateTabMixin, BaseChooseView):
@@ -619,27 +2296,71 @@ class DRFChooseView(DRFChooserMixin, ChooserListingTabMixin, DRFChooserCreateTab
 
 
 class BaseChosenView(View):
+    def get_view_type(self):
+        return 'chosen'
+
     def get(self, request, pk):
         try:
-            item = self.get_object(unquote(pk))
+            with self.profile_phase('lookup'):
+                item = self.get_object(unquote(pk))
         except ObjectDoesNotExist:
             raise Http404
 
-        return self.get_chosen_response(item)
+        with self.profile_phase('response'):
+            return self.get_chosen_response(item)
 
 
 class BaseChosenMultipleView(View):
+    def get_view_type(self):
+        return 'chosen_multiple'
+
     def get(self, request):
-        items = []
-        for pk in request.GET.getlist('id'):
-            try:
-                items.append(self.get_object(pk))
-            except ObjectDoesNotExist:
-                pass
+        with self.profile_phase('lookup'):
+            items = self.get_objects(request.GET.getlist('id'))
+
+        with self.profile_phase('response'):
+            return self.get_multiple_chosen_response(items)
+
+
+class AsyncBaseChosenView(View):
+    def get_view_type(self):
+        return 'chosen'
+
+    async def get(self, request, pk):
+        try:
+            item = await self.aget_object(unquote(pk))
+        except (ObjectDoesNotExist, ValueError, ValidationError):
+            raise Http404
+
+        return self.get_chosen_response(item)
+
+
+class AsyncBaseChosenMultipleView(View):
+    def get_view_type(self):
+        return 'chosen_multiple'
 
+    async def get(self, request):
+        items = await self.aget_objects(request.GET.getlist('id'))
         return self.get_multiple_chosen_response(items)
 
 
+class BaseTypeaheadView(View):
+    def get_view_type(self):
+        return 'typeahead'
+
+    def get(self, request):
+        return self.get_typeahead_response(request.GET.get('q', ''))
+
+
+class AsyncBaseTypeaheadView(View):
+    def get_view_type(self):
+        return 'typeahead'
+
+    async def get(self, request):
+        # search backends do not provide an async API
+        return await sync_to_async(self.get_typeahead_response)(request.GET.get('q', ''))
+
+
 class ModelChosenView(ModelChooserMixin, BaseChosenView):
     pass
 
@@ -652,10 +2373,14 @@ class ChooserViewSet(ViewSet):
     base_choose_view_class = BaseChooseView
     base_chosen_view_class = BaseChosenView
     base_chosen_multiple_view_class = BaseChosenMultipleView
+    base_typeahead_view_class = BaseTypeaheadView
     chooser_mixin_class = ChooserMixin
     listing_tab_mixin_class = ChooserListingTabMixin
     create_tab_mixin_class = ChooserCreateTabMixin
 
+    # URL pattern for the 'chosen' view, capturing the object ID
+    chosen_url_pattern = r'^(\d+)/$'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -683,8 +2408,16 @@ class ChooserViewSet(ViewSet):
             {}
         )
 
+        # compose a final TypeaheadView subclass from base_typeahead_view_class and chooser_mixin_class
+        self.typeahead_view_class = type(
+            'ChooserViewSetTypeaheadView',
+            (self.chooser_mixin_class, self.base_typeahead_view_class),
+            {}
+        )
+
     def get_choose_view_attrs(self):
         attrs = {
+            'viewset_name': self.name,
             'choose_url_name': self.get_url_name('choose'),
             'chosen_url_name': self.get_url_name('chosen'),
             'chosen_multiple_url_name': self.get_url_name('chosen_multiple'),
@@ -692,7 +2425,14 @@ class ChooserViewSet(ViewSet):
 
         for attr_name in (
             'icon', 'page_title', 'per_page', 'is_searchable', 'form_class', 'edit_item_url_name',
-            'permission_policy', 'prefix',
+            'permission_policy', 'prefix', 'lazy_create_tab', 'count_cache_timeout',
+            'stream_unpaginated_results', 'stream_chunk_size', 'search_min_length',
+            'results_cache_size', 'results_rate_limit', 'results_rate_burst', 'coalesce_results',
+            'slow_request_threshold', 'slow_request_explain_limit', 'enable_metrics',
+            'recent_choices_limit', 'recent_choices_timeout', 'recent_tab_items',
+            'sign_chosen_state', 'modal_shell_cache_timeout', 'create_form_in_background', 'create_job_poll_interval',
+            'create_job_timeout', 'chunked_uploads', 'upload_chunk_size', 'upload_dir',
+            'chunked_upload_timeout', 'max_upload_size',
         ):
             if hasattr(self, attr_name):
                 attrs[attr_name] = getattr(self, attr_name)
@@ -704,9 +2444,13 @@ class ChooserViewSet(ViewSet):
         return self.choose_view_class.as_view(**self.get_choose_view_attrs())
 
     def get_chosen_view_attrs(self):
-        attrs = {}
+        attrs = {'viewset_name': self.name, 'choose_url_name': self.get_url_name('choose')}
 
-        for attr_name in ('edit_item_url_name', 'prefix',):
+        for attr_name in (
+            'edit_item_url_name', 'prefix', 'slow_request_threshold', 'slow_request_explain_limit',
+            'enable_metrics', 'recent_choices_limit', 'recent_choices_timeout',
+            'sign_chosen_state',
+        ):
             if hasattr(self, attr_name):
                 attrs[attr_name] = getattr(self, attr_name)
 
@@ -717,9 +2461,13 @@ class ChooserViewSet(ViewSet):
         return self.chosen_view_class.as_view(**self.get_chosen_view_attrs())
 
     def get_chosen_multiple_view_attrs(self):
-        attrs = {}
+        attrs = {'viewset_name': self.name, 'choose_url_name': self.get_url_name('choose')}
 
-        for attr_name in ('edit_item_url_name', 'prefix',):
+        for attr_name in (
+            'edit_item_url_name', 'prefix', 'slow_request_threshold', 'slow_request_explain_limit',
+            'enable_metrics', 'recent_choices_limit', 'recent_choices_timeout',
+            'sign_chosen_state',
+        ):
             if hasattr(self, attr_name):
                 attrs[attr_name] = getattr(self, attr_name)
 
@@ -729,21 +2477,88 @@ class ChooserViewSet(ViewSet):
     def chosen_multiple_view(self):
         return self.chosen_multiple_view_class.as_view(**self.get_chosen_multiple_view_attrs())
 
+    def get_typeahead_view_attrs(self):
+        attrs = {'viewset_name': self.name, 'choose_url_name': self.get_url_name('choose')}
+
+        for attr_name in (
+            'edit_item_url_name', 'prefix', 'is_searchable', 'slow_request_threshold',
+            'slow_request_explain_limit', 'enable_metrics', 'sign_chosen_state', 'typeahead_limit',
+            'typeahead_min_length', 'typeahead_cache_timeout',
+        ):
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+    @property
+    def typeahead_view(self):
+        return self.typeahead_view_class.as_view(**self.get_typeahead_view_attrs())
+
     def get_urlpatterns(self):
-        return super().get_urlpatterns() + [
+        urlpatterns = super().get_urlpatterns() + [
             re_path(r'^$', self.choose_view, name='choose'),
-            re_path(r'^(\d+)/$', self.chosen_view, name='chosen'),
             re_path(r'^chosen-multiple/$', self.chosen_multiple_view, name='chosen_multiple'),
+            re_path(r'^typeahead/$', self.typeahead_view, name='typeahead'),
         ]
 
+        if getattr(self, 'enable_metrics', False):
+            urlpatterns.append(
+                re_path(r'^metrics/$', metrics_view, {'viewset': self.name}, name='metrics')
+            )
+
+        # added last, so that a chosen_url_pattern matching any ID does not shadow the other views
+        urlpatterns.append(re_path(self.chosen_url_pattern, self.chosen_view, name='chosen'))
+
+        return urlpatterns
+
 
 class ModelChooserViewSet(ChooserViewSet):
     chooser_mixin_class = ModelChooserMixin
     create_tab_mixin_class = ModelChooserCreateTabMixin
 
+    # If True, the views are composed from the async_* classes below, using Django's async
+    # queryset API. These cannot be registered under the Wagtail admin's URLs (whose decorators
+    # only support sync views), and are served by including generic_chooser.urls instead.
+    async_views = False
+    async_chooser_mixin_class = AsyncModelChooserMixin
+    async_listing_tab_mixin_class = AsyncChooserListingTabMixin
+    async_base_choose_view_class = AsyncBaseChooseView
+    async_base_chosen_view_class = AsyncBaseChosenView
+    async_base_chosen_multiple_view_class = AsyncBaseChosenMultipleView
+    async_base_typeahead_view_class = AsyncBaseTypeaheadView
+
+    def __init__(self, *args, **kwargs):
+        if self.async_views:
+            if getattr(self, 'browse_tree', False):
+                raise ImproperlyConfigured(
+                    "%s: browse_tree is not supported with async_views" % type(self).__name__
+                )
+            if getattr(self, 'stream_unpaginated_results', False):
+                # a streamed listing would be fetched by a sync iterator, which ASGI servers
+                # consume in a thread, buffering the whole response
+                raise ImproperlyConfigured(
+                    "%s: stream_unpaginated_results is not supported with async_views"
+                    % type(self).__name__
+                )
+
+            self.chooser_mixin_class = self.async_chooser_mixin_class
+            self.listing_tab_mixin_class = self.async_listing_tab_mixin_class
+            self.base_choose_view_class = self.async_base_choose_view_class
+            self.base_chosen_view_class = self.async_base_chosen_view_class
+            self.base_chosen_multiple_view_class = self.async_base_chosen_multiple_view_class
+            self.base_typeahead_view_class = self.async_base_typeahead_view_class
+
+        super().__init__(*args, **kwargs)
+
+        if getattr(self, 'model', None) is not None:
+            # invalidate cached data for this chooser when instances of the model change
+            track_model_changes(self.model)
+
     def get_choose_view_attrs(self):
         attrs = super().get_choose_view_attrs()
-        for attr_name in ('model', 'order_by', 'fields'):
+        for attr_name in (
+            'model', 'order_by', 'fields', 'browse_tree', 'scope_cache_timeout', 'scope_cache_max_ids',
+        ):
             if hasattr(self, attr_name):
                 attrs[attr_name] = getattr(self, attr_name)
 
@@ -751,15 +2566,80 @@ class ModelChooserViewSet(ChooserViewSet):
 
     def get_chosen_view_attrs(self):
         attrs = super().get_chosen_view_attrs()
-        if hasattr(self, 'model'):
-            attrs['model'] = self.model
+        for attr_name in ('model', 'scope_cache_timeout', 'scope_cache_max_ids'):
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
 
         return attrs
 
     def get_chosen_multiple_view_attrs(self):
         attrs = super().get_chosen_view_attrs()
-        if hasattr(self, 'model'):
-            attrs['model'] = self.model
+        for attr_name in ('model', 'scope_cache_timeout', 'scope_cache_max_ids'):
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+    def get_typeahead_view_attrs(self):
+        attrs = super().get_typeahead_view_attrs()
+        for attr_name in (
+            'model', 'order_by', 'typeahead_fields', 'scope_cache_timeout', 'scope_cache_max_ids',
+        ):
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+    def get_urlpatterns(self):
+        if self.async_views:
+            # served through generic_chooser.urls; see get_async_urlpatterns
+            return []
+        return super().get_urlpatterns()
+
+    def get_async_urlpatterns(self):
+        """
+        Return the URL patterns for a viewset with async_views enabled, with the admin access
+        check that Wagtail would otherwise apply
+        """
+        return decorate_urlpatterns(super().get_urlpatterns(), require_admin_access_async)
+
+
+class MultiModelChooserViewSet(ChooserViewSet):
+    chooser_mixin_class = MultiModelChooserMixin
+    chosen_url_pattern = r'^([^/]+)/$'
+
+    # attributes passed on to all views
+    multi_model_view_attr_names = ('models', 'order_by', 'edit_item_url_names')
+
+    def get_choose_view_attrs(self):
+        attrs = super().get_choose_view_attrs()
+        for attr_name in self.multi_model_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+    def get_chosen_view_attrs(self):
+        attrs = super().get_chosen_view_attrs()
+        for attr_name in self.multi_model_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+    def get_chosen_multiple_view_attrs(self):
+        attrs = super().get_chosen_multiple_view_attrs()
+        for attr_name in self.multi_model_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+    def get_typeahead_view_attrs(self):
+        attrs = super().get_typeahead_view_attrs()
+        for attr_name in self.multi_model_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
 
         return attrs
 
@@ -768,29 +2648,50 @@ class DRFChooserViewSet(ChooserViewSet):
     chooser_mixin_class = DRFChooserMixin
     create_tab_mixin_class = DRFChooserCreateTabMixin
 
+    # attributes passed on to all views
+    drf_view_attr_names = (
+        'api_base_url', 'title_field_name', 'detail_cache_timeout',
+        'detail_not_found_cache_timeout', 'populate_detail_cache_from_listing',
+        'revalidate_cache_timeout', 'api_fields', 'api_pagination_class',
+    )
+
     def get_choose_view_attrs(self):
         attrs = super().get_choose_view_attrs()
-        if hasattr(self, 'api_base_url'):
-            attrs['api_base_url'] = self.api_base_url
-        if hasattr(self, 'title_field_name'):
-            attrs['title_field_name'] = self.title_field_name
+        for attr_name in self.drf_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
 
         return attrs
 
     def get_chosen_view_attrs(self):
         attrs = super().get_chosen_view_attrs()
-        if hasattr(self, 'api_base_url'):
-            attrs['api_base_url'] = self.api_base_url
-        if hasattr(self, 'title_field_name'):
-            attrs['title_field_name'] = self.title_field_name
+        for attr_name in self.drf_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
 
         return attrs
 
     def get_chosen_multiple_view_attrs(self):
         attrs = super().get_chosen_view_attrs()
-        if hasattr(self, 'api_base_url'):
-            attrs['api_base_url'] = self.api_base_url
-        if hasattr(self, 'title_field_name'):
-            attrs['title_field_name'] = self.title_field_name
+        for attr_name in self.drf_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
 
         return attrs
+
+    def get_typeahead_view_attrs(self):
+        attrs = super().get_typeahead_view_attrs()
+        for attr_name in self.drf_view_attr_names:
+            if hasattr(self, attr_name):
+                attrs[attr_name] = getattr(self, attr_name)
+
+        return attrs
+
+
+class FederatedDRFChooserViewSet(DRFChooserViewSet):
+    chooser_mixin_class = FederatedDRFChooserMixin
+    chosen_url_pattern = r'^([^/]+)/$'
+
+    drf_view_attr_names = DRFChooserViewSet.drf_view_attr_names + (
+        'api_endpoints', 'endpoint_timeout', 'endpoint_limit_max',
+    )
@@ -1,14 +1,23 @@
 import json
+import logging
 
 import requests
 from django.contrib.admin.utils import quote
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.forms import Media, widgets
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
+from generic_chooser import multi_model, signing
+from generic_chooser.api import (
+    APIError, fetch_api_item, fetch_api_items, fetch_federated_item, fetch_federated_items
+)
+from generic_chooser.pagination import LimitOffsetPagination
+from generic_chooser.profiling import RequestProfile
+
 try:
     from wagtail.admin.telepath import register
     from wagtail.admin.telepath.widgets import WidgetAdapter
@@ -16,6 +25,20 @@ except ImportError:  # Wagtail <7.1
     from wagtail.telepath import register
     from wagtail.widget_adapters import WidgetAdapter
 
+logger = logging.getLogger('generic_chooser')
+
+
+class SubmittedValue(str):
+    """
+    A value submitted through a chooser widget with trust_signed_state, carrying the value data
+    from the valid signed state submitted along with it. Widgets (and so their attributes) can be
+    shared between forms and requests, so the state is passed back to render along with the value.
+    """
+    def __new__(cls, value, state=None):
+        obj = super().__new__(cls, value)
+        obj.state = state
+        return obj
+
 
 class AdminChooser(widgets.Input):
     input_type = 'hidden'
@@ -57,6 +80,32 @@ class AdminChooser(widgets.Input):
     # despite the underlying input being type="hidden"
     is_hidden = False
 
+    # Lookups of the current value taking longer than this number of seconds are logged to the
+    # 'generic_chooser.slow_requests' logger, as for ChooserViewSet.slow_request_threshold
+    slow_lookup_threshold = None
+    slow_lookup_explain_limit = 5
+
+    # Exceptions raised by get_instance when the item's details could not be retrieved, as opposed
+    # to the item not existing. The widget is then rendered with the value kept and
+    # lookup_error_text in place of the title, so that saving the form does not clear the value.
+    lookup_errors = ()
+    lookup_error_text = _("%(value)s (details could not be loaded)")
+
+    # If True, a signed token of the chosen item's value, title and edit link (as returned by a
+    # chooser view with sign_chosen_state set, or generated when rendering) is submitted in a
+    # second hidden input. When the form is re-rendered with the submitted value, such as after a
+    # validation error, a valid token no older than signed_state_max_age seconds is used in place
+    # of looking up the item.
+    trust_signed_state = False
+    signed_state_max_age = 60 * 60
+
+    # If True, the widget has a text input that searches the chooser viewset's typeahead endpoint
+    # as the user types, so that items can be chosen without opening the modal. The endpoint's URL
+    # route name defaults to the 'typeahead' route alongside choose_modal_url_name.
+    typeahead = False
+    typeahead_url_name = None
+    typeahead_placeholder = _("Search…")
+
     def render(self, name, value, attrs=None, renderer=None):
         # no point trying to come up with sensible semantics for when 'id' is missing from attrs,
         # so let's make sure it fails early in the process
@@ -77,6 +126,64 @@ class AdminChooser(widgets.Input):
     def get_instance(self, value):
         return self.model.objects.get(pk=value)
 
+    def lookup_instance(self, value):
+        """
+        Call get_instance for the given value, logging the lookup if it exceeds
+        slow_lookup_threshold
+        """
+        if self.slow_lookup_threshold is None:
+            return self.get_instance(value)
+
+        profile = RequestProfile()
+        try:
+            with profile.capture(), profile.phase('lookup'):
+                return self.get_instance(value)
+        finally:
+            if profile.duration >= self.slow_lookup_threshold:
+                profile.log(
+                    'widget', '%s lookup' % type(self).__name__, {'value': value},
+                    explain_limit=self.slow_lookup_explain_limit,
+                )
+
+    def get_instances(self, values):
+        """
+        Return a dict mapping each of the given values (as strings) to its instance, omitting any
+        values that have no corresponding instance. For model-based choosers this performs a
+        single query; otherwise it falls back on calling get_instance for each value.
+        """
+        if self.model is not None:
+            pks = []
+            for value in values:
+                # malformed IDs are treated as missing, rather than failing the whole query
+                try:
+                    pks.append(self.model._meta.pk.to_python(value))
+                except ValidationError:
+                    pass
+            return {
+                str(pk): instance for pk, instance in self.model.objects.in_bulk(pks).items()
+            }
+
+        instances = {}
+        for value in dict.fromkeys(str(value) for value in values):
+            try:
+                instances[value] = self.get_instance(value)
+            except (ObjectDoesNotExist, ValueError, ValidationError):
+                pass
+        return instances
+
+    def is_instance(self, value):
+        """
+        Return True if the given value is already an instance (as returned by get_instance) rather
+        than a value to be looked up
+        """
+        return self.model is not None and isinstance(value, self.model)
+
+    def get_instance_value(self, instance):
+        """
+        Return the data value (such as a pk) for the given instance
+        """
+        return instance.pk
+
     def get_create_item_url(self):
         if self.create_item_url_name is None:
             return None
@@ -95,13 +202,43 @@ class AdminChooser(widgets.Input):
         else:
             return reverse(self.choose_modal_url_name)
 
+    def get_typeahead_url(self):
+        if not self.typeahead:
+            return None
+
+        url_name = self.typeahead_url_name
+        if url_name is None:
+            if self.choose_modal_url_name is None or ':' not in self.choose_modal_url_name:
+                return None
+            url_name = self.choose_modal_url_name.rsplit(':', 1)[0] + ':typeahead'
+
+        return reverse(url_name)
+
     def value_from_datadict(self, data, files, name):
         # treat the empty string as None
         result = super().value_from_datadict(data, files, name)
         if result == '':
             return None
-        else:
-            return result
+
+        if self.trust_signed_state and result is not None:
+            state = self.load_signed_state(data.get(self.get_state_input_name(name)))
+            if state is not None:
+                return SubmittedValue(result, state)
+        return result
+
+    def get_state_input_name(self, name):
+        return '%s-state' % name
+
+    def load_signed_state(self, token):
+        """
+        Return the value data recorded in the given signed state token, or None if it is missing,
+        invalid or expired
+        """
+        if not token:
+            return None
+        return signing.load_chosen_state(
+            self.choose_modal_url_name, token, max_age=self.signed_state_max_age
+        )
 
     def get_title(self, instance):
         return str(instance)
@@ -115,14 +252,25 @@ class AdminChooser(widgets.Input):
         # namely: value, title and edit_item_url
         if value is None:
             instance = None
-        elif self.model and isinstance(value, self.model):
+        elif isinstance(value, SubmittedValue) and value.state['value'] == str(value):
+            # the submitted value is unchanged from the one recorded in the signed state
+            return dict(value.state)
+        elif self.is_instance(value):
             instance = value
-            value = value.pk
+            value = self.get_instance_value(value)
         else:
             try:
-                instance = self.get_instance(value)
+                instance = self.lookup_instance(value)
             except (ObjectDoesNotExist if self.model is None else self.model.DoesNotExist):
                 instance = None
+            except self.lookup_errors:
+                logger.exception("%s lookup of %r failed", type(self).__name__, value)
+                return {
+                    'value': value,
+                    'title': self.lookup_error_text % {'value': value},
+                    'edit_item_url': None,
+                    'lookup_failed': True,
+                }
 
         if instance is None:
             return {
@@ -141,10 +289,27 @@ class AdminChooser(widgets.Input):
         # render the HTML for just the (hidden) input field
         return super().render(name, value, attrs)
 
+    def render_state_input_html(self, name, value_data, attrs):
+        # render the HTML for the hidden input carrying the signed state
+        if value_data['value'] is None or value_data.get('lookup_failed'):
+            # nothing to sign, or nothing worth trusting
+            token = ''
+        else:
+            token = signing.sign_chosen_state(
+                self.choose_modal_url_name, value_data['value'], value_data['title'],
+                value_data['edit_item_url'],
+            )
+        return format_html(
+            '<input type="hidden" name="{}" id="{}-state" value="{}">',
+            self.get_state_input_name(name), attrs['id'], token
+        )
+
     def render_html(self, name, value, attrs):
         value_data = value
 
         original_field_html = self.render_input_html(name, value_data['value'], attrs)
+        if self.trust_signed_state:
+            original_field_html += self.render_state_input_html(name, value_data, attrs)
 
         return render_to_string(self.template, {
             'widget': self,
@@ -153,14 +318,20 @@ class AdminChooser(widgets.Input):
             'is_empty': value_data['value'] is None,
             'title': value_data['title'],
             'edit_item_url': value_data['edit_item_url'],
+            'lookup_failed': value_data.get('lookup_failed', False),
             'create_item_url': self.get_create_item_url(),
             'choose_modal_url': self.get_choose_modal_url(),
+            'typeahead_url': self.get_typeahead_url(),
         })
 
     def js_opts(self):
-        return {
+        opts = {
             'modalURL': self.get_choose_modal_url(),
         }
+        typeahead_url = self.get_typeahead_url()
+        if typeahead_url:
+            opts['typeaheadURL'] = typeahead_url
+        return opts
 
     def render_js_init(self, id_, name, value):
         opts = self.js_opts()
@@ -220,15 +391,61 @@ register(AdminChooserAdapter(), AdminChooser)
 
 class DRFChooser(AdminChooser):
     """A chooser widget associated with a Django REST Framework API endpoint"""
-    def get_instance(self, id):
-        url = '%s%s/?format=json' % (self.api_base_url, quote(id))
-        result = requests.get(url).json()
+    api_base_url = None
 
-        if 'id' not in result:
-            # assume this is a 'not found' report
-            raise ObjectDoesNotExist(result['message'])
+    # Number of seconds to cache item details for, or None to disable caching. The cache is
+    # shared with chooser views using the same api_base_url, so that rendering a form after
+    # choosing an item does not fetch the item again.
+    detail_cache_timeout = None
+    detail_not_found_cache_timeout = 30
 
-        return result
+    # Name of a query parameter accepted by the listing endpoint at api_base_url that filters the
+    # results to a comma-separated list of IDs (such as 'id__in' on an API using django-filter).
+    # If set, get_instances looks up multiple items in one request; otherwise each item is fetched
+    # from its detail endpoint.
+    bulk_lookup_parameter = None
+
+    # errors from the API (other than 'not found'), and failed or timed-out requests
+    lookup_errors = (APIError, requests.RequestException)
+
+    # Number of seconds to keep API responses for revalidation with conditional requests, as for
+    # DRFChooserViewSet.revalidate_cache_timeout
+    revalidate_cache_timeout = None
+
+    # List of fields to request from the API, as for DRFChooserViewSet.api_fields; this must include
+    # any fields used by get_title. Items are only shared with the detail cache of chooser views
+    # requesting the same fields.
+    api_fields = None
+
+    # Strategy for requesting the listing endpoint's items in bulk lookups, as for
+    # DRFChooserViewSet.api_pagination_class
+    api_pagination_class = LimitOffsetPagination
+
+    def get_instance(self, id):
+        return fetch_api_item(
+            self.api_base_url, id,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.api_fields,
+        )
+
+    def get_instances(self, values):
+        return fetch_api_items(
+            self.api_base_url, values,
+            bulk_lookup_parameter=self.bulk_lookup_parameter,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.api_fields,
+            pagination=self.api_pagination_class(None),
+        )
+
+    def is_instance(self, value):
+        return isinstance(value, dict)
+
+    def get_instance_value(self, instance):
+        return instance['id']
 
     def get_edit_item_url(self, instance):
         if self.edit_item_url_name is None:
@@ -237,6 +454,64 @@ class DRFChooser(AdminChooser):
             return reverse(self.edit_item_url_name, args=(instance['id'],))
 
 
+class FederatedDRFChooser(DRFChooser):
+    """
+    A chooser widget associated with a FederatedDRFChooserViewSet, whose values are IDs of the form
+    'endpoint_name:id'
+    """
+    # dict mapping endpoint names to API base URLs, as for FederatedDRFChooserViewSet.api_endpoints
+    api_endpoints = {}
+
+    def get_instance(self, id):
+        return fetch_federated_item(
+            self.api_endpoints, id,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.api_fields,
+        )
+
+    def get_instances(self, values):
+        return fetch_federated_items(
+            self.api_endpoints, values,
+            bulk_lookup_parameter=self.bulk_lookup_parameter,
+            cache_timeout=self.detail_cache_timeout,
+            not_found_cache_timeout=self.detail_not_found_cache_timeout,
+            revalidate_timeout=self.revalidate_cache_timeout,
+            fields=self.api_fields,
+            pagination=self.api_pagination_class(None),
+        )
+
+
+class MultiModelChooser(AdminChooser):
+    """
+    A chooser widget associated with a MultiModelChooserViewSet, whose values are IDs of the form
+    'app_label.model_name:pk'
+    """
+    models = []
+
+    # URL route names for editing items, keyed by model label (such as 'shop.product')
+    edit_item_url_names = {}
+
+    def get_instance(self, value):
+        return multi_model.get_object(self.models, value)
+
+    def get_instances(self, values):
+        return multi_model.get_objects(self.models, values)
+
+    def is_instance(self, value):
+        return isinstance(value, tuple(self.models))
+
+    def get_instance_value(self, instance):
+        return multi_model.make_object_id(instance)
+
+    def get_edit_item_url(self, instance):
+        url_name = self.edit_item_url_names.get(multi_model.get_source_name(type(instance)))
+        if url_name is None:
+            return None
+        return reverse(url_name, args=(quote(instance.pk),))
+
+
 class LinkedFieldMixin:
     """
     Allows a chooser widget to accept a `linked_fields` kwarg which defines a
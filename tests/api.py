@@ -4,3 +4,6 @@ from wagtail.api.v2.router import WagtailAPIRouter
 api_router = WagtailAPIRouter('wagtailapi')
 
 api_router.register_endpoint('pages', PagesAPIViewSet)
+# a second endpoint serving the same pages, standing in for another region's API in federated
+# chooser tests
+api_router.register_endpoint('pages-mirror', PagesAPIViewSet)
@@ -54,6 +54,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Sets ETags on API responses, for testing conditional requests from DRF choosers
+    'django.middleware.http.ConditionalGetMiddleware',
 ]
 
 INSTALLED_APPS = [
@@ -1,15 +1,59 @@
+import asyncio
 import json
-from urllib.parse import urlencode, urlparse
+import os
+import re
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from urllib.parse import parse_qs, urlencode, urlparse
 from unittest.mock import patch
 
+import requests
+from asgiref.sync import iscoroutinefunction
 from django import forms
-from django.contrib.auth.models import User, Group
-from django.test import TestCase
-
-from wagtail.models import Page, Site
+from django.contrib.admin.utils import quote, unquote
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+from django.utils import translation
+from django.utils.datastructures import MultiValueDict
+from django.utils.translation import get_language
+
+from wagtail import blocks
+from wagtail.admin.telepath import JSContext
+from wagtail.documents.models import Document
+from wagtail.models import GroupPagePermission, Page, Site
+from wagtail.users.models import UserProfile
+
+from generic_chooser import metrics
+from generic_chooser.api import APIError, fetch_api_items, get_json, item_cache, iter_json_list
+from generic_chooser.blocks import ChooserBlock
+from generic_chooser.cache import AsyncSingleFlight, SingleFlight
+from generic_chooser.concurrency import call_concurrently, get_executor, get_job_executor
+from generic_chooser.pagination import CursorPagination
+from generic_chooser.recent import RecentChoicesStore
+from generic_chooser.signing import load_chosen_state, sign_chosen_state
+from generic_chooser.uploads import copy_uploaded_files
+from generic_chooser.views import (
+    ChooserListingTabMixin, DRFChooserMixin, ModelChooserCreateTabMixin, MultiModelChooserMixin
+)
 
 from .models import Person
-from .widgets import SiteChooser
+from .views import AsyncSiteChooserViewSet
+from .widgets import (
+    CachedPageAPIChooser, DRFPersonChooser, ErrorPageAPIChooser, FederatedPageAPIChooser,
+    PersonOrSiteChooser, SignedSiteChooser, SiteChooser, TypeaheadPageChooser
+)
 
 
 class TestChooseView(TestCase):
@@ -257,6 +301,360 @@ class TestChooseView(TestCase):
         )
 
 
+class TestLazyCreateTab(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        editor = User.objects.create_user(username='editor', email='editor@example.com', password='password')
+        editor.groups.add(Group.objects.get(name='Editors'))
+
+    def test_get(self):
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        response = self.client.get('/admin/lazy-create-site-chooser/')
+        self.assertEqual(response.status_code, 200)
+        response_json = json.loads(response.content)
+        self.assertEqual(response_json['step'], 'choose')
+
+        # the create tab should be present, but its form should not be rendered yet
+        self.assertIn(
+            'id="tab-label-lazy-create-site-chooser-create"',
+            response_json['html']
+        )
+        self.assertIn(
+            'data-wgc-lazy-url="/admin/lazy-create-site-chooser/?create_tab=true"',
+            response_json['html']
+        )
+        self.assertNotIn(
+            'name="lazy-create-site-chooser-create-form-hostname"',
+            response_json['html']
+        )
+
+    def test_get_create_tab(self):
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        response = self.client.get('/admin/lazy-create-site-chooser/?create_tab=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertInHTML(
+            '<input type="text" name="lazy-create-site-chooser-create-form-hostname" maxlength="255" required id="id_lazy-create-site-chooser-create-form-hostname">',
+            response.content.decode()
+        )
+
+    def test_get_create_tab_requires_create_permission(self):
+        self.assertTrue(
+            self.client.login(username='editor', password='password')
+        )
+
+        response = self.client.get(
+            '/admin/lazy-create-site-chooser/?create_tab=true',
+            headers={'x-requested-with': 'XMLHttpRequest'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_post_invalid_creation_form(self):
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        response = self.client.post('/admin/lazy-create-site-chooser/', {
+            'lazy-create-site-chooser-create-form-hostname': '',
+            'lazy-create-site-chooser-create-form-port': '123',
+            'lazy-create-site-chooser-create-form-site_name': 'foo',
+            'lazy-create-site-chooser-create-form-root_page': Page.objects.filter(depth=2).first().pk,
+        })
+        self.assertEqual(response.status_code, 200)
+
+        # the form is rendered inline so that validation errors can be shown
+        response_json = json.loads(response.content)
+        self.assertNotIn('data-wgc-lazy-url', response_json['html'])
+        self.assertInHTML(
+            (
+                '<p class="error-message">'
+                'This field is required.'
+                '</p>'
+            ),
+            response_json['html']
+        )
+
+
+class TestCachedCount(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        page = Page.objects.first()
+        for i in range(0, 25):
+            Site.objects.create(hostname='%d.example.com' % i, root_page=page)
+
+    def get_count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in ctx.captured_queries
+            if 'COUNT(' in query['sql'] and 'wagtailcore_site' in query['sql']
+        ]
+
+    def test_count_is_cached_between_pages(self):
+        self.assertEqual(len(self.get_count_queries('/admin/cached-count-site-chooser/')), 1)
+        self.assertEqual(
+            self.get_count_queries('/admin/cached-count-site-chooser/?p=2&results=true'), []
+        )
+
+        response = self.client.get('/admin/cached-count-site-chooser/?p=3&results=true')
+        self.assertInHTML('<p>Page 3 of 3.</p>', response.content.decode())
+
+    def test_count_is_recalculated_when_data_changes(self):
+        self.assertEqual(len(self.get_count_queries('/admin/cached-count-site-chooser/')), 1)
+
+        Site.objects.create(hostname='new.example.com', root_page=Page.objects.first())
+        self.assertEqual(
+            len(self.get_count_queries('/admin/cached-count-site-chooser/?p=2&results=true')), 1
+        )
+
+
+class TestSearchMinLength(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        homepage = Page.objects.get(depth=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.red_page = homepage.add_child(title='A red page')
+            self.green_page = homepage.add_child(title='A green page')
+
+    def test_client_settings(self):
+        response = self.client.get('/admin/page-chooser/')
+        html = json.loads(response.content)['html']
+        self.assertIn('data-search-min-length="0"', html)
+        self.assertIn('data-results-cache-size="20"', html)
+
+        response = self.client.get('/admin/min-length-search-page-chooser/')
+        html = json.loads(response.content)['html']
+        self.assertIn('data-search-min-length="3"', html)
+        self.assertIn('data-results-cache-size="0"', html)
+
+    def test_short_search_term_ignored(self):
+        response = self.client.get('/admin/min-length-search-page-chooser/', {'q': 're', 'results': 'true'})
+        self.assertContains(response, 'A green page')
+
+        response = self.client.get('/admin/min-length-search-page-chooser/', {'q': 'red', 'results': 'true'})
+        self.assertContains(response, 'A red page')
+        self.assertNotContains(response, 'A green page')
+
+
+class TestResultsThrottling(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_rate_limit(self):
+        for i in range(2):
+            response = self.client.get('/admin/throttled-site-chooser/?results=true')
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'localhost [default]')
+
+        response = self.client.get('/admin/throttled-site-chooser/?results=true')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # the full modal is not rate-limited
+        response = self.client.get('/admin/throttled-site-chooser/')
+        self.assertEqual(response.status_code, 200)
+
+        # other users have their own limit
+        User.objects.create_superuser(username='admin2', email='admin2@example.com', password='password')
+        self.client.login(username='admin2', password='password')
+        response = self.client.get('/admin/throttled-site-chooser/?results=true')
+        self.assertEqual(response.status_code, 200)
+
+    def test_concurrent_requests_coalesced_per_language(self):
+        view = resolve('/admin/throttled-site-chooser/').func
+        factory = RequestFactory()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def render_results(view_self):
+            calls.append(get_language())
+            started.set()
+            release.wait(5)
+            return 'results in %s' % get_language()
+
+        def get_results(user_id, language):
+            request = factory.get('/admin/throttled-site-chooser/', {'results': 'true'})
+            # separate users, so that the requests are not rate-limited
+            request.user = User(pk=user_id, username='user%d' % user_id, is_superuser=True)
+            with translation.override(language):
+                return view(request).content.decode()
+
+        with patch.object(ChooserListingTabMixin, 'render_results', render_results):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                leader = executor.submit(get_results, 100, 'en')
+                started.wait(5)
+                followers = [
+                    executor.submit(get_results, 101 + i, language)
+                    for i, language in enumerate(['en', 'fr', 'fr'])
+                ]
+                # give the followers time to join the leaders' computations
+                time.sleep(0.2)
+                release.set()
+                results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(results, ['results in en', 'results in en', 'results in fr', 'results in fr'])
+        self.assertEqual(sorted(calls), ['en', 'fr'])
+
+    def test_single_flight(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(single_flight.do, 'key', compute)
+            started.wait(5)
+            followers = [executor.submit(single_flight.do, 'key', compute) for i in range(3)]
+            # give the followers time to start waiting on the leader's call
+            time.sleep(0.1)
+            release.set()
+            results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(results, ['result'] * 4)
+        self.assertEqual(len(calls), 1)
+
+        # once complete, the next call computes the result again
+        self.assertEqual(single_flight.do('key', lambda: 'new result'), 'new result')
+
+
+class TestSlowRequestLog(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_results_request_logged(self):
+        with self.assertLogs('generic_chooser.slow_requests', level='WARNING') as logs:
+            response = self.client.get('/admin/slow-logged-site-chooser/?results=true&p=1')
+        self.assertEqual(response.status_code, 200)
+
+        [record] = logs.records
+        message = record.getMessage()
+        self.assertIn("Slow chooser results: GET /admin/slow-logged-site-chooser/", message)
+        self.assertIn("'p': ['1']", message)
+        self.assertIn("Phase listing:", message)
+        self.assertIn("Phase render:", message)
+        self.assertIn('FROM "wagtailcore_site"', message)
+        if connection.features.supports_explaining_query_execution:
+            self.assertIn("EXPLAIN SELECT", message)
+        self.assertEqual(record.chooser_view_type, 'results')
+
+    def test_chosen_request_logged(self):
+        with self.assertLogs('generic_chooser.slow_requests', level='WARNING') as logs:
+            response = self.client.get('/admin/slow-logged-site-chooser/1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(logs.records[0].chooser_view_type, 'chosen')
+        self.assertIn("Phase lookup:", logs.records[0].getMessage())
+
+    def test_fast_request_not_logged(self):
+        with self.assertNoLogs('generic_chooser.slow_requests'):
+            response = self.client.get('/admin/site-chooser/?results=true')
+        self.assertEqual(response.status_code, 200)
+
+    def test_widget_lookup_logged(self):
+        widget = SiteChooser()
+        widget.slow_lookup_threshold = 0
+        with self.assertLogs('generic_chooser.slow_requests', level='WARNING') as logs:
+            widget.get_value_data(Site.objects.get(hostname='localhost').pk)
+        self.assertEqual(logs.records[0].chooser_view_type, 'widget')
+        self.assertIn("SiteChooser lookup", logs.records[0].getMessage())
+
+
+class TestStreamingResults(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        homepage = Page.objects.get(depth=2)
+        self.pages = [homepage.add_child(title='Page %d' % i) for i in range(0, 5)]
+
+    def test_get(self):
+        response = self.client.get('/admin/streaming-page-chooser/')
+        self.assertEqual(response.status_code, 200)
+        response_json = json.loads(response.content)
+        self.assertEqual(response_json['step'], 'choose')
+
+        # results should be left for the modal to fetch separately
+        self.assertIn(
+            'data-results-url="/admin/streaming-page-chooser/?results=true"',
+            response_json['html']
+        )
+        self.assertNotIn('item-choice', response_json['html'])
+
+    def test_get_results(self):
+        response = self.client.get('/admin/streaming-page-chooser/?results=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        html = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(html.count('<table class="listing">'), 1)
+        for page in self.pages:
+            self.assertInHTML(
+                '<a class="item-choice" href="/admin/streaming-page-chooser/%d/">%s</a>' % (page.id, page.title),
+                html
+            )
+
+    def test_results_use_preferred_language(self):
+        # the results are rendered after the view returns, so the user's language must be kept
+        profile = UserProfile.get_for_user(self.user)
+        profile.preferred_language = 'fr'
+        profile.save()
+
+        response = self.client.get('/admin/streaming-page-chooser/?results=true')
+        html = b''.join(response.streaming_content).decode()
+        self.assertIn('<th>Titre</th>', html)
+        self.assertNotIn('<th>Title</th>', html)
+
+
+class TestIterJSONList(TestCase):
+    def test_iter_json_list(self):
+        data = json.dumps({
+            'meta': {'total_count': 12345, 'next': None},
+            'items': [{'id': 1, 'title': 'caf\u00e9 [1]'}, {'id': 2, 'title': '{"x": 2}'}],
+            'other': 'ignored',
+        })
+        # feed the document one character at a time to exercise values split across chunks
+        self.assertEqual(
+            list(iter_json_list(iter(data), 'items')),
+            [{'id': 1, 'title': 'caf\u00e9 [1]'}, {'id': 2, 'title': '{"x": 2}'}]
+        )
+        self.assertEqual(list(iter_json_list([data], 'items'))[1]['id'], 2)
+        self.assertEqual(list(iter_json_list(['{"items": [] }'], 'items')), [])
+
+    def test_missing_key(self):
+        with self.assertRaises(KeyError):
+            list(iter_json_list(iter('{"meta": {"total_count": 12}}'), 'items'))
+
+
 class TestChosenView(TestCase):
     def setUp(self):
         User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
@@ -283,12 +681,25 @@ class FakeResponse:
     """
     Partial mockup of the return value of requests.get
     """
-    def __init__(self, text):
+    def __init__(self, text, status_code=200, headers=None):
         self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
 
     def json(self):
         return json.loads(self.text)
 
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("%d error" % self.status_code, response=self)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.text), chunk_size):
+            yield self.text[i:i + chunk_size]
+
+    def close(self):
+        pass
+
 
 class FakeRequestsTestCase(TestCase):
     """
@@ -297,17 +708,30 @@ class FakeRequestsTestCase(TestCase):
     """
 
     def setUp(self):
-        def fake_requests_get(url_string, params=None):
+        # record of the URLs requested through requests.get, and their response status codes
+        self.requested_urls = []
+        self.response_statuses = []
+
+        def fake_requests_get(url_string, params=None, **kwargs):
             url = urlparse(url_string)
             assert(url.scheme == 'http')
             assert(url.netloc == 'testserver')
 
             path = url.path
+            if url.query:
+                path += '?' + url.query
             if params:
-                path += '?' + urlencode(params)
-
-            response = self.client.get(path)
-            return FakeResponse(response.content)
+                path += ('&' if url.query else '?') + urlencode(params)
+
+            self.requested_urls.append(path)
+            # requests made from worker threads cannot share the test client's session, as the
+            # session table is locked by the test transaction
+            client = self.client if threading.current_thread() is threading.main_thread() else Client()
+            response = client.get(path, headers=kwargs.get('headers'))
+            self.response_statuses.append(response.status_code)
+            return FakeResponse(
+                response.content, status_code=response.status_code, headers=response.headers
+            )
 
         def fake_requests_post(url_string, **kwargs):
             url = urlparse(url_string)
@@ -453,6 +877,38 @@ class TestAPIChooseView(FakeRequestsTestCase):
         )
 
 
+class TestAPIStreamingResults(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_get_results(self):
+        homepage = Page.objects.get(depth=2)
+        pages = [homepage.add_child(title='Page %d' % i) for i in range(0, 5)]
+
+        response = self.client.get('/admin/streaming-api-page-chooser/?results=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        html = b''.join(response.streaming_content).decode()
+
+        for page in pages:
+            self.assertInHTML(
+                '<a class="item-choice" href="/admin/streaming-api-page-chooser/%d/">%s</a>' % (page.id, page.title),
+                html
+            )
+
+    def test_error_response(self):
+        # an error response from the API is raised before the listing starts streaming
+        view = DRFChooserMixin()
+        view.api_base_url = 'http://testserver/api/v2/missing/'
+        with self.assertRaises(requests.HTTPError):
+            view.get_object_iterator()
+        self.assertEqual(self.response_statuses, [404])
+
+
 class TestAPIChosenView(FakeRequestsTestCase):
     def setUp(self):
         super().setUp()
@@ -473,77 +929,853 @@ class TestAPIChosenView(FakeRequestsTestCase):
         )
 
 
-class TestAPICreateForm(FakeRequestsTestCase):
+class TestAPIDetailCache(FakeRequestsTestCase):
     def setUp(self):
         super().setUp()
+        cache.clear()
+        item_cache.clear_local()
         User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
         self.assertTrue(
             self.client.login(username='admin', password='password')
         )
 
-    def test_get(self):
-        response = self.client.get('/admin/person-chooser/')
+    def get_detail_requests(self):
+        return [url for url in self.requested_urls if url.startswith('/api/v2/pages/2/')]
+
+    def test_widget_reuses_item_from_chosen_view(self):
+        response = self.client.get('/admin/cached-api-page-chooser/2/')
         self.assertEqual(response.status_code, 200)
-        response_json = json.loads(response.content)
-        self.assertEqual(response_json['step'], 'choose')
+        self.assertEqual(len(self.get_detail_requests()), 1)
 
-        # Create form should be displayed
+        html = CachedPageAPIChooser().render('page', '2', {'id': 'id_page'})
+        self.assertIn('<div class="chooser__title" data-chooser-title>Welcome to your new Wagtail site!</div>', html)
+        self.assertEqual(len(self.get_detail_requests()), 1)
+
+        # the item should also be available from the shared cache in other processes
+        item_cache.clear_local()
+        response = self.client.get('/admin/cached-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.get_detail_requests()), 1)
+
+    def test_listing_populates_cache(self):
+        response = self.client.get('/admin/cached-api-page-chooser/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/admin/cached-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
         response_json = json.loads(response.content)
+        self.assertEqual(response_json['result']['string'], "Welcome to your new Wagtail site!")
+        self.assertEqual(self.get_detail_requests(), [])
+
+    def test_not_found_is_cached(self):
+        for i in range(0, 2):
+            response = self.client.get('/admin/cached-api-page-chooser/999/')
+            self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(
+            len([url for url in self.requested_urls if url.startswith('/api/v2/pages/999/')]), 1
+        )
+
+    def test_uncached_view(self):
+        for i in range(0, 2):
+            response = self.client.get('/admin/api-page-chooser/2/')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(self.get_detail_requests()), 2)
+
+
+class TestTreeBrowsing(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+        self.homepage = Page.objects.get(depth=2)
+        self.section = self.homepage.add_child(title='Section')
+        self.leaf = self.section.add_child(title='Leaf page')
+        self.homepage.refresh_from_db()
 
+    def test_root_level(self):
+        response = self.client.get('/admin/tree-page-chooser/')
+        self.assertEqual(response.status_code, 200)
+        html = response.json()['html']
+        self.assertIn('<a class="item-choice" href="/admin/tree-page-chooser/1/">Root</a>', html)
+        self.assertIn('href="/admin/tree-page-chooser/?parent=1" data-parent="1"', html)
+        self.assertNotIn('Section', html)
+
+    def test_children_of_parent(self):
+        response = self.client.get(
+            '/admin/tree-page-chooser/?results=true&parent=%d' % self.homepage.pk
+        )
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
         self.assertIn(
-            'id="tab-label-person-chooser-create"',
-            response_json['html']
+            '<a class="item-choice" href="/admin/tree-page-chooser/%d/">Section</a>' % self.section.pk,
+            html
         )
+        self.assertIn('data-parent="%d"' % self.section.pk, html)
+        self.assertNotIn('Leaf page', html)
 
-        self.assertInHTML(
-            '<input type="text" name="person-chooser-create-form-first_name" required id="id_person-chooser-create-form-first_name">',
-            response_json['html']
+        # breadcrumbs link to the root level and each ancestor, ending with the current node
+        self.assertIn('<a class="browse-link" href="/admin/tree-page-chooser/" data-parent="">Top</a>', html)
+        self.assertIn(
+            '<a class="browse-link" href="/admin/tree-page-chooser/?parent=1" data-parent="1">Root</a>', html
         )
+        self.assertIn('<li>%s</li>' % self.homepage.title, html)
 
-    def test_post_invalid(self):
-        response = self.client.post('/admin/person-chooser/', {
-            'person-chooser-create-form-first_name': 'Bob',
-            'person-chooser-create-form-last_name': '',
-            'person-chooser-create-form-job_title': 'Builder',
-        })
+    def test_leaf_has_no_browse_link(self):
+        response = self.client.get(
+            '/admin/tree-page-chooser/?results=true&parent=%d' % self.section.pk
+        )
+        html = response.content.decode()
+        self.assertIn('Leaf page', html)
+        self.assertNotIn('data-parent="%d"' % self.leaf.pk, html)
+
+    def test_invalid_parent_lists_root_level(self):
+        response = self.client.get('/admin/tree-page-chooser/?results=true&parent=foo')
         self.assertEqual(response.status_code, 200)
+        self.assertIn('>Root</a>', response.content.decode())
 
-        # should be returned to the chooser view (step=choose) with a validation error
-        # and the Create tab active
-        response_json = json.loads(response.content)
-        self.assertEqual(response_json['step'], 'choose')
+    def test_search_covers_whole_tree(self):
+        response = self.client.get('/admin/tree-page-chooser/?results=true&q=leaf')
+        html = response.content.decode()
+        self.assertIn('Leaf page', html)
+        self.assertNotIn('chooser-breadcrumbs', html)
 
-        self.assertIn(
-            'id="tab-label-person-chooser-create"',
-            response_json['html']
+
+class TestAsyncViews(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
         )
+        for i in range(12):
+            Site.objects.create(hostname='site%02d.example.com' % i, root_page_id=2)
 
-        self.assertInHTML(
-            (
-                '<p class="error-message">'
-                'This field is required.'
-                '</p>'
-            ),
+    def test_view_is_async(self):
+        match = resolve('/admin/async-site-chooser/')
+        self.assertTrue(iscoroutinefunction(match.func))
+        self.assertEqual(reverse('async_site_chooser:choose'), '/admin/async-site-chooser/')
+
+    def test_choose(self):
+        response = self.client.get('/admin/async-site-chooser/')
+        self.assertEqual(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual(response_json['step'], 'choose')
+        self.assertIn(
+            '<a class="item-choice" href="/admin/async-site-chooser/1/">localhost [default]</a>',
             response_json['html']
         )
+        self.assertIn('Page 1 of 2.', response_json['html'])
+        # create form is rendered in the same response
+        self.assertIn('name="site-chooser-create-form-hostname"', response_json['html'])
+        self.assertIn('no-cache', response['Cache-Control'])
 
-    def test_post_valid(self):
-        response = self.client.post('/admin/person-chooser/', {
-            'person-chooser-create-form-first_name': 'Gordon',
-            'person-chooser-create-form-last_name': 'Ramsay',
-            'person-chooser-create-form-job_title': 'Chef',
-        })
+    def test_results_pagination(self):
+        response = self.client.get('/admin/async-site-chooser/?results=true&p=2')
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        self.assertIn('Page 2 of 2.', html)
+        self.assertIn('site11.example.com', html)
+        self.assertNotIn('site00.example.com', html)
+
+        # out of range pages show the last page
+        response = self.client.get('/admin/async-site-chooser/?results=true&p=10')
+        self.assertIn('Page 2 of 2.', response.content.decode())
+
+    def test_rate_limit_and_recent_choices(self):
+        site = Site.objects.get(hostname='site03.example.com')
+        response = self.client.get('/admin/async-recent-site-chooser/%d/' % site.pk)
         self.assertEqual(response.status_code, 200)
 
-        # Person should be created
-        person = Person.objects.get(first_name='Gordon')
+        response = self.client.get('/admin/async-recent-site-chooser/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Recently chosen', response.json()['html'])
+
+        for i in range(3):
+            response = self.client.get('/admin/async-recent-site-chooser/?results=true&p=2')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('site11.example.com', response.content.decode())
+        response = self.client.get('/admin/async-recent-site-chooser/?results=true&p=2')
+        self.assertEqual(response.status_code, 429)
+
+    def test_results_coalescing(self):
+        calls = []
+
+        async def render():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'results'
+
+        async def run():
+            single_flight = AsyncSingleFlight()
+            return await asyncio.gather(
+                single_flight.do('key', render), single_flight.do('key', render),
+                single_flight.do('other-key', render),
+            )
 
-        # should receive a step=chosen response
-        response_json = json.loads(response.content)
-        self.assertEqual(response_json['step'], 'chosen')
+        self.assertEqual(asyncio.run(run()), ['results', 'results', 'results'])
+        self.assertEqual(len(calls), 2)
+
+    def test_cache_not_accessed_synchronously_in_event_loop(self):
+        cache_get = cache.get
+
+        def checked_get(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return cache_get(*args, **kwargs)
+            raise AssertionError("cache.get called in the event loop")
+
+        # the count cache key includes the data generation, and the rate limit is kept in the cache
+        with patch.object(cache, 'get', checked_get):
+            for i in range(2):
+                response = self.client.get('/admin/async-recent-site-chooser/?results=true&p=2')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('site11.example.com', response.content.decode())
+
+    def test_streaming_not_supported(self):
+        class StreamingAsyncSiteChooserViewSet(AsyncSiteChooserViewSet):
+            per_page = None
+            stream_unpaginated_results = True
+
+        with self.assertRaises(ImproperlyConfigured):
+            StreamingAsyncSiteChooserViewSet('streaming_async_site_chooser')
+
+    def test_count_is_cached(self):
+        self.client.get('/admin/async-site-chooser/?results=true&p=1')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/admin/async-site-chooser/?results=true&p=2')
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+
+    def test_chosen(self):
+        site = Site.objects.get(hostname='site03.example.com')
+        response = self.client.get('/admin/async-site-chooser/%d/' % site.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result'], {
+            'id': str(site.pk),
+            'string': 'site03.example.com',
+            'edit_link': '/admin/sites/edit/%d/' % site.pk,
+        })
+
+        response = self.client.get('/admin/async-site-chooser/999/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_chosen_multiple(self):
+        sites = list(Site.objects.filter(hostname__in=['site04.example.com', 'site05.example.com']))
+        response = self.client.get(
+            '/admin/async-site-chooser/chosen-multiple/?id=%d&id=999&id=%d' % (sites[1].pk, sites[0].pk)
+        )
+        self.assertEqual(response.status_code, 200)
         self.assertEqual(
-            response_json['result'],
-            {"id": str(person.id), "string": "Gordon Ramsay", "edit_link": None}
+            [item['id'] for item in response.json()['result']], [str(sites[1].pk), str(sites[0].pk)]
+        )
+
+    def test_create(self):
+        response = self.client.post('/admin/async-site-chooser/', {
+            'site-chooser-create-form-hostname': 'new.example.com',
+            'site-chooser-create-form-port': '80',
+            'site-chooser-create-form-root_page': '2',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['step'], 'chosen')
+        self.assertTrue(Site.objects.filter(hostname='new.example.com').exists())
+
+    def test_requires_admin_access(self):
+        self.client.logout()
+        response = self.client.get('/admin/async-site-chooser/')
+        self.assertEqual(response.status_code, 302)
+
+        User.objects.create_user(username='nobody', password='password')
+        self.client.login(username='nobody', password='password')
+        response = self.client.get(
+            '/admin/async-site-chooser/', headers={'x-requested-with': 'XMLHttpRequest'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class TestMultiModelChooser(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+        self.people = [
+            Person.objects.create(first_name='Person', last_name=str(i), job_title='Tester')
+            for i in range(3)
+        ]
+        self.sites = [Site.objects.get()] + [
+            Site.objects.create(hostname='site%d.example.com' % i, root_page_id=2)
+            for i in range(1, 3)
+        ]
+
+    def get_results(self, page):
+        response = self.client.get('/admin/person-or-site-chooser/?results=true&p=%d' % page)
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_results_merged_by_rank(self):
+        # items are taken from each model in turn, in the order of the viewset's models
+        expected = [
+            'tests.person:%d' % self.people[0].pk, 'wagtailcore.site:%d' % self.sites[0].pk,
+            'tests.person:%d' % self.people[1].pk, 'wagtailcore.site:%d' % self.sites[1].pk,
+            'tests.person:%d' % self.people[2].pk, 'wagtailcore.site:%d' % self.sites[2].pk,
+        ]
+        html = self.get_results(1) + self.get_results(2)
+        hrefs = re.findall(r'class="item-choice" href="/admin/person-or-site-chooser/([^/]+)/"', html)
+        self.assertEqual([unquote(href) for href in hrefs], expected)
+        self.assertIn('Page 1 of 2.', self.get_results(1))
+
+    def test_merge_by_shared_field(self):
+        view = MultiModelChooserMixin()
+        view.order_by = '-rank'
+        first = [types.SimpleNamespace(rank=rank) for rank in (9, 5, 1)]
+        second = [types.SimpleNamespace(rank=rank) for rank in (7, 5, 2)]
+        merged = view.merge_object_lists([first, second])
+        self.assertEqual(
+            [item for item in merged], [first[0], second[0], first[1], second[1], second[2], first[2]]
+        )
+
+    def test_merge_with_nulls(self):
+        # nulls are merged last in either direction, as the listings are ordered in the database
+        view = MultiModelChooserMixin()
+        first = [types.SimpleNamespace(rank=rank) for rank in (1, 5, None)]
+        second = [types.SimpleNamespace(rank=rank) for rank in (2, None)]
+        view.order_by = 'rank'
+        self.assertEqual(
+            [item.rank for item in view.merge_object_lists([first, second])], [1, 2, 5, None, None]
+        )
+
+        view.order_by = '-rank'
+        first = [types.SimpleNamespace(rank=rank) for rank in (5, 1, None)]
+        second = [types.SimpleNamespace(rank=rank) for rank in (2, None)]
+        self.assertEqual(
+            [item.rank for item in view.merge_object_lists([first, second])], [5, 2, 1, None, None]
+        )
+
+    def test_object_iterator(self):
+        view = MultiModelChooserMixin()
+        view.models = [Person, Site]
+        self.assertEqual(list(view.get_object_iterator()), [
+            self.people[0], self.sites[0], self.people[1], self.sites[1], self.people[2], self.sites[2],
+        ])
+
+    def test_sources_queried_in_request_thread_within_transaction(self):
+        # within a transaction (as under ATOMIC_REQUESTS), other threads would not see its changes
+        view = MultiModelChooserMixin()
+        view.models = [Person, Site]
+        with patch('generic_chooser.views.call_concurrently') as call_concurrently:
+            counts = view.map_sources(lambda object_list: object_list.count())
+        self.assertEqual(counts, [3, 3])
+        call_concurrently.assert_not_called()
+
+        with patch('generic_chooser.views.in_transaction', return_value=False), \
+                patch('generic_chooser.views.call_concurrently', return_value=[]) as call_concurrently:
+            view.map_sources(lambda object_list: object_list.count())
+        self.assertEqual(len(call_concurrently.call_args.args[0]), 2)
+
+    def test_chosen(self):
+        response = self.client.get(
+            '/admin/person-or-site-chooser/%s/' % quote('wagtailcore.site:%d' % self.sites[1].pk)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result'], {
+            'id': 'wagtailcore.site:%d' % self.sites[1].pk,
+            'string': 'site1.example.com',
+            'edit_link': '/admin/sites/edit/%d/' % self.sites[1].pk,
+        })
+
+        for bad_id in ['wagtailcore.page:2', 'tests.person:999', 'tests.person:foo', 'foo']:
+            response = self.client.get('/admin/person-or-site-chooser/%s/' % quote(bad_id))
+            self.assertEqual(response.status_code, 404)
+
+    def test_chosen_multiple(self):
+        ids = [
+            'tests.person:%d' % self.people[2].pk, 'wagtailcore.site:%d' % self.sites[2].pk,
+            'tests.person:%d' % self.people[0].pk, 'tests.person:999', 'tests.person:foo',
+        ]
+        response = self.client.get(
+            '/admin/person-or-site-chooser/chosen-multiple/?' + urlencode([('id', id) for id in ids])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.json()['result']], ids[:3])
+
+        # each model is looked up in a single query
+        view = MultiModelChooserMixin()
+        view.models = [Person, Site]
+        with self.assertNumQueries(2):
+            self.assertEqual(len(view.get_objects(ids)), 3)
+
+    def test_widget(self):
+        widget = PersonOrSiteChooser()
+        value_data = widget.get_value_data('wagtailcore.site:%d' % self.sites[1].pk)
+        self.assertEqual(value_data['title'], 'site1.example.com')
+        self.assertEqual(value_data['edit_item_url'], '/admin/sites/edit/%d/' % self.sites[1].pk)
+        self.assertEqual(widget.get_value_data('tests.person:999')['value'], None)
+        self.assertEqual(widget.get_value_data(self.people[0])['value'], 'tests.person:%d' % self.people[0].pk)
+
+    def test_paginated_listing_queries_each_model_once(self):
+        view = MultiModelChooserMixin()
+        view.models = [Person, Site]
+        view.per_page = 4
+        with patch.object(view, 'map_sources', wraps=view.map_sources) as map_sources:
+            page, paginator = view.get_paginated_object_list(2)
+        # the count and items of each model are fetched in the same call
+        self.assertEqual(map_sources.call_count, 1)
+        self.assertEqual((page.number, paginator.num_pages), (2, 2))
+        self.assertEqual(list(page), [self.people[2], self.sites[2]])
+
+        # pages beyond the end show the last page, and invalid page numbers the first
+        page, paginator = view.get_paginated_object_list(10)
+        self.assertEqual((page.number, list(page)), (2, [self.people[2], self.sites[2]]))
+        page, paginator = view.get_paginated_object_list('foo')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(list(page), [self.people[0], self.sites[0], self.people[1], self.sites[1]])
+
+    def test_call_concurrently(self):
+        futures = call_concurrently([threading.get_ident, threading.get_ident])
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertNotIn(threading.get_ident(), [future.result() for future in futures])
+
+    def test_worker_connections_follow_conn_max_age(self):
+        # worker threads close their connections only when they are unusable or too old, so that
+        # persistent connections are reused
+        with patch('generic_chooser.concurrency.close_old_connections') as close_old_connections, \
+                patch.object(connections, 'close_all') as close_all:
+            [future] = call_concurrently([lambda: None])
+            future.result()
+        self.assertEqual(close_old_connections.call_count, 2)
+        close_all.assert_not_called()
+
+
+class TestRecentChoices(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+        self.sites = [
+            Site.objects.create(hostname='site%d.example.com' % i, root_page_id=2)
+            for i in range(4)
+        ]
+
+    def choose(self, site):
+        response = self.client.get('/admin/recent-site-chooser/%d/' % site.pk)
+        self.assertEqual(response.status_code, 200)
+
+    def get_modal_html(self):
+        response = self.client.get('/admin/recent-site-chooser/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['html']
+
+    def test_no_tab_without_choices(self):
+        html = self.get_modal_html()
+        self.assertNotIn('-recent"', html)
+
+    def test_no_tab_when_not_enabled(self):
+        self.client.get('/admin/site-chooser/%d/' % self.sites[0].pk)
+        html = self.client.get('/admin/site-chooser/').json()['html']
+        self.assertNotIn('Recently chosen', html)
+
+    def test_recent_and_frequent_choices(self):
+        self.choose(self.sites[0])
+        self.choose(self.sites[0])
+        self.choose(self.sites[1])
+
+        html = self.get_modal_html()
+        self.assertIn('id="tab-site-chooser-recent"', html)
+        self.assertIn('Recently chosen', html)
+        self.assertIn('Frequently chosen', html)
+        self.assertIn('href="/admin/recent-site-chooser/%d/"' % self.sites[0].pk, html)
+        self.assertIn('href="/admin/recent-site-chooser/%d/"' % self.sites[1].pk, html)
+
+    def test_multiple_choices_recorded(self):
+        response = self.client.get(
+            '/admin/recent-site-chooser/chosen-multiple/?id=%d&id=%d' % (self.sites[2].pk, self.sites[3].pk)
+        )
+        self.assertEqual(response.status_code, 200)
+        html = self.get_modal_html()
+        self.assertIn('href="/admin/recent-site-chooser/%d/"' % self.sites[2].pk, html)
+        self.assertIn('href="/admin/recent-site-chooser/%d/"' % self.sites[3].pk, html)
+
+    def test_store_trimmed_to_limit(self):
+        for site in self.sites:
+            self.choose(site)
+        store = RecentChoicesStore('recent_site_chooser', User.objects.get().pk, max_items=3)
+        self.assertEqual(
+            sorted(store.load()), sorted(str(site.pk) for site in self.sites[1:])
+        )
+
+    def test_recent_tab_adds_no_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_modal_html()
+        query_count = len(queries)
+
+        self.choose(self.sites[0])
+        with self.assertNumQueries(query_count):
+            html = self.get_modal_html()
+        self.assertIn('Recently chosen', html)
+
+
+class TestFederatedDRFChooser(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_results_merged_from_all_endpoints(self):
+        response = self.client.get('/admin/federated-page-chooser/?results=true')
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        hrefs = re.findall(r'class="item-choice" href="/admin/federated-page-chooser/([^/]+)/"', html)
+        self.assertEqual([unquote(href) for href in hrefs], ['primary:2', 'mirror:2'])
+        self.assertIn('Page 1 of 1.', html)
+        self.assertNotIn('data-partial-results', html)
+
+    def get_federated_ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        self.assertNotIn('data-partial-results', html)
+        prefix = urlparse(url).path
+        return [
+            unquote(href) for href in re.findall(r'class="item-choice" href="%s([^/]+)/"' % prefix, html)
+        ]
+
+    def test_deep_pages(self):
+        # 'long' has 15 items and 'short' 7, merged by rank into 22 items
+        self.assertEqual(
+            self.get_federated_ids('/admin/numbers-federated-chooser/?results=true'),
+            ['long:0', 'short:0', 'long:1', 'short:1', 'long:2', 'short:2', 'long:3', 'short:3',
+             'long:4', 'short:4']
+        )
+        self.assertEqual(
+            self.get_federated_ids('/admin/numbers-federated-chooser/?results=true&p=2'),
+            ['long:5', 'short:5', 'long:6', 'short:6', 'long:7', 'long:8', 'long:9', 'long:10',
+             'long:11', 'long:12']
+        )
+        # fetching page 3 from the start of each listing would exceed the API's maximum limit
+        self.assertEqual(
+            self.get_federated_ids('/admin/numbers-federated-chooser/?results=true&p=3'),
+            ['long:13', 'long:14']
+        )
+        self.assertNotIn(400, self.response_statuses)
+
+    def test_partial_typeahead_results_not_cached(self):
+        for i in range(2):
+            with self.assertLogs('generic_chooser', level='WARNING'):
+                response = self.client.get(
+                    '/admin/partly-slow-federated-page-chooser/typeahead/', {'q': 'welcome'}
+                )
+            self.assertEqual(response.status_code, 200)
+        broken_requests = [url for url in self.requested_urls if url.startswith('/broken-api/')]
+        self.assertEqual(len(broken_requests), 2)
+
+        # complete results are cached
+        for i in range(2):
+            self.client.get('/admin/federated-page-chooser/typeahead/', {'q': 'welcome'})
+        mirror_requests = [url for url in self.requested_urls if url.startswith('/api/v2/pages-mirror/')]
+        self.assertEqual(len(mirror_requests), 1)
+
+    def test_partial_results(self):
+        start = time.monotonic()
+        with self.assertLogs('generic_chooser', level='WARNING') as logs:
+            response = self.client.get('/admin/partly-slow-federated-page-chooser/?results=true')
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(response.status_code, 200)
+
+        html = response.content.decode()
+        self.assertIn(
+            'href="/admin/partly-slow-federated-page-chooser/%s/"' % quote('primary:2'), html
+        )
+        self.assertIn('data-partial-results', html)
+        self.assertIn('Results from slow, broken are not shown', html)
+        self.assertEqual(len(logs.records), 2)
+
+    def test_chosen(self):
+        response = self.client.get('/admin/federated-page-chooser/%s/' % quote('mirror:2'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['id'], 'mirror:2')
+        self.assertIn('/api/v2/pages-mirror/2/?format=json', self.requested_urls)
+
+        response = self.client.get('/admin/federated-page-chooser/%s/' % quote('elsewhere:2'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_chosen_multiple(self):
+        response = self.client.get(
+            '/admin/federated-page-chooser/chosen-multiple/?id=mirror:2&id=primary:2&id=primary:999'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.json()['result']], ['mirror:2', 'primary:2']
+        )
+
+    def test_widget(self):
+        widget = FederatedPageAPIChooser()
+        value_data = widget.get_value_data('mirror:2')
+        self.assertEqual(value_data['value'], 'mirror:2')
+        self.assertEqual(value_data['title'], 'Welcome to your new Wagtail site!')
+        self.assertEqual(widget.get_instances(['primary:2', 'nowhere:1']).keys(), {'primary:2'})
+
+
+class TestMetrics(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        item_cache.clear_local()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_request_metrics(self):
+        labels = {'viewset': 'metrics_api_page_chooser'}
+        choose_count = metrics.requests_total.get(view_type='choose', status='200', **labels)
+        chosen_count = metrics.requests_total.get(view_type='chosen', status='200', **labels)
+        not_found_count = metrics.requests_total.get(view_type='chosen', status='404', **labels)
+        upstream_count = metrics.upstream_requests_total.get(method='GET', status='200', **labels)
+        cache_hits = metrics.cache_lookups_total.get(cache='api_item', result='hit', **labels)
+
+        response = self.client.get('/admin/metrics-api-page-chooser/')
+        self.assertEqual(response.status_code, 200)
+        # served from the item cache populated by the listing
+        response = self.client.get('/admin/metrics-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/admin/metrics-api-page-chooser/999/')
+        self.assertEqual(response.status_code, 404)
+
+        self.assertEqual(
+            metrics.requests_total.get(view_type='choose', status='200', **labels), choose_count + 1
+        )
+        self.assertEqual(
+            metrics.requests_total.get(view_type='chosen', status='200', **labels), chosen_count + 1
+        )
+        self.assertEqual(
+            metrics.requests_total.get(view_type='chosen', status='404', **labels), not_found_count + 1
+        )
+        self.assertEqual(
+            metrics.upstream_requests_total.get(method='GET', status='200', **labels), upstream_count + 1
+        )
+        self.assertEqual(
+            metrics.cache_lookups_total.get(cache='api_item', result='hit', **labels), cache_hits + 1
+        )
+
+        response = self.client.get('/admin/metrics-api-page-chooser/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        content = response.content.decode()
+        self.assertIn('# TYPE generic_chooser_requests_total counter', content)
+        self.assertIn(
+            'generic_chooser_requests_total{viewset="metrics_api_page_chooser",view_type="chosen",status="404"}',
+            content
+        )
+        self.assertIn(
+            'generic_chooser_request_duration_seconds_bucket{viewset="metrics_api_page_chooser",view_type="choose",le="+Inf"}',
+            content
+        )
+        self.assertNotIn('viewset="cached_api_page_chooser"', content)
+
+    def test_metrics_disabled(self):
+        response = self.client.get('/admin/cached-api-page-chooser/metrics/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('test_seconds', "Test", ('name',), buckets=(0.1, 1))
+        histogram.observe(0.1, name='a')
+        histogram.observe(0.5, name='a')
+        histogram.observe(5, name='a')
+        self.assertEqual(histogram.render().splitlines(), [
+            '# HELP test_seconds Test',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{name="a",le="0.1"} 1',
+            'test_seconds_bucket{name="a",le="1.0"} 2',
+            'test_seconds_bucket{name="a",le="+Inf"} 3',
+            'test_seconds_sum{name="a"} 5.6',
+            'test_seconds_count{name="a"} 3',
+        ])
+
+
+class TestAPIFields(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        item_cache.clear_local()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_listing_and_detail(self):
+        response = self.client.get('/admin/field-limited-api-page-chooser/?results=true')
+        self.assertContains(response, "Welcome to your new Wagtail site!")
+        self.assertEqual(len(self.requested_urls), 1)
+        self.assertIn('fields=_%2Ctitle%2Cid', self.requested_urls[0])
+
+        # the chosen view uses the item cached from the field-limited listing
+        response = self.client.get('/admin/field-limited-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requested_urls), 1)
+
+        # but the cache is not shared with choosers requesting different fields
+        item_cache.clear_local()
+        response = self.client.get('/admin/cached-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requested_urls), 2)
+        self.assertNotIn('fields=', self.requested_urls[1])
+
+    def test_widget_detail(self):
+        class FieldLimitedPageAPIChooser(CachedPageAPIChooser):
+            api_fields = ['_', 'title']
+
+        html = FieldLimitedPageAPIChooser().render('page', '2', {'id': 'id_page'})
+        self.assertIn('Welcome to your new Wagtail site!', html)
+        self.assertEqual(self.requested_urls, ['/api/v2/pages/2/?format=json&fields=_%2Ctitle%2Cid'])
+
+
+class TestUpstreamSingleFlight(TestCase):
+    def test_concurrent_requests_coalesced(self):
+        requested_urls = []
+
+        def slow_requests_get(url, params=None, **kwargs):
+            requested_urls.append(url)
+            time.sleep(0.2)
+            return FakeResponse(json.dumps({'id': 2, 'title': "Homepage"}))
+
+        with patch('requests.get', new=slow_requests_get):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [
+                    executor.submit(get_json, 'http://testserver/api/v2/pages/2/', {'format': 'json'})
+                    for i in range(4)
+                ]
+                results = [future.result() for future in futures]
+
+            self.assertEqual(results, [(200, {'id': 2, 'title': "Homepage"})] * 4)
+            self.assertEqual(len(requested_urls), 1)
+
+            # requests with different parameters are not coalesced
+            get_json('http://testserver/api/v2/pages/2/', {'format': 'json', 'fields': 'title'})
+            self.assertEqual(len(requested_urls), 2)
+
+
+class TestAPIRevalidation(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def get_revalidation_hits(self):
+        return metrics.cache_lookups_total.get(
+            viewset='revalidating_api_page_chooser', cache='revalidation', result='hit'
+        )
+
+    def test_detail_revalidation(self):
+        hits = self.get_revalidation_hits()
+        response = self.client.get('/admin/revalidating-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.response_statuses, [200])
+
+        response = self.client.get('/admin/revalidating-api-page-chooser/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)['result']['string'], "Welcome to your new Wagtail site!"
+        )
+        self.assertEqual(self.response_statuses, [200, 304])
+        self.assertEqual(self.get_revalidation_hits(), hits + 1)
+
+    def test_listing_revalidation(self):
+        response = self.client.get('/admin/revalidating-api-page-chooser/?results=true')
+        self.assertContains(response, "Welcome to your new Wagtail site!")
+
+        response = self.client.get('/admin/revalidating-api-page-chooser/?results=true')
+        self.assertContains(response, "Welcome to your new Wagtail site!")
+        self.assertEqual(self.response_statuses, [200, 304])
+
+        # changed data is downloaded again
+        Page.objects.filter(depth=2).update(title="Updated homepage")
+        response = self.client.get('/admin/revalidating-api-page-chooser/?results=true')
+        self.assertContains(response, "Updated homepage")
+        self.assertEqual(self.response_statuses, [200, 304, 200])
+
+
+class TestAPICreateForm(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_get(self):
+        response = self.client.get('/admin/person-chooser/')
+        self.assertEqual(response.status_code, 200)
+        response_json = json.loads(response.content)
+        self.assertEqual(response_json['step'], 'choose')
+
+        # Create form should be displayed
+        response_json = json.loads(response.content)
+
+        self.assertIn(
+            'id="tab-label-person-chooser-create"',
+            response_json['html']
+        )
+
+        self.assertInHTML(
+            '<input type="text" name="person-chooser-create-form-first_name" required id="id_person-chooser-create-form-first_name">',
+            response_json['html']
+        )
+
+    def test_post_invalid(self):
+        response = self.client.post('/admin/person-chooser/', {
+            'person-chooser-create-form-first_name': 'Bob',
+            'person-chooser-create-form-last_name': '',
+            'person-chooser-create-form-job_title': 'Builder',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        # should be returned to the chooser view (step=choose) with a validation error
+        # and the Create tab active
+        response_json = json.loads(response.content)
+        self.assertEqual(response_json['step'], 'choose')
+
+        self.assertIn(
+            'id="tab-label-person-chooser-create"',
+            response_json['html']
+        )
+
+        self.assertInHTML(
+            (
+                '<p class="error-message">'
+                'This field is required.'
+                '</p>'
+            ),
+            response_json['html']
+        )
+
+    def test_post_valid(self):
+        response = self.client.post('/admin/person-chooser/', {
+            'person-chooser-create-form-first_name': 'Gordon',
+            'person-chooser-create-form-last_name': 'Ramsay',
+            'person-chooser-create-form-job_title': 'Chef',
+        })
+        self.assertEqual(response.status_code, 200)
+
+        # Person should be created
+        person = Person.objects.get(first_name='Gordon')
+
+        # should receive a step=chosen response
+        response_json = json.loads(response.content)
+        self.assertEqual(response_json['step'], 'chosen')
+        self.assertEqual(
+            response_json['result'],
+            {"id": str(person.id), "string": "Gordon Ramsay", "edit_link": None}
         )
 
 
@@ -556,3 +1788,861 @@ class TestChooserWidget(TestCase):
         form = SiteForm(initial={'site': localhost})
         html = form.as_p()
         self.assertIn('<div class="chooser__title" data-chooser-title>localhost [default]</div>', html)
+
+
+class TestChooserBlock(TestCase):
+    def setUp(self):
+        self.localhost = Site.objects.get(hostname='localhost')
+        self.other_site = Site.objects.create(
+            hostname='other.example.com', root_page=self.localhost.root_page
+        )
+        self.stream_block = blocks.StreamBlock([
+            ('site', ChooserBlock(SiteChooser)),
+            ('other_site', ChooserBlock('tests.widgets.SiteChooser')),
+        ])
+
+    def test_bulk_to_python(self):
+        data = [
+            {'type': 'site', 'value': self.localhost.pk},
+            {'type': 'site', 'value': self.other_site.pk},
+            {'type': 'other_site', 'value': self.localhost.pk},
+            {'type': 'site', 'value': None},
+        ]
+        with self.assertNumQueries(2):
+            # one query per block type
+            stream = self.stream_block.to_python(data)
+            values = [child.value for child in stream]
+
+        self.assertEqual(values, [self.localhost, self.other_site, self.localhost, None])
+        self.assertEqual(self.stream_block.get_prep_value(stream)[0]['value'], self.localhost.pk)
+
+    def test_malformed_ids_treated_as_missing(self):
+        # a malformed ID does not stop the other blocks' values from being loaded
+        data = [
+            {'type': 'site', 'value': self.localhost.pk},
+            {'type': 'site', 'value': 'not-an-id'},
+            {'type': 'site', 'value': self.other_site.pk},
+        ]
+        stream = self.stream_block.to_python(data)
+        self.assertEqual([child.value for child in stream], [self.localhost, None, self.other_site])
+        self.assertEqual(
+            SiteChooser().get_instances(['not-an-id', str(self.localhost.pk)]),
+            {str(self.localhost.pk): self.localhost}
+        )
+
+    def test_clean(self):
+        block = ChooserBlock(SiteChooser)
+        self.assertEqual(block.clean(self.localhost), self.localhost)
+        self.assertEqual(block.value_from_form(block.field.clean(str(self.other_site.pk))), self.other_site)
+        with self.assertRaises(ValidationError):
+            block.clean(None)
+
+    def test_widget_packed_once(self):
+        packed = json.dumps(JSContext().pack(self.stream_block))
+        self.assertEqual(packed.count('Choose a site'), 1)
+
+
+class TestAPILookupErrors(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        item_cache.clear_local()
+
+    def test_widget_keeps_value(self):
+        # an API error is not mistaken for the item not existing, which would clear the value
+        with self.assertLogs('generic_chooser', level='ERROR'):
+            html = ErrorPageAPIChooser().render('page', 2, attrs={'id': 'id_page'})
+        self.assertIn('<input type="hidden" name="page" value="2" id="id_page">', html)
+        self.assertIn('help-critical" data-chooser-title>2 (details could not be loaded)</div>', html)
+        self.assertNotIn('blank', re.search(r'<div id="id_page-chooser" class="([^"]*)"', html).group(1))
+
+    def test_not_found_is_not_an_error(self):
+        html = CachedPageAPIChooser().render('page', 999, attrs={'id': 'id_page'})
+        self.assertIn('<input type="hidden" name="page" id="id_page">', html)
+
+    def test_bulk_lookups_raise(self):
+        for bulk_lookup_parameter in (None, 'id'):
+            with self.assertRaises(APIError):
+                fetch_api_items(
+                    'http://testserver/error-api/', ['2', '3'],
+                    bulk_lookup_parameter=bulk_lookup_parameter,
+                )
+        self.assertEqual(fetch_api_items('http://testserver/api/v2/pages/', ['999']), {})
+
+
+class TestAPIChooserBlock(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        item_cache.clear_local()
+
+    def test_bulk_to_python(self):
+        block = ChooserBlock(CachedPageAPIChooser)
+        values = block.bulk_to_python(['2', '2', None, '999'])
+
+        self.assertEqual(values[0]['title'], "Welcome to your new Wagtail site!")
+        self.assertEqual(values[1], values[0])
+        self.assertIsNone(values[2])
+        self.assertIsNone(values[3])
+        # duplicate IDs are only looked up once
+        self.assertEqual(
+            [url.split('?')[0] for url in self.requested_urls],
+            ['/api/v2/pages/2/', '/api/v2/pages/999/']
+        )
+        self.assertEqual(block.get_prep_value(values[0]), 2)
+
+        # subsequent lookups are served from the detail cache
+        block.bulk_to_python(['2'])
+        self.assertEqual(len(self.requested_urls), 2)
+
+
+class TestLoadTestCommand(TestCase):
+    def test_loadtest(self):
+        out = StringIO()
+        call_command(
+            'chooser_loadtest', requests=20, concurrency=4, items=50, per_page=10, latency=0,
+            stdout=out
+        )
+        lines = out.getvalue().splitlines()
+
+        self.assertEqual(lines[0].split()[:4], ['op', 'count', 'errors', 'req/s'])
+        summary = dict((line.split()[0], line.split()[1:]) for line in lines[1:-1])
+        self.assertEqual(set(summary), {'choose', 'search', 'page', 'chosen', 'widget', 'all'})
+        # count and error columns
+        self.assertEqual(summary['all'][:2], ['20', '0'])
+        self.assertIn('Completed 20 operations', lines[-1])
+
+
+class SignedSiteForm(forms.Form):
+    site = forms.ModelChoiceField(Site.objects.all(), widget=SignedSiteChooser())
+    name = forms.CharField()
+
+
+class TestSignedChosenState(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+        self.site = Site.objects.get()
+
+    def test_chosen_response_includes_state(self):
+        response = self.client.get('/admin/signed-site-chooser/%d/' % self.site.pk)
+        self.assertEqual(response.status_code, 200)
+        result = response.json()['result']
+        self.assertEqual(load_chosen_state('signed_site_chooser:choose', result['state']), {
+            'value': str(self.site.pk),
+            'title': 'localhost [default]',
+            'edit_item_url': '/admin/sites/edit/%d/' % self.site.pk,
+        })
+
+        # tokens are only valid for the chooser that issued them
+        self.assertIsNone(load_chosen_state('site_chooser:choose', result['state']))
+
+        response = self.client.get(
+            '/admin/signed-site-chooser/chosen-multiple/?id=%d' % self.site.pk
+        )
+        self.assertIn('state', response.json()['result'][0])
+
+    def test_state_not_included_by_default(self):
+        response = self.client.get('/admin/site-chooser/%d/' % self.site.pk)
+        self.assertNotIn('state', response.json()['result'])
+
+    def get_invalid_form(self, value, token):
+        form = SignedSiteForm({'site': value, 'site-state': token, 'name': ''})
+        self.assertFalse(form.is_valid())
+        return form
+
+    def test_rerender_trusts_valid_state(self):
+        token = sign_chosen_state(
+            'signed_site_chooser:choose', self.site.pk, 'My site', '/admin/sites/%d/' % self.site.pk
+        )
+        form = self.get_invalid_form(str(self.site.pk), token)
+        with self.assertNumQueries(0):
+            html = str(form['site'])
+        self.assertIn('My site', html)
+        self.assertIn('name="site-state" id="id_site-state" value="%s"' % token, html)
+
+    def test_rerender_ignores_invalid_state(self):
+        token = sign_chosen_state(
+            'signed_site_chooser:choose', self.site.pk, 'My site', '/admin/sites/%d/' % self.site.pk
+        )
+        for value, bad_token in [
+            (str(self.site.pk), token[:-1]),
+            (str(self.site.pk), sign_chosen_state('site_chooser:choose', self.site.pk, 'My site', None)),
+            ('999', token),
+        ]:
+            form = self.get_invalid_form(value, bad_token)
+            with self.assertNumQueries(1):
+                html = str(form['site'])
+            self.assertNotIn('My site', html)
+
+    def test_state_not_kept_on_widget(self):
+        # widgets may be shared between requests (as ChooserBlock does), so a submitted state must
+        # not affect later renders of the same widget
+        token = sign_chosen_state(
+            'signed_site_chooser:choose', self.site.pk, 'My site', '/admin/sites/%d/' % self.site.pk
+        )
+        widget = SignedSiteChooser()
+        value = widget.value_from_datadict({'site': str(self.site.pk), 'site-state': token}, {}, 'site')
+        self.assertEqual(value, str(self.site.pk))
+
+        with self.assertNumQueries(1):
+            html = widget.render('site', str(self.site.pk), attrs={'id': 'id_site'})
+        self.assertNotIn('My site', html)
+
+        with self.assertNumQueries(0):
+            html = widget.render('site', value, attrs={'id': 'id_site'})
+        self.assertIn('My site', html)
+
+    def test_initial_render_signs_state(self):
+        html = SignedSiteChooser().render('site', self.site.pk, attrs={'id': 'id_site'})
+        token = re.search(r'name="site-state" id="id_site-state" value="([^"]+)"', html).group(1)
+        self.assertEqual(
+            load_chosen_state('signed_site_chooser:choose', token)['title'], 'localhost [default]'
+        )
+
+        html = SignedSiteChooser().render('site', None, attrs={'id': 'id_site'})
+        self.assertIn('name="site-state" id="id_site-state" value=""', html)
+
+
+class TestBackgroundCreate(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+        self.post_data = {
+            'background-create-site-chooser-create-form-hostname': 'foo',
+            'background-create-site-chooser-create-form-port': '123',
+            'background-create-site-chooser-create-form-site_name': 'foo',
+            'background-create-site-chooser-create-form-root_page': Page.objects.filter(depth=2).first().pk,
+        }
+
+    def test_poll_until_done(self):
+        jobs = []
+        with patch.object(ModelChooserCreateTabMixin, 'submit_create_job', side_effect=jobs.append), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/background-create-site-chooser/', self.post_data)
+
+        self.assertEqual(response.status_code, 200)
+        response_json = response.json()
+        self.assertEqual(response_json['step'], 'create_job')
+        self.assertEqual(response_json['status'], 'pending')
+        self.assertEqual(response_json['poll_interval'], 1)
+        self.assertEqual(response_json['error_message'], 'The item could not be created.')
+        self.assertFalse(Site.objects.filter(hostname='foo').exists())
+
+        job_url = response_json['job_url']
+        self.assertTrue(job_url.startswith('/admin/background-create-site-chooser/?create_job='))
+        self.assertEqual(self.client.get(job_url).json()['status'], 'pending')
+
+        # other users cannot see the job
+        User.objects.create_superuser(username='admin2', email='admin2@example.com', password='password')
+        client = Client()
+        client.login(username='admin2', password='password')
+        self.assertEqual(client.get(job_url).json()['status'], 'failed')
+
+        [run_job] = jobs
+        run_job()
+        site = Site.objects.get(hostname='foo')
+
+        response_json = self.client.get(job_url).json()
+        self.assertEqual(response_json['step'], 'chosen')
+        self.assertEqual(response_json['result']['id'], str(site.pk))
+
+    def test_job_submitted_on_commit(self):
+        # within a transaction (as under ATOMIC_REQUESTS), the job waits for it to be committed
+        jobs = []
+        with patch.object(ModelChooserCreateTabMixin, 'submit_create_job', side_effect=jobs.append):
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post('/admin/background-create-site-chooser/', self.post_data)
+            self.assertEqual(response.json()['status'], 'pending')
+            self.assertEqual(jobs, [])
+
+            for callback in callbacks:
+                callback()
+        self.assertEqual(len(jobs), 1)
+
+    def test_jobs_use_own_executor(self):
+        with patch('generic_chooser.views.call_in_background') as call_in_background, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/admin/background-create-site-chooser/', self.post_data)
+
+        [call] = call_in_background.call_args_list
+        self.assertIs(call.kwargs['executor'], get_job_executor())
+        self.assertIsNot(get_job_executor(), get_executor())
+
+    def test_uploaded_files_copied(self):
+        uploaded_file = SimpleUploadedFile('report.txt', b'Lorem ipsum', content_type='text/plain')
+        files = MultiValueDict({'file': [uploaded_file]})
+        copies = copy_uploaded_files(files)
+
+        # the copy outlives the request's file, and is deleted when closed
+        uploaded_file.close()
+        [copy] = copies.getlist('file')
+        self.assertEqual((copy.name, copy.content_type, copy.size), ('report.txt', 'text/plain', 11))
+        self.assertEqual(copy.read(), b'Lorem ipsum')
+        copy.close()
+        self.assertFalse(os.path.exists(copy.temporary_file_path()))
+
+        # files already owned by the caller are not copied again
+        owned_copy = copy_uploaded_files(copies)
+        self.assertIs(owned_copy['file'], copy)
+
+    def test_invalid_form(self):
+        self.post_data['background-create-site-chooser-create-form-hostname'] = ''
+        response = self.client.post('/admin/background-create-site-chooser/', self.post_data)
+        self.assertEqual(response.json()['step'], 'choose')
+
+    def test_failed_job(self):
+        with patch.object(ModelChooserCreateTabMixin, 'submit_create_job', side_effect=lambda func: func()), \
+                patch.object(ModelChooserCreateTabMixin, 'form_valid', side_effect=ValueError), \
+                self.assertLogs('generic_chooser', level='ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/background-create-site-chooser/', self.post_data)
+        self.assertEqual(response.json()['status'], 'pending')
+
+        response_json = self.client.get(response.json()['job_url']).json()
+        self.assertEqual(response_json['step'], 'create_job')
+        self.assertEqual(response_json['status'], 'failed')
+        self.assertEqual(response_json['error_message'], 'The item could not be created.')
+
+    def test_unknown_job(self):
+        response = self.client.get('/admin/background-create-site-chooser/?create_job=abc')
+        self.assertEqual(response.json()['status'], 'failed')
+
+
+class TestChunkedUploads(TestCase):
+    url = '/admin/chunked-upload-document-chooser/'
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=os.path.join(self.temp_dir.name, 'media'),
+            FILE_UPLOAD_TEMP_DIR=self.temp_dir.name,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def start_upload(self, size, client=None):
+        response = (client or self.client).post(self.url + '?upload=start', {
+            'name': 'report.txt', 'size': size, 'content_type': 'text/plain',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['chunk_size'], 10)
+        return response.json()['upload_id']
+
+    def send_chunk(self, upload_id, offset, data):
+        return self.client.post(
+            self.url + '?upload=%s&offset=%d' % (upload_id, offset), data,
+            content_type='application/octet-stream'
+        )
+
+    def submit_form(self, upload_id):
+        return self.client.post(self.url, {
+            'document-chooser-create-form-title': 'Report',
+            'document-chooser-create-form-file:upload': upload_id,
+        })
+
+    def test_upload_in_chunks(self):
+        data = b'The quick brown fox jumps over the lazy dog'
+        upload_id = self.start_upload(len(data))
+
+        offset = 0
+        while offset < len(data):
+            response = self.send_chunk(upload_id, offset, data[offset:offset + 10])
+            self.assertEqual(response.status_code, 200)
+            offset = response.json()['offset']
+        self.assertEqual(offset, len(data))
+
+        response = self.submit_form(upload_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['step'], 'chosen')
+
+        document = Document.objects.get(title='Report')
+        with document.file.open() as f:
+            self.assertEqual(f.read(), data)
+
+        # the assembled file is removed, and the upload cannot be used again
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'generic_chooser_uploads')), [])
+        self.assertEqual(self.client.get(self.url + '?upload=%s' % upload_id).status_code, 404)
+
+    def test_resume(self):
+        upload_id = self.start_upload(15)
+        self.assertEqual(self.send_chunk(upload_id, 0, b'0123456789').json()['offset'], 10)
+
+        # a chunk sent again after a dropped connection is rejected with the offset to resume from
+        response = self.send_chunk(upload_id, 0, b'0123456789')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 10)
+
+        response = self.client.get(self.url + '?upload=%s' % upload_id)
+        self.assertEqual(response.json(), {'upload_id': upload_id, 'offset': 10})
+
+        self.assertEqual(self.send_chunk(upload_id, 10, b'abcde').json()['offset'], 15)
+
+    def test_reject_oversized_chunks(self):
+        upload_id = self.start_upload(15)
+        response = self.send_chunk(upload_id, 0, b'0123456789a')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+
+        self.send_chunk(upload_id, 0, b'0123456789')
+        response = self.send_chunk(upload_id, 10, b'abcdef')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 10)
+
+    def test_reject_oversized_uploads(self):
+        response = self.client.post(self.url + '?upload=start', {
+            'name': 'report.txt', 'size': 101, 'content_type': 'text/plain',
+        })
+        self.assertEqual(response.status_code, 413)
+        self.start_upload(100)
+
+    def test_upload_removed_after_invalid_form(self):
+        upload_id = self.start_upload(5)
+        self.send_chunk(upload_id, 0, b'abcde')
+
+        response = self.client.post(self.url, {
+            'document-chooser-create-form-title': '',
+            'document-chooser-create-form-file:upload': upload_id,
+        })
+        self.assertEqual(response.json()['step'], 'choose')
+        self.assertNotIn(upload_id, response.json()['html'])
+
+        # the re-rendered form does not refer to the upload, so it is not left on disk
+        self.assertEqual(self.client.get(self.url + '?upload=%s' % upload_id).status_code, 404)
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'generic_chooser_uploads')), [])
+
+    def test_background_create(self):
+        url = '/admin/background-chunked-upload-document-chooser/'
+        upload_id = self.start_upload(5)
+        self.send_chunk(upload_id, 0, b'abcde')
+
+        # the job runs once the request has finished and closed its files; the assembled file is
+        # passed to it without being copied
+        with patch.object(ModelChooserCreateTabMixin, 'submit_create_job', side_effect=lambda func: func()), \
+                patch('generic_chooser.uploads.shutil.copyfileobj') as copyfileobj, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {
+                'document-chooser-create-form-title': 'Report',
+                'document-chooser-create-form-file:upload': upload_id,
+            })
+            self.assertEqual(response.json()['status'], 'pending')
+        self.assertFalse(copyfileobj.called)
+
+        with Document.objects.get(title='Report').file.open() as f:
+            self.assertEqual(f.read(), b'abcde')
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'generic_chooser_uploads')), [])
+        self.assertEqual(self.client.get(response.json()['job_url']).json()['step'], 'chosen')
+
+    def test_incomplete_upload(self):
+        upload_id = self.start_upload(15)
+        self.send_chunk(upload_id, 0, b'0123456789')
+
+        response = self.submit_form(upload_id)
+        self.assertEqual(response.json()['step'], 'choose')
+        self.assertIn('This field is required.', response.json()['html'])
+        self.assertFalse(Document.objects.exists())
+
+    def test_uploads_are_private(self):
+        upload_id = self.start_upload(15)
+
+        User.objects.create_superuser(username='admin2', email='admin2@example.com', password='password')
+        client = Client()
+        client.login(username='admin2', password='password')
+        self.assertEqual(client.get(self.url + '?upload=%s' % upload_id).status_code, 404)
+        self.assertEqual(client.get(self.url + '?upload=../../etc').status_code, 404)
+
+    def test_create_form_attributes(self):
+        response = self.client.get(self.url)
+        self.assertIn('data-chunked-uploads data-upload-chunk-size="10"', response.json()['html'])
+
+    def test_not_enabled(self):
+        response = self.client.post('/admin/site-chooser/?upload=start', {
+            'name': 'report.txt', 'size': 10,
+        })
+        self.assertRedirects(response, '/admin/')
+
+
+class TestTypeahead(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+        self.homepage = Page.objects.get(depth=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.homepage.add_child(title='A red page')
+            self.homepage.add_child(title='Another red page')
+            self.homepage.add_child(title='A third red page')
+            self.homepage.add_child(title='A green page')
+
+    def test_typeahead(self):
+        green_page = self.homepage.get_children().get(title='A green page')
+        response = self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'green'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [{
+            'id': str(green_page.pk),
+            'string': 'A green page',
+            'edit_link': '/admin/pages/%d/edit/' % green_page.pk,
+        }]})
+
+        # results are limited to typeahead_limit
+        response = self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'red'})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_short_search_term(self):
+        response = self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'r'})
+        self.assertEqual(response.json(), {'results': []})
+
+    def test_projection(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'green'})
+        page_queries = [q['sql'] for q in queries if '"wagtailcore_page"' in q['sql']]
+        self.assertEqual(len(page_queries), 1)
+        self.assertNotIn('"wagtailcore_page"."url_path"', page_queries[0])
+
+    def test_cache(self):
+        self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'green'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'green'})
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertFalse([q for q in queries if '"wagtailcore_page"' in q['sql']])
+
+        # changing a page invalidates the cache
+        with self.captureOnCommitCallbacks(execute=True):
+            self.homepage.add_child(title='Another green page')
+        response = self.client.get('/admin/typeahead-page-chooser/typeahead/', {'q': 'green'})
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_drf_typeahead(self):
+        response = self.client.get('/admin/api-page-chooser/typeahead/', {'q': 'green'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['string'] for result in response.json()['results']], ['A green page'])
+        self.assertIn('limit=10', self.requested_urls[-1])
+
+    def test_not_searchable(self):
+        response = self.client.get('/admin/site-chooser/typeahead/', {'q': 'localhost'})
+        self.assertEqual(response.json(), {'results': []})
+
+    def test_widget(self):
+        widget = TypeaheadPageChooser()
+        html = widget.render('page', None, attrs={'id': 'id_page'})
+        self.assertIn('data-typeahead-url="/admin/typeahead-page-chooser/typeahead/"', html)
+        self.assertIn('"typeaheadURL": "/admin/typeahead-page-chooser/typeahead/"', html)
+
+        html = SiteChooser().render('site', None, attrs={'id': 'id_site'})
+        self.assertNotIn('typeahead', html)
+
+
+class TestModalShellCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def get_modal_html(self, params=None):
+        response = self.client.get('/admin/cached-shell-site-chooser/', params or {})
+        self.assertEqual(response.status_code, 200)
+        # strip the per-request CSRF token
+        return re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', response.json()['html'])
+
+    def test_shell_is_cached(self):
+        uncached_response = self.client.get('/admin/site-chooser/')
+        uncached_html = re.sub(
+            r'name="csrfmiddlewaretoken" value="[^"]*"', '', uncached_response.json()['html']
+        ).replace('/admin/site-chooser/', '/admin/cached-shell-site-chooser/')
+
+        with patch('generic_chooser.views.render_to_string', wraps=render_to_string) as mock_render:
+            first_html = self.get_modal_html()
+            second_html = self.get_modal_html()
+
+        modal_renders = [
+            call for call in mock_render.call_args_list
+            if call.args[0] == 'generic_chooser/tabbed_modal_v3.html'
+        ]
+        self.assertEqual(len(modal_renders), 1)
+        self.assertEqual(first_html, second_html)
+        self.assertEqual(first_html, uncached_html)
+        self.assertIn('<form class="create-form"', first_html)
+        self.assertNotIn('generic_chooser:slot', first_html)
+
+    def test_results_are_rendered_per_request(self):
+        self.get_modal_html()
+        Site.objects.create(hostname='shell.example.com', root_page_id=2)
+        self.assertIn('shell.example.com', self.get_modal_html())
+
+    def test_search_is_not_cached(self):
+        Site.objects.create(hostname='shell.example.com', root_page_id=2)
+        self.get_modal_html()
+        with patch('generic_chooser.views.render_to_string', wraps=render_to_string) as mock_render:
+            html = self.get_modal_html({'q': 'shell'})
+        self.assertFalse(mock_render.called)
+        self.assertIn('shell.example.com', html)
+        self.assertEqual(html, self.get_modal_html({'q': 'shell'}))
+
+
+class TestAPIPaginationStrategies(FakeRequestsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+
+    def test_countless_pagination(self):
+        homepage = Page.objects.get(depth=2)
+        homepage.add_child(title='First child')
+        homepage.add_child(title='Second child')
+
+        response = self.client.get('/admin/countless-api-page-chooser/')
+        self.assertEqual(response.status_code, 200)
+        html = response.json()['html']
+        self.assertEqual(html.count('class="item-choice"'), 2)
+        self.assertIn('Page 1.', html)
+        self.assertNotIn('Page 1 of', html)
+        self.assertIn('data-page="2"', html)
+        self.assertNotIn('data-page="0"', html)
+        # one item beyond the page is requested, rather than a count
+        self.assertIn('limit=3', self.requested_urls[-1])
+
+        response = self.client.get('/admin/countless-api-page-chooser/', {'results': 'true', 'p': 2})
+        html = response.content.decode()
+        self.assertEqual(html.count('class="item-choice"'), 1)
+        self.assertIn('Page 2.', html)
+        self.assertIn('data-page="1"', html)
+        self.assertNotIn('data-page="3"', html)
+
+    def test_cursor_pagination(self):
+        for first_name in ['Ada', 'Bob', 'Cy']:
+            Person.objects.create(first_name=first_name, last_name='Smith', job_title='Tester')
+
+        response = self.client.get('/admin/cursor-person-chooser/')
+        self.assertEqual(response.status_code, 200)
+        html = response.json()['html']
+        self.assertIn('Ada Smith', html)
+        self.assertIn('Bob Smith', html)
+        self.assertNotIn('Cy Smith', html)
+        self.assertNotIn('Page 1', html)
+        cursor = re.search(r'data-page="([^"]+)"', html).group(1)
+
+        response = self.client.get('/admin/cursor-person-chooser/', {'results': 'true', 'p': cursor})
+        html = response.content.decode()
+        self.assertIn('cursor=%s' % cursor, self.requested_urls[-1])
+        self.assertIn('Cy Smith', html)
+        self.assertNotIn('Ada Smith', html)
+        self.assertNotIn('icon-arrow-right-after', html)
+
+        previous_cursor = re.search(r'data-page="([^"]+)"', html).group(1)
+        response = self.client.get('/admin/cursor-person-chooser/', {'results': 'true', 'p': previous_cursor})
+        html = response.content.decode()
+        self.assertIn('Ada Smith', html)
+        self.assertIn('Bob Smith', html)
+        self.assertNotIn('Cy Smith', html)
+
+
+class TestDRFResultsFormat(FakeRequestsTestCase):
+    # an upstream using Django REST Framework's own pagination, which lists items as 'results'
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        item_cache.clear_local()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+        self.assertTrue(
+            self.client.login(username='admin', password='password')
+        )
+        self.people = [
+            Person.objects.create(first_name=first_name, last_name='Smith', job_title='Tester')
+            for first_name in ['Ada', 'Adam', 'Adele', 'Bob']
+        ]
+
+    def test_unpaginated_listing(self):
+        response = self.client.get('/admin/unpaginated-drf-person-chooser/', {'results': 'true'})
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode()
+        for person in self.people:
+            self.assertIn('%s Smith' % person.first_name, html)
+
+    def test_streamed_listing(self):
+        response = self.client.get('/admin/streaming-drf-person-chooser/', {'results': 'true'})
+        self.assertTrue(response.streaming)
+        html = b''.join(response.streaming_content).decode()
+        for person in self.people:
+            self.assertIn('%s Smith' % person.first_name, html)
+
+    def test_typeahead(self):
+        response = self.client.get('/admin/unpaginated-drf-person-chooser/typeahead/', {'q': 'ad'})
+        self.assertEqual(
+            [result['string'] for result in response.json()['results']], ['Ada Smith', 'Adam Smith']
+        )
+        # the limit is sent with the pagination strategy's parameters
+        query = parse_qs(urlparse(self.requested_urls[-1]).query)
+        self.assertEqual((query['limit'], query['offset']), (['2'], ['0']))
+
+    def test_bulk_lookup(self):
+        ids = [str(self.people[3].pk), str(self.people[0].pk), '999']
+        items = fetch_api_items(
+            'http://testserver/person-drf-api/', ids, bulk_lookup_parameter='id__in'
+        )
+        self.assertEqual(sorted(items), sorted(ids[:2]))
+        self.assertEqual(items[ids[0]]['first_name'], 'Bob')
+
+        html = DRFPersonChooser().render('person', ids[0], attrs={'id': 'id_person'})
+        self.assertIn('data-chooser-title>Bob Smith</div>', html)
+        instances = DRFPersonChooser().get_instances(ids[:2])
+        self.assertEqual(instances[ids[1]]['first_name'], 'Ada')
+        query = parse_qs(urlparse(self.requested_urls[-1]).query)
+        self.assertEqual((query['limit'], query['offset']), (['2'], ['0']))
+
+    def test_cursor_typeahead(self):
+        view = DRFChooserMixin()
+        view.api_base_url = 'http://testserver/person-cursor-api/'
+        view.api_pagination_class = CursorPagination
+        view.per_page = 2
+        self.assertEqual(
+            [item['first_name'] for item in view.get_typeahead_object_list('', 1)], ['Ada']
+        )
+        self.assertNotIn('limit=', self.requested_urls[-1])
+
+
+class TestScopedListings(TestCase):
+    def setUp(self):
+        cache.clear()
+        access_admin = Permission.objects.get(
+            content_type__app_label='wagtailadmin', codename='access_admin'
+        )
+        edit_page = Permission.objects.get(content_type__app_label='wagtailcore', codename='change_page')
+
+        homepage = Page.objects.get(depth=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news_index = homepage.add_child(title='News index')
+            self.news_page = self.news_index.add_child(title='News item')
+            self.events_index = homepage.add_child(title='Events index')
+            self.events_page = self.events_index.add_child(title='Events item')
+
+        self.news_editors = Group.objects.create(name='News editors')
+        self.news_editors.permissions.add(access_admin)
+        GroupPagePermission.objects.create(group=self.news_editors, page=self.news_index, permission=edit_page)
+        self.events_editors = Group.objects.create(name='Events editors')
+        self.events_editors.permissions.add(access_admin)
+        GroupPagePermission.objects.create(group=self.events_editors, page=self.events_index, permission=edit_page)
+
+        self.news_editor = User.objects.create_user(username='news', password='password')
+        self.news_editor.groups.add(self.news_editors)
+        self.events_editor = User.objects.create_user(username='events', password='password')
+        self.events_editor.groups.add(self.events_editors)
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+
+    def login(self, username):
+        self.assertTrue(self.client.login(username=username, password='password'))
+
+    def get_titles(self, params=None, url='/admin/scoped-page-chooser/'):
+        response = self.client.get(url, dict(params or {}, results='true'))
+        self.assertEqual(response.status_code, 200)
+        return re.findall(r'class="item-choice"[^>]*>([^<]*)<', response.content.decode())
+
+    def test_listing_is_scoped(self):
+        self.login('news')
+        self.assertEqual(self.get_titles(), ['News index', 'News item'])
+        self.assertEqual(self.get_titles({'q': 'item'}), ['News item'])
+
+        self.login('events')
+        self.assertEqual(self.get_titles(), ['Events index', 'Events item'])
+        self.assertEqual(self.get_titles({'q': 'item'}), ['Events item'])
+
+        self.login('admin')
+        self.assertIn('News item', self.get_titles())
+        self.assertIn('Events item', self.get_titles())
+
+    def test_async_coalesced_listing_is_scoped(self):
+        # the coalescing key includes the scope, which must be resolved outside the event loop
+        self.login('news')
+        self.assertEqual(self.get_titles(url='/admin/async-scoped-page-chooser/'), ['News index', 'News item'])
+
+        self.login('events')
+        self.assertEqual(
+            self.get_titles(url='/admin/async-scoped-page-chooser/'), ['Events index', 'Events item']
+        )
+
+    def test_chosen_view_is_scoped(self):
+        self.login('news')
+        response = self.client.get('/admin/scoped-page-chooser/%d/' % self.news_page.pk)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/admin/scoped-page-chooser/%d/' % self.events_page.pk)
+        self.assertEqual(response.status_code, 404)
+
+    def test_typeahead_is_scoped(self):
+        self.login('news')
+        response = self.client.get('/admin/scoped-page-chooser/typeahead/', {'q': 'item'})
+        self.assertEqual([result['string'] for result in response.json()['results']], ['News item'])
+
+        # cached typeahead results are not shared with users in other scopes
+        self.login('events')
+        response = self.client.get('/admin/scoped-page-chooser/typeahead/', {'q': 'item'})
+        self.assertEqual([result['string'] for result in response.json()['results']], ['Events item'])
+
+    def test_allowed_ids_are_cached(self):
+        self.login('news')
+        self.get_titles()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_titles(), ['News index', 'News item'])
+        self.assertFalse(any('wagtailcore_grouppagepermission' in query['sql'] for query in queries))
+
+        # shared between users with the same groups
+        other_news_editor = User.objects.create_user(username='news2', password='password')
+        other_news_editor.groups.add(self.news_editors)
+        self.login('news2')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_titles(), ['News index', 'News item'])
+        self.assertFalse(any('wagtailcore_grouppagepermission' in query['sql'] for query in queries))
+
+    def test_allowed_ids_are_refreshed_on_change(self):
+        self.login('news')
+        self.get_titles()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.news_index.add_child(title='Another news item')
+        self.assertEqual(self.get_titles(), ['News index', 'News item', 'Another news item'])
+
+    def test_large_scopes_not_cached(self):
+        # scopes larger than scope_cache_max_ids are applied through scope_queryset on each query
+        self.login('news')
+        url = '/admin/scoped-tree-page-chooser/'
+        self.client.get(url, {'results': 'true'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'results': 'true', 'parent': self.news_index.pk})
+        self.assertTrue(any('wagtailcore_grouppagepermission' in query['sql'] for query in queries))
+        self.assertIn('>News item<', response.content.decode())
+
+    def test_tree_browsing_is_scoped(self):
+        self.login('news')
+        url = '/admin/scoped-tree-page-chooser/'
+
+        # the root level lists the topmost pages within the scope
+        html = self.client.get(url, {'results': 'true'}).content.decode()
+        self.assertEqual(re.findall(r'class="item-choice"[^>]*>([^<]*)<', html), ['News index'])
+
+        # breadcrumbs start at the scope's root, leaving out the ancestors outside it
+        html = self.client.get(url, {'results': 'true', 'parent': self.news_index.pk}).content.decode()
+        self.assertEqual(re.findall(r'class="item-choice"[^>]*>([^<]*)<', html), ['News item'])
+        self.assertIn('<li>News index</li>', html)
+        self.assertNotIn('Root', html)
+        self.assertNotIn(Page.objects.get(depth=2).title, html)
+
+        # pages outside the scope cannot be browsed, and are treated as the root level
+        html = self.client.get(url, {'results': 'true', 'parent': self.events_index.pk}).content.decode()
+        self.assertEqual(re.findall(r'class="item-choice"[^>]*>([^<]*)<', html), ['News index'])
+        self.assertNotIn('Events', html)
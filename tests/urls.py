@@ -1,6 +1,9 @@
+import time
+
 from django.conf.urls import include
+from django.http import JsonResponse
 from django.urls import path
-from rest_framework import routers, serializers, viewsets
+from rest_framework import pagination, routers, serializers, viewsets
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail import urls as wagtail_urls
 from .api import api_router as wagtail_api_router
@@ -17,14 +20,72 @@ class PersonViewSet(viewsets.ModelViewSet):
     queryset = Person.objects.all()
     serializer_class = PersonSerializer
 
+
+class PersonCursorPagination(pagination.CursorPagination):
+    ordering = 'id'
+    page_size = 2
+
+
+class PersonCursorViewSet(viewsets.ReadOnlyModelViewSet):
+    # a read-only Person API paginated by cursors, for CursorPagination tests
+    queryset = Person.objects.all()
+    serializer_class = PersonSerializer
+    pagination_class = PersonCursorPagination
+
+
+class PersonLimitOffsetViewSet(viewsets.ReadOnlyModelViewSet):
+    # a read-only Person API in Django REST Framework's own response format ('count' and
+    # 'results'), with search and bulk lookup parameters
+    serializer_class = PersonSerializer
+    pagination_class = pagination.LimitOffsetPagination
+
+    def get_queryset(self):
+        queryset = Person.objects.order_by('id')
+        if self.request.query_params.get('search'):
+            queryset = queryset.filter(first_name__icontains=self.request.query_params['search'])
+        if self.request.query_params.get('id__in'):
+            queryset = queryset.filter(id__in=self.request.query_params['id__in'].split(','))
+        return queryset
+
+
 # Register a writeable API for the Person model at /person-api,
 # separate from the Wagtail API
+def slow_api(request):
+    # an API endpoint that responds too slowly for federated chooser tests
+    time.sleep(1)
+    return JsonResponse({'items': [], 'meta': {'total_count': 0}})
+
+
+def numbers_api(request, count):
+    # a synthetic API listing `count` items, which like Wagtail's API rejects limits above 20
+    limit = int(request.GET.get('limit', 20))
+    offset = int(request.GET.get('offset', 0))
+    if limit > 20:
+        return JsonResponse({'message': "limit cannot be higher than 20"}, status=400)
+    items = [
+        {'id': n, 'title': 'Item %d' % n} for n in range(offset, min(offset + limit, count))
+    ]
+    return JsonResponse({'items': items, 'meta': {'total_count': count}})
+
+
+def error_api(request, path=''):
+    # an API whose every request fails with a server error
+    return JsonResponse({'message': "Internal server error"}, status=500)
+
+
 router = routers.DefaultRouter()
 router.register(r'person-api', PersonViewSet)
+router.register(r'person-cursor-api', PersonCursorViewSet, basename='person-cursor')
+router.register(r'person-drf-api', PersonLimitOffsetViewSet, basename='person-drf')
 
 urlpatterns = [
+    path('admin/', include('generic_chooser.urls')),
     path('admin/', include(wagtailadmin_urls)),
     path('api/v2/', wagtail_api_router.urls),
+    path('slow-api/', slow_api),
+    path('numbers-api/<int:count>/', numbers_api),
+    path('error-api/', error_api),
+    path('error-api/<path:path>', error_api),
 
     # Wire up our API using automatic URL routing.
     path('', include(router.urls)),
@@ -1,6 +1,14 @@
 from django import forms
+from django.db.models import Q
+from wagtail.documents.models import Document
 from wagtail.models import Page, Site
-from generic_chooser.views import DRFChooserMixin, DRFChooserViewSet, ModelChooserViewSet
+from generic_chooser.pagination import CountlessLimitOffsetPagination, CursorPagination
+from generic_chooser.views import (
+    AsyncModelChooserMixin, DRFChooserMixin, DRFChooserViewSet, FederatedDRFChooserViewSet,
+    ModelChooserMixin, ModelChooserViewSet, MultiModelChooserViewSet
+)
+
+from .models import Person
 
 
 class SiteChooserViewSet(ModelChooserViewSet):
@@ -13,6 +21,10 @@ class SiteChooserViewSet(ModelChooserViewSet):
     fields = ['hostname', 'port', 'site_name', 'root_page', 'is_default_site']
 
 
+class CachedShellSiteChooserViewSet(SiteChooserViewSet):
+    modal_shell_cache_timeout = 300
+
+
 class NameOrderedSiteChooserViewSet(ModelChooserViewSet):
     model = Site
     icon = 'site'
@@ -23,6 +35,73 @@ class NameOrderedSiteChooserViewSet(ModelChooserViewSet):
     fields = ['hostname', 'port', 'site_name', 'root_page', 'is_default_site']
 
 
+class LazyCreateSiteChooserViewSet(SiteChooserViewSet):
+    lazy_create_tab = True
+    prefix = 'lazy-create-site-chooser'
+
+
+class CachedCountSiteChooserViewSet(SiteChooserViewSet):
+    count_cache_timeout = 300
+
+
+class ThrottledSiteChooserViewSet(SiteChooserViewSet):
+    results_rate_limit = '2/m'
+    coalesce_results = True
+
+
+class SlowLoggedSiteChooserViewSet(SiteChooserViewSet):
+    # log every request
+    slow_request_threshold = 0
+
+
+class AsyncSiteChooserViewSet(SiteChooserViewSet):
+    async_views = True
+    count_cache_timeout = 300
+
+
+class AsyncRecentSiteChooserViewSet(AsyncSiteChooserViewSet):
+    recent_choices_limit = 3
+    results_rate_limit = '3/m'
+    coalesce_results = True
+
+
+class RecentSiteChooserViewSet(SiteChooserViewSet):
+    recent_choices_limit = 3
+    recent_tab_items = 2
+
+
+class BackgroundCreateSiteChooserViewSet(SiteChooserViewSet):
+    create_form_in_background = True
+    prefix = 'background-create-site-chooser'
+
+
+class ChunkedUploadDocumentChooserViewSet(ModelChooserViewSet):
+    model = Document
+    icon = 'doc-full'
+    page_title = "Choose a document"
+    fields = ['title', 'file']
+    prefix = 'document-chooser'
+    chunked_uploads = True
+    upload_chunk_size = 10
+    max_upload_size = 100
+
+
+class BackgroundChunkedUploadDocumentChooserViewSet(ChunkedUploadDocumentChooserViewSet):
+    create_form_in_background = True
+
+
+class SignedSiteChooserViewSet(SiteChooserViewSet):
+    sign_chosen_state = True
+
+
+class PersonOrSiteChooserViewSet(MultiModelChooserViewSet):
+    models = [Person, Site]
+    icon = 'snippet'
+    page_title = "Choose a person or site"
+    per_page = 3
+    edit_item_url_names = {'wagtailcore.site': 'wagtailsites:edit'}
+
+
 class PageChooserViewSet(ModelChooserViewSet):
     model = Page
     icon = 'page'
@@ -30,6 +109,66 @@ class PageChooserViewSet(ModelChooserViewSet):
     edit_item_url_name = 'wagtailadmin_pages:edit'
 
 
+class TypeaheadPageChooserViewSet(PageChooserViewSet):
+    typeahead_limit = 2
+    typeahead_fields = ['id', 'title']
+
+
+class GroupScopedPageChooserMixin(ModelChooserMixin):
+    # non-superusers can only choose pages within the subtrees their groups have permissions on
+    def get_scope(self):
+        if self.request.user.is_superuser:
+            return None
+        return sorted(self.request.user.groups.values_list('pk', flat=True))
+
+    def scope_queryset(self, queryset, scope):
+        roots = Page.objects.filter(group_permissions__group__in=scope).distinct()
+        condition = Q(pk__in=[])
+        for root in roots:
+            condition |= Q(path__startswith=root.path)
+        return queryset.filter(condition)
+
+
+class ScopedPageChooserViewSet(PageChooserViewSet):
+    chooser_mixin_class = GroupScopedPageChooserMixin
+    scope_cache_timeout = 300
+    per_page = 10
+    count_cache_timeout = 300
+
+
+class AsyncGroupScopedPageChooserMixin(AsyncModelChooserMixin, GroupScopedPageChooserMixin):
+    pass
+
+
+class AsyncScopedPageChooserViewSet(ScopedPageChooserViewSet):
+    async_views = True
+    async_chooser_mixin_class = AsyncGroupScopedPageChooserMixin
+    coalesce_results = True
+
+
+class ScopedTreePageChooserViewSet(PageChooserViewSet):
+    chooser_mixin_class = GroupScopedPageChooserMixin
+    browse_tree = True
+    scope_cache_timeout = 300
+    # too small to cache the IDs of any scope
+    scope_cache_max_ids = 1
+
+
+class StreamingPageChooserViewSet(PageChooserViewSet):
+    stream_unpaginated_results = True
+    stream_chunk_size = 2
+
+
+class TreePageChooserViewSet(PageChooserViewSet):
+    browse_tree = True
+    per_page = 10
+
+
+class MinLengthSearchPageChooserViewSet(PageChooserViewSet):
+    search_min_length = 3
+    results_cache_size = 0
+
+
 class APIPageChooserViewSet(DRFChooserViewSet):
     icon = 'page'
     page_title = "Choose a page"
@@ -43,6 +182,64 @@ class APIPageChooserViewSet(DRFChooserViewSet):
     per_page = 10
 
 
+class CountlessAPIPageChooserViewSet(APIPageChooserViewSet):
+    api_pagination_class = CountlessLimitOffsetPagination
+    per_page = 2
+
+
+class CachedAPIPageChooserViewSet(APIPageChooserViewSet):
+    detail_cache_timeout = 300
+
+
+class MetricsAPIPageChooserViewSet(CachedAPIPageChooserViewSet):
+    enable_metrics = True
+
+
+class RevalidatingAPIPageChooserViewSet(APIPageChooserViewSet):
+    revalidate_cache_timeout = 300
+    enable_metrics = True
+
+
+class FieldLimitedAPIPageChooserViewSet(CachedAPIPageChooserViewSet):
+    api_fields = ['_', 'title']
+
+
+class StreamingAPIPageChooserViewSet(APIPageChooserViewSet):
+    per_page = None
+    stream_unpaginated_results = True
+    stream_chunk_size = 2
+
+
+class FederatedPageChooserViewSet(FederatedDRFChooserViewSet):
+    icon = 'page'
+    page_title = "Choose a page"
+    title_field_name = 'title'
+    api_endpoints = {
+        'primary': 'http://testserver/api/v2/pages/',
+        'mirror': 'http://testserver/api/v2/pages-mirror/',
+    }
+    per_page = 10
+    is_searchable = True
+
+
+class NumbersFederatedChooserViewSet(FederatedDRFChooserViewSet):
+    title_field_name = 'title'
+    api_endpoints = {
+        'long': 'http://testserver/numbers-api/15/',
+        'short': 'http://testserver/numbers-api/7/',
+    }
+    per_page = 10
+
+
+class PartlySlowFederatedPageChooserViewSet(FederatedPageChooserViewSet):
+    api_endpoints = {
+        'primary': 'http://testserver/api/v2/pages/',
+        'slow': 'http://testserver/slow-api/',
+        'broken': 'http://testserver/broken-api/',
+    }
+    endpoint_timeout = 0.2
+
+
 class PersonChooserMixin(DRFChooserMixin):
     def get_object_string(self, item):
         return "%s %s" % (item['first_name'], item['last_name'])
@@ -60,3 +257,21 @@ class PersonChooserViewSet(DRFChooserViewSet):
     form_class = PersonForm
     chooser_mixin_class = PersonChooserMixin
     prefix = 'person-chooser'
+
+
+class CursorPersonChooserViewSet(PersonChooserViewSet):
+    api_base_url = 'http://testserver/person-cursor-api/'
+    api_pagination_class = CursorPagination
+    per_page = 2
+
+
+class UnpaginatedDRFPersonChooserViewSet(PersonChooserViewSet):
+    # an API in Django REST Framework's response format, listing its items as 'results'
+    api_base_url = 'http://testserver/person-drf-api/'
+    is_searchable = True
+    typeahead_limit = 2
+    per_page = None
+
+
+class StreamingDRFPersonChooserViewSet(UnpaginatedDRFPersonChooserViewSet):
+    stream_unpaginated_results = True
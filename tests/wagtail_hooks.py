@@ -12,16 +12,197 @@ def register_site_chooser_viewset():
     return views.NameOrderedSiteChooserViewSet('name_ordered_site_chooser', url_prefix='name-ordered-site-chooser')
 
 
+@hooks.register('register_admin_viewset')
+def register_lazy_create_site_chooser_viewset():
+    return views.LazyCreateSiteChooserViewSet('lazy_create_site_chooser', url_prefix='lazy-create-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_cached_count_site_chooser_viewset():
+    return views.CachedCountSiteChooserViewSet('cached_count_site_chooser', url_prefix='cached-count-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_throttled_site_chooser_viewset():
+    return views.ThrottledSiteChooserViewSet('throttled_site_chooser', url_prefix='throttled-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_slow_logged_site_chooser_viewset():
+    return views.SlowLoggedSiteChooserViewSet('slow_logged_site_chooser', url_prefix='slow-logged-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_async_site_chooser_viewset():
+    return views.AsyncSiteChooserViewSet('async_site_chooser', url_prefix='async-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_recent_site_chooser_viewset():
+    return views.RecentSiteChooserViewSet('recent_site_chooser', url_prefix='recent-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_person_or_site_chooser_viewset():
+    return views.PersonOrSiteChooserViewSet('person_or_site_chooser', url_prefix='person-or-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_federated_page_chooser_viewset():
+    return views.FederatedPageChooserViewSet('federated_page_chooser', url_prefix='federated-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_partly_slow_federated_page_chooser_viewset():
+    return views.PartlySlowFederatedPageChooserViewSet(
+        'partly_slow_federated_page_chooser', url_prefix='partly-slow-federated-page-chooser'
+    )
+
+
 @hooks.register('register_admin_viewset')
 def register_page_chooser_viewset():
     return views.PageChooserViewSet('page_chooser', url_prefix='page-chooser')
 
 
+@hooks.register('register_admin_viewset')
+def register_streaming_page_chooser_viewset():
+    return views.StreamingPageChooserViewSet('streaming_page_chooser', url_prefix='streaming-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_tree_page_chooser_viewset():
+    return views.TreePageChooserViewSet('tree_page_chooser', url_prefix='tree-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_min_length_search_page_chooser_viewset():
+    return views.MinLengthSearchPageChooserViewSet(
+        'min_length_search_page_chooser', url_prefix='min-length-search-page-chooser'
+    )
+
+
 @hooks.register('register_admin_viewset')
 def register_api_page_chooser_viewset():
     return views.APIPageChooserViewSet('api_page_chooser', url_prefix='api-page-chooser')
 
 
+@hooks.register('register_admin_viewset')
+def register_cached_api_page_chooser_viewset():
+    return views.CachedAPIPageChooserViewSet('cached_api_page_chooser', url_prefix='cached-api-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_metrics_api_page_chooser_viewset():
+    return views.MetricsAPIPageChooserViewSet('metrics_api_page_chooser', url_prefix='metrics-api-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_field_limited_api_page_chooser_viewset():
+    return views.FieldLimitedAPIPageChooserViewSet(
+        'field_limited_api_page_chooser', url_prefix='field-limited-api-page-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_revalidating_api_page_chooser_viewset():
+    return views.RevalidatingAPIPageChooserViewSet(
+        'revalidating_api_page_chooser', url_prefix='revalidating-api-page-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_streaming_api_page_chooser_viewset():
+    return views.StreamingAPIPageChooserViewSet(
+        'streaming_api_page_chooser', url_prefix='streaming-api-page-chooser'
+    )
+
+
 @hooks.register('register_admin_viewset')
 def register_person_chooser_viewset():
     return views.PersonChooserViewSet('person_chooser', url_prefix='person-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_signed_site_chooser_viewset():
+    return views.SignedSiteChooserViewSet('signed_site_chooser', url_prefix='signed-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_background_create_site_chooser_viewset():
+    return views.BackgroundCreateSiteChooserViewSet(
+        'background_create_site_chooser', url_prefix='background-create-site-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_chunked_upload_document_chooser_viewset():
+    return views.ChunkedUploadDocumentChooserViewSet(
+        'chunked_upload_document_chooser', url_prefix='chunked-upload-document-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_background_chunked_upload_document_chooser_viewset():
+    return views.BackgroundChunkedUploadDocumentChooserViewSet(
+        'background_chunked_upload_document_chooser',
+        url_prefix='background-chunked-upload-document-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_typeahead_page_chooser_viewset():
+    return views.TypeaheadPageChooserViewSet('typeahead_page_chooser', url_prefix='typeahead-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_cached_shell_site_chooser_viewset():
+    return views.CachedShellSiteChooserViewSet('cached_shell_site_chooser', url_prefix='cached-shell-site-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_countless_api_page_chooser_viewset():
+    return views.CountlessAPIPageChooserViewSet('countless_api_page_chooser', url_prefix='countless-api-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_cursor_person_chooser_viewset():
+    return views.CursorPersonChooserViewSet('cursor_person_chooser', url_prefix='cursor-person-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_unpaginated_drf_person_chooser_viewset():
+    return views.UnpaginatedDRFPersonChooserViewSet(
+        'unpaginated_drf_person_chooser', url_prefix='unpaginated-drf-person-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_streaming_drf_person_chooser_viewset():
+    return views.StreamingDRFPersonChooserViewSet(
+        'streaming_drf_person_chooser', url_prefix='streaming-drf-person-chooser'
+    )
+
+
+@hooks.register('register_admin_viewset')
+def register_scoped_page_chooser_viewset():
+    return views.ScopedPageChooserViewSet('scoped_page_chooser', url_prefix='scoped-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_async_scoped_page_chooser_viewset():
+    return views.AsyncScopedPageChooserViewSet('async_scoped_page_chooser', url_prefix='async-scoped-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_scoped_tree_page_chooser_viewset():
+    return views.ScopedTreePageChooserViewSet('scoped_tree_page_chooser', url_prefix='scoped-tree-page-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_numbers_federated_chooser_viewset():
+    return views.NumbersFederatedChooserViewSet('numbers_federated_chooser', url_prefix='numbers-federated-chooser')
+
+
+@hooks.register('register_admin_viewset')
+def register_async_recent_site_chooser_viewset():
+    return views.AsyncRecentSiteChooserViewSet('async_recent_site_chooser', url_prefix='async-recent-site-chooser')
@@ -1,5 +1,9 @@
-from wagtail.models import Site
-from generic_chooser.widgets import AdminChooser
+from wagtail.models import Page, Site
+from generic_chooser.widgets import (
+    AdminChooser, DRFChooser, FederatedDRFChooser, MultiModelChooser
+)
+
+from .models import Person
 
 
 class SiteChooser(AdminChooser):
@@ -9,3 +13,54 @@ class SiteChooser(AdminChooser):
     choose_another_text = "Choose another site"
     link_to_chosen_text = "Edit this site"
     edit_item_url_name = "wagtailsites:edit"
+
+
+class SignedSiteChooser(SiteChooser):
+    choose_modal_url_name = "signed_site_chooser:choose"
+    trust_signed_state = True
+
+
+class TypeaheadPageChooser(AdminChooser):
+    model = Page
+    choose_modal_url_name = "typeahead_page_chooser:choose"
+    typeahead = True
+
+
+class CachedPageAPIChooser(DRFChooser):
+    choose_modal_url_name = "cached_api_page_chooser:choose"
+    edit_item_url_name = "wagtailadmin_pages:edit"
+    api_base_url = "http://testserver/api/v2/pages/"
+    detail_cache_timeout = 300
+
+    def get_title(self, instance):
+        return instance['title']
+
+
+class ErrorPageAPIChooser(CachedPageAPIChooser):
+    api_base_url = "http://testserver/error-api/"
+
+
+class DRFPersonChooser(DRFChooser):
+    choose_modal_url_name = "unpaginated_drf_person_chooser:choose"
+    api_base_url = "http://testserver/person-drf-api/"
+    bulk_lookup_parameter = "id__in"
+
+    def get_title(self, instance):
+        return "%s %s" % (instance['first_name'], instance['last_name'])
+
+
+class PersonOrSiteChooser(MultiModelChooser):
+    models = [Person, Site]
+    choose_modal_url_name = "person_or_site_chooser:choose"
+    edit_item_url_names = {'wagtailcore.site': 'wagtailsites:edit'}
+
+
+class FederatedPageAPIChooser(FederatedDRFChooser):
+    choose_modal_url_name = "federated_page_chooser:choose"
+    api_endpoints = {
+        'primary': 'http://testserver/api/v2/pages/',
+        'mirror': 'http://testserver/api/v2/pages-mirror/',
+    }
+
+    def get_title(self, instance):
+        return instance['title']